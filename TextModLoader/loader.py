@@ -3,7 +3,7 @@ import os
 import string
 from typing import Dict, Iterable, List, Optional, Set, Type
 
-from Mods.TextModLoader import TextMod, tml_parser
+from Mods.TextModLoader import CommandExtensions, TextMod, tml_parser
 from Mods.TextModLoader.blimp import parse_blimp_tags
 from Mods.TextModLoader.constants import (BINARIES_DIR, BLCMM_GAME_MAP, JSON, META_TAG_AUTHOR,
                                           META_TAG_DESCRIPTION, META_TAG_MAIN_AUTHOR,
@@ -202,7 +202,12 @@ def parse_and_register_mod_file(file_path: str, cls: Type[TextMod] = TextMod) ->
     comments: List[str]
 
     try:
-        spark_service_idx, game_str, comments = tml_parser.parse(file_path)
+        # Newer versions of Command Extensions can extract the same info while looking for their
+        #  commands, which saves having to parse the file again when it gets enabled
+        if CommandExtensions is not None and hasattr(CommandExtensions, "parse_mod_file"):
+            spark_service_idx, game_str, comments = CommandExtensions.parse_mod_file(file_path)
+        else:
+            spark_service_idx, game_str, comments = tml_parser.parse(file_path)
     except (tml_parser.BLCMMParserError, ValueError, RuntimeError):
         return {
             SETTINGS_IS_MOD_FILE: False,
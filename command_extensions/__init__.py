@@ -1,22 +1,33 @@
-# ruff: noqa: D103
-
 if True:
     assert __import__("mods_base").__version_info__ >= (1, 5), "Please update the SDK"
 
 import argparse
 import sys
+import time
 import traceback
+from collections import Counter
+from collections.abc import Callable, Iterator, Sequence
 from functools import wraps
 from pathlib import Path
 from typing import Any, overload
 
 import unrealsdk
 from legacy_compat import add_compat_module
-from mods_base import AbstractCommand, Library, Mod, build_mod, command, hook
+from mods_base import AbstractCommand, Library, Mod, build_mod, command, get_pc, hook
 from unrealsdk import logging
+from unrealsdk.hooks import prevent_hooking_direct_calls
 from unrealsdk.unreal import BoundFunction, UObject, WrappedStruct
 
-from . import builtins, file_parser
+from . import (
+    builtins,
+    code_cache,
+    exec_prefetch,
+    file_parser,
+    object_cache,
+    parse_cache,
+    profiler,
+    scheduler,
+)
 from .builtins.chat import chat
 from .builtins.clone import clone, clone_dbg_suppress_exists
 from .builtins.clone_bpd import clone_bpd
@@ -37,10 +48,13 @@ __version_info__: tuple[int, ...]
 __all__: tuple[str, ...] = (
     "__version__",
     "__version_info__",
+    "add_exec_callback",
     "autoregister",
     "builtins",
     "deregister",
     "register",
+    "remove_exec_callback",
+    "scan_mod_file",
 )
 
 
@@ -136,6 +150,50 @@ def autoregister(obj: AbstractCommand | Mod, /) -> AbstractCommand | Mod:
     return obj
 
 
+def add_exec_callback(callback: Callable[[Path], None]) -> None:
+    """
+    Adds a callback to run whenever an exec'd file finishes running all of its custom commands.
+
+    If a time budget is set, commands may keep running over several ticks after the exec command
+    itself returns - this callback is only run once they've all completed. It's only called for top
+    level files, not for any files which they in turn exec.
+
+    Args:
+        callback: The callback to add. Called with the full path of the file which was exec'd.
+    """
+    exec_callbacks.append(callback)
+
+
+def remove_exec_callback(callback: Callable[[Path], None]) -> None:
+    """
+    Removes a previously added exec callback.
+
+    Args:
+        callback: The callback to remove.
+    """
+    exec_callbacks.remove(callback)
+
+
+def scan_mod_file(file_path: Path) -> tuple[int | None, str | None, list[str] | None]:
+    """
+    Scans a mod file for the info mod loaders use, and caches the custom commands it contains.
+
+    Mod loaders can use this when first discovering a file, so that it only gets parsed once - when
+    it's later executed, its commands are loaded from the cache. Any new commands the file adds via
+    CE_NewCmd only take effect once it's executed, scanning doesn't change what other files match.
+
+    Args:
+        file_path: The file to scan.
+    Returns:
+        A 3-tuple of the index of the spark service the file's hotfixes are set on, the game the
+        file was made for, and the first comment block. The first two may be None. The comments
+        are None for plain text files which don't contain any commands, which likely aren't mods.
+    """
+    update_commands_if_dirty()
+    info, _ = parse_cache.scan(file_path)
+    return info
+
+
 # endregion
 # ==================================================================================================
 # region Implementation
@@ -156,8 +214,25 @@ command_map: dict[str, AbstractCommand] = {}
 
 debug_logging: bool = False
 
+exec_callbacks: list[Callable[[Path], None]] = []
+
+# The hashes of all the commands in each file when it was last executed, keyed on normalized path
+executed_hashes: dict[str, Counter[int]] = {}
+
+# The most consecutive commands to pass to a command's batch handler at once - also limits how long
+# a single step can take when running under a time budget
+MAX_BATCH_SIZE = 256
+
+
+def resolve_exec_target(file_name: str) -> Path | None:
+    """
+    Resolves the argument of an exec command to the file it refers to.
 
-def parse_exec_command(file_name: str) -> None:
+    Args:
+        file_name: The file name passed to the exec command.
+    Returns:
+        The full path to the file, or None if it doesn't exist.
+    """
     file_name = file_name.strip()
 
     if file_name[0] in "'\"" and file_name[0] == file_name[-1]:
@@ -165,49 +240,278 @@ def parse_exec_command(file_name: str) -> None:
 
     full_path = EXEC_ROOT / file_name
     if not full_path.exists() or not full_path.is_file():
-        return
-    execute_file(full_path)
+        return None
+    return full_path
+
+
+def prefetch_exec_targets(matches: list[parse_cache.PositionedMatch]) -> None:
+    """
+    Starts parsing all the files exec'd by a set of matches in the background.
+
+    Args:
+        matches: The matches to look through.
+    """
+    for cmd, line, cmd_len, *_ in matches:
+        if cmd.lower() == "exec" and (target := resolve_exec_target(line[cmd_len:])):
+            exec_prefetch.prefetch(target)
 
 
-def execute_file(file_path: Path) -> None:
+def update_commands_if_dirty() -> None:
+    """Updates the file parser's commands, if the command map has changed since it was last run."""
     global commands_dirty
     if commands_dirty:
         command_list = list(command_map)
         command_list += ["exec", "py", "pyexec"]
-        file_parser.update_commands(command_list)
+        parse_cache.update_commands(command_list)
         commands_dirty = False
 
-    for cmd, line, cmd_len in file_parser.parse(file_path):
+
+def iter_execute_file(file_path: Path, only_changed: bool = False) -> Iterator[None]:
+    """
+    Executes all the custom commands in a file, one at a time.
+
+    Args:
+        file_path: The file to execute.
+        only_changed: If true, skips any commands which were already run the last time this file
+                      was executed. Also applies to any files this one execs.
+    Yields:
+        After running each command.
+    """
+    update_commands_if_dirty()
+
+    with exec_prefetch.executing(file_path) as should_execute:
+        if not should_execute:
+            logging.error(f"Skipping exec of '{file_path}', since it's already being executed.")
+            return
+
+        parse_start = time.perf_counter()
+        matches = exec_prefetch.get_matches(file_path)
+        profile = profiler.start_file(file_path, time.perf_counter() - parse_start, len(matches))
+        # Start parsing all the files this one execs, so they're hopefully ready by the time we get
+        # to them
+        prefetch_exec_targets(matches)
+
+        key = exec_prefetch.normalize(file_path)
+        previous_hashes = executed_hashes.get(key) if only_changed else None
+        executed_hashes[key] = Counter(line_hash for *_, line_hash in matches)
+
+        if only_changed:
+            if previous_hashes is None:
+                logging.info(f"'{file_path}' hasn't been executed before, running all commands")
+            else:
+                matches = filter_unchanged(matches, previous_hashes)
+
+        try:
+            yield from iter_run_matches(matches, profile, only_changed)
+        finally:
+            if profile is not None:
+                profiler.end_file()
+
+
+def iter_run_matches(
+    matches: list[parse_cache.PositionedMatch],
+    profile: profiler.FileStats | None,
+    only_changed: bool,
+) -> Iterator[None]:
+    """
+    Runs all the matches from a file, one batch at a time.
+
+    Args:
+        matches: The matches to run.
+        profile: The stats to record each command in, or None if not profiling.
+        only_changed: Passed on to any nested execs.
+    Yields:
+        After running each batch.
+    """
+    # Don't batch while profiling, so that we can time each line individually
+    for name, group in group_batches(matches, batch=profile is None):
         if debug_logging:
-            logging.info("[CE]: " + line)
-
-        name = cmd.lower()
-        match name:
-            case "exec":
-                parse_exec_command(line[cmd_len:])
-
-            case "py":
-                try:
-                    exec(line[cmd_len:].lstrip(), py_globals)  # noqa: S102
-                except Exception:  # noqa: BLE001
-                    logging.error("Error occurred during 'py' command:")
-                    logging.error(line)
-                    traceback.print_exc()
-
-            case "pyexec":
-                try:
-                    path = PYEXEC_ROOT / line[cmd_len:].strip()
-                    with path.open() as file:
-                        # To match pyunrealsdk, each pyexec gets a new empty of globals
-                        exec(file.read(), {"__file__": str(path)})  # noqa: S102
-                except Exception:  # noqa: BLE001
-                    logging.error("Error occurred during 'pyexec' command:")
-                    logging.error(line)
-                    traceback.print_exc()
-
-            case _:
-                if name in command_map:
-                    command_map[name]._handle_cmd(line, cmd_len)  # pyright: ignore[reportPrivateUsage]
+            for _, line, *_ in group:
+                logging.info("[CE]: " + line)
+
+        if name == "exec":
+            _, line, cmd_len, line_number, *_ = group[0]
+            if (target := resolve_exec_target(line[cmd_len:])) is not None:
+                yield from iter_execute_file(target, only_changed)
+                if profile is not None:
+                    profiler.record_exec(profile, line_number, line)
+            continue
+
+        if profile is None:
+            run_group(name, group)
+        else:
+            run_profiled(profile, name, group[0])
+        yield
+
+
+def filter_unchanged(
+    matches: list[parse_cache.PositionedMatch],
+    previous_hashes: Counter[int],
+) -> list[parse_cache.PositionedMatch]:
+    """
+    Filters out all matches which were run during a previous execution of the same file.
+
+    Exec commands are never filtered, since the files they exec may have changed even if the line
+    itself hasn't.
+
+    Args:
+        matches: The matches to filter.
+        previous_hashes: The hashes of the commands in the previous execution.
+    Returns:
+        The new and changed matches.
+    """
+    # Consume one copy of each previous command as we see it, anything left over is new
+    unchanged = Counter(previous_hashes)
+
+    output: list[parse_cache.PositionedMatch] = []
+    for match in matches:
+        line_hash = match[5]
+        if match[0].lower() != "exec" and unchanged[line_hash] > 0:
+            unchanged[line_hash] -= 1
+            continue
+        output.append(match)
+    return output
+
+
+def get_batch_handler(name: str) -> Callable[[Sequence[tuple[str, int]]], None] | None:
+    """
+    Gets the batch handler for a command, if it has one.
+
+    Args:
+        name: The lowercase name of the command.
+    Returns:
+        The command's `_handle_cmd_batch` method, or None if it doesn't have one.
+    """
+    return getattr(command_map.get(name), "_handle_cmd_batch", None)
+
+
+def group_batches(
+    matches: list[parse_cache.PositionedMatch],
+    batch: bool = True,
+) -> Iterator[tuple[str, list[parse_cache.PositionedMatch]]]:
+    """
+    Groups consecutive runs of the same command, for commands which support batching.
+
+    Args:
+        matches: The matches to group.
+        batch: If false, puts every command in a group of its own.
+    Yields:
+        Tuples of the lowercase command name, and the list of matches in the group. Commands which
+        don't support batching are always in a group of their own.
+    """
+    group: list[parse_cache.PositionedMatch] = []
+    group_name = ""
+
+    for match in matches:
+        name = match[0].lower()
+        if group and (name != group_name or len(group) >= MAX_BATCH_SIZE):
+            yield group_name, group
+            group = []
+
+        if not batch or get_batch_handler(name) is None:
+            yield name, [match]
+            continue
+
+        group_name = name
+        group.append(match)
+
+    if group:
+        yield group_name, group
+
+
+def iter_top_level_exec(file_path: Path, only_changed: bool = False) -> Iterator[None]:
+    """
+    Executes a file exec'd from outside of any other file, and cleans up after it.
+
+    Args:
+        file_path: The file to execute.
+        only_changed: If true, skips any commands which were already run the last time this file
+                      was executed.
+    Yields:
+        After running each command.
+    """
+    try:
+        yield from iter_execute_file(file_path, only_changed)
+    finally:
+        # Reset the py command's globals between files
+        py_globals.clear()
+        py_globals.update(DEFAULT_PY_GLOBALS)
+        # Only share clones between calls in the same file
+        builtins.clone_bpd.shared_clones.clear()
+
+        code_cache.save()
+
+    for callback in exec_callbacks:
+        try:
+            callback(file_path)
+        except Exception:  # noqa: BLE001
+            traceback.print_exc()
+
+
+def run_group(name: str, group: list[parse_cache.PositionedMatch]) -> None:
+    if len(group) > 1 and (handler := get_batch_handler(name)) is not None:
+        handler([(line, cmd_len) for _, line, cmd_len, *_ in group])
+        return
+
+    for cmd, line, cmd_len, *_ in group:
+        run_command(cmd, line, cmd_len)
+
+
+def run_profiled(
+    profile: profiler.FileStats,
+    name: str,
+    match: parse_cache.PositionedMatch,
+) -> None:
+    cmd, line, cmd_len, line_number, *_ = match
+    failed = True
+    start = time.perf_counter()
+    try:
+        failed = not run_command(cmd, line, cmd_len)
+    finally:
+        profile.record(name, time.perf_counter() - start, line_number, line, failed)
+
+
+def run_command(cmd: str, line: str, cmd_len: int) -> bool:
+    """
+    Runs a single custom command.
+
+    Args:
+        cmd: The command name, as matched.
+        line: The full line.
+        cmd_len: The length of the command, within the line.
+    Returns:
+        False if the command caught and logged an error, true otherwise.
+    """
+    name = cmd.lower()
+    match name:
+        case "py":
+            try:
+                code = code_cache.compile_cached(line[cmd_len:].lstrip())
+                exec(code, py_globals)  # noqa: S102
+            except Exception:  # noqa: BLE001
+                logging.error("Error occurred during 'py' command:")
+                logging.error(line)
+                traceback.print_exc()
+                return False
+
+        case "pyexec":
+            try:
+                path = PYEXEC_ROOT / line[cmd_len:].strip()
+                with path.open() as file:
+                    code = code_cache.compile_cached(file.read(), str(path))
+                # To match pyunrealsdk, each pyexec gets a new empty of globals
+                exec(code, {"__file__": str(path)})  # noqa: S102
+            except Exception:  # noqa: BLE001
+                logging.error("Error occurred during 'pyexec' command:")
+                logging.error(line)
+                traceback.print_exc()
+                return False
+
+        case _:
+            if name in command_map:
+                command_map[name]._handle_cmd(line, cmd_len)  # pyright: ignore[reportPrivateUsage]
+
+    return True
 
 
 # endregion
@@ -228,18 +532,169 @@ def exec_command_hook(
     if cmd != "exec":
         return
 
-    parse_exec_command(file_name)
+    if (file_path := resolve_exec_target(file_name)) is not None:
+        scheduler.run(iter_top_level_exec(file_path))
+
+
+@command(
+    "CE_ReexecChanged",
+    splitter=lambda m: [m.lstrip()],
+    description=(
+        "Re-executes a file, but only runs the custom commands which have been added or changed"
+        " since it was last executed. Any files it execs are handled the same way. The file's"
+        " regular commands are all run as normal.\n"
+        "\n"
+        "This is intended to speed up iterating on large mods. It does not undo removed commands,"
+        " and commands which rely on earlier ones having run in the same exec (e.g. 'py' commands"
+        " using previously defined variables) may not work."
+    ),
+)
+def ce_reexecchanged(args: argparse.Namespace) -> None:
+    file_name = " ".join(args.file)
+    if not file_name.strip():
+        logging.error("No file specified")
+        return
+    if (file_path := resolve_exec_target(file_name)) is None:
+        logging.error(f"Couldn't find file '{file_name}'")
+        return
+
+    scheduler.run(iter_top_level_exec(file_path, only_changed=True))
+
+    # Run the regular commands without going through our hook again
+    with prevent_hooking_direct_calls():
+        get_pc().ConsoleCommand("exec " + file_name)
+
+
+ce_reexecchanged.add_argument(
+    "file",
+    help="The file to execute, the same as would be passed to 'exec'.",
+    # This doesn't do anything cause of the custom splitter, but it looks better in the help text
+    nargs=argparse.REMAINDER,
+)
+
+
+def profile_splitter(args: str) -> list[str]:
+    """
+    Splits the args to CE_Profile, keeping the file name as a single arg, even if it has spaces.
+
+    Args:
+        args: A string of arguments
+    Returns:
+        A list of individual arguments split out from the input string.
+    """
+    args = args.lstrip()
+    flag, _, file_name = args.partition(" ")
+    if flag == "--json":
+        return [flag, file_name.lstrip()]
+    return [args]
+
+
+@command(
+    "CE_Profile",
+    splitter=profile_splitter,
+    description=(
+        "Executes a file, recording how long each of its custom commands take. Once done, prints a"
+        " report of the parse time and the per command call counts, total/mean/max times, errors,"
+        " and slowest line of each file it executed, ranked by total time. Nested execs are"
+        " included, and their time is also counted under 'exec' in the parent file. The file's"
+        " regular commands are run as normal, but are not profiled."
+    ),
+)
+def ce_profile(args: argparse.Namespace) -> None:
+    file_name = " ".join(args.file)
+    if not file_name.strip():
+        logging.error("No file specified")
+        return
+    if (file_path := resolve_exec_target(file_name)) is None:
+        logging.error(f"Couldn't find file '{file_name}'")
+        return
+    if profiler.is_enabled():
+        logging.error("Already profiling another file")
+        return
+
+    json_path = file_path.with_name(file_path.name + ".profile.json") if args.json else None
+    scheduler.run(iter_profiled_exec(file_path, json_path))
+
+    with prevent_hooking_direct_calls():
+        get_pc().ConsoleCommand("exec " + file_name)
 
-    # Reset the py command's globals between files
-    py_globals.clear()
-    py_globals.update(DEFAULT_PY_GLOBALS)
+
+ce_profile.add_argument(
+    "--json",
+    action="store_true",
+    help="Also write the report to a '.profile.json' file next to the executed file.",
+)
+ce_profile.add_argument(
+    "file",
+    help="The file to execute, the same as would be passed to 'exec'.",
+    # This doesn't do anything cause of the custom splitter, but it looks better in the help text
+    nargs=argparse.REMAINDER,
+)
+
+
+def iter_profiled_exec(file_path: Path, json_path: Path | None) -> Iterator[None]:
+    """
+    Executes a file while profiling, then reports the results.
+
+    Args:
+        file_path: The file to execute.
+        json_path: If not None, the path to write a json report to.
+    Yields:
+        After running each command.
+    """
+    profiler.start()
+    try:
+        yield from iter_top_level_exec(file_path)
+    finally:
+        results = profiler.stop()
+
+        for line in profiler.get_report(results):
+            logging.info(line)
+        if json_path is not None:
+            try:
+                profiler.write_json(results, json_path)
+                logging.info(f"Wrote profile to '{json_path}'")
+            except OSError:
+                logging.error(f"Failed to write profile to '{json_path}'")
+                traceback.print_exc()
+
+
+@command(
+    "CE_Budget",
+    description=(
+        "Sets the maximum time to spend running custom commands each tick. When a file takes"
+        " longer than this, its remaining custom commands are run over the following ticks,"
+        " rather than freezing the game until they're done. Note this means they may run after"
+        " the file's regular commands. When used inside a mod file, only applies until that file"
+        " finishes executing."
+    ),
+)
+def ce_budget(args: argparse.Namespace) -> None:
+    if args.ms < 0:
+        logging.error("Budget cannot be negative")
+        return
+
+    scheduler.set_budget(args.ms / 1000)
+    if scheduler.current is None:
+        if args.ms == 0:
+            logging.info("Custom commands will always run to completion immediately")
+        else:
+            logging.info(f"Custom commands will now run for at most {args.ms:g}ms each tick")
+
+
+ce_budget.add_argument(
+    "ms",
+    type=float,
+    help="The budget, in milliseconds. 0 removes the limit.",
+)
 
 
 @command(
     "CE_Debug",
     description=(
         "Enables/disables Command Extension debug logging. This logs a copy of each command to be"
-        " run, useful for checking that your blcm files are being handled correctly."
+        " run, useful for checking that your blcm files are being handled correctly. 'Stats'"
+        " instead prints statistics about Command Extension's internal caches."
     ),
 )
 def ce_debug(args: argparse.Namespace) -> None:
@@ -250,11 +705,41 @@ def ce_debug(args: argparse.Namespace) -> None:
     elif args.value == "Disable":
         debug_logging = False
         logging.info("Command Extensions debug logging disabled")
+    elif args.value == "Stats":
+        for line in (
+            *parse_cache.get_stats(),
+            *code_cache.get_stats(),
+            *object_cache.get_stats(),
+            *builtins.set_early.get_stats(),
+        ):
+            logging.info(line)
+        logging.info(f"Pending execs: {scheduler.get_pending_count()}")
     else:
         logging.error(f"Unrecognised value '{args.value}'")
 
 
-ce_debug.add_argument("value", type=str.title, choices=("Enable", "Disable"))
+ce_debug.add_argument("value", type=str.title, choices=("Enable", "Disable", "Stats"))
+
+
+@command(
+    "CE_ClearCache",
+    description=(
+        "Clears Command Extension's caches of parsed mod files, compiled Python code, and found"
+        " objects. This should never be required, the caches are automatically invalidated"
+        " whenever a file, the set of registered commands, or the map changes."
+    ),
+)
+def ce_clearcache(_: argparse.Namespace) -> None:
+    for line in (
+        *parse_cache.get_stats(),
+        *code_cache.get_stats(),
+        *object_cache.get_stats(),
+    ):
+        logging.info(line)
+
+    logging.info(f"Cleared {parse_cache.clear()} cached mod files")
+    logging.info(f"Cleared {code_cache.clear()} cached code objects")
+    logging.info(f"Cleared {object_cache.clear()} cached objects")
 
 
 @command(
@@ -313,9 +798,13 @@ add_compat_module("Mods.CommandExtensions.builtins", legacy_compat_builtins)
 mod = build_mod(
     cls=Library,
     commands=(
+        ce_budget,
+        ce_clearcache,
         ce_debug,
         ce_enableon,
         ce_newcmd,
+        ce_profile,
+        ce_reexecchanged,
         chat,
         clone_bpd,
         clone_dbg_suppress_exists,
@@ -331,6 +820,7 @@ mod = build_mod(
     ),
     hooks=(
         exec_command_hook,
+        object_cache.map_change_hook,
         server_say_hook,
     ),
 )
@@ -1,14 +1,19 @@
 import re
 import shlex
+from collections.abc import Callable, Sequence
 
-import unrealsdk
+from mods_base import AbstractCommand
 from unrealsdk import logging
 from unrealsdk.unreal import UObject
 
+from command_extensions import object_cache
+
 __all__: tuple[str, ...] = (
     "RE_OBJ_NAME",
+    "add_batch_handler",
     "obj_name_splitter",
     "parse_object",
+    "shlex_obj_name_splitter",
 )
 
 """
@@ -27,12 +32,15 @@ RE_OBJ_NAME = re.compile(
 )
 
 
-def obj_name_splitter(args: str) -> list[str]:
+def shlex_obj_name_splitter(args: str) -> list[str]:
     """
     Custom argument splitter that returns object names as single tokens.
 
     Note that this makes the splitting less versatile - quoting is completely gone for example.
 
+    This is the pure Python implementation, `obj_name_splitter` uses the faster native version if
+    it's available, which gives identical results.
+
     Args:
         args: A string of arguments
     Returns:
@@ -45,11 +53,20 @@ def obj_name_splitter(args: str) -> list[str]:
     return list(lex)
 
 
+obj_name_splitter: Callable[[str], list[str]]
+try:
+    from command_extensions.file_parser import split_obj_names as obj_name_splitter
+except ImportError:
+    # An outdated build of the native module
+    obj_name_splitter = shlex_obj_name_splitter
+
+
 def parse_object(name: str) -> UObject | None:
     """
     Given an object name, returns the object.
 
-    If it's unable to parse or find the object, logs an error to console and returns None.
+    If it's unable to parse or find the object, logs an error to console and returns None. Found
+    objects are cached, so looking up the same name again is cheap.
 
     Args:
         name: The object name to look for
@@ -64,7 +81,47 @@ def parse_object(name: str) -> UObject | None:
     class_ = match.group("class") or "Object"
     fullname = match.group("fullname")
     try:
-        return unrealsdk.find_object(class_, fullname)
+        return object_cache.find_object(class_, fullname)
     except ValueError:
         logging.error(f"Unable to find object {name}")
         return None
+
+
+def add_batch_handler(
+    cmd: AbstractCommand,
+    splitter: Callable[[str], list[str]],
+    num_args: int,
+    handler: Callable[..., None],
+    *,
+    on_batch: Callable[[], None] | None = None,
+) -> None:
+    """
+    Adds a `_handle_cmd_batch` method to a command, which avoids argparse for simple lines.
+
+    When a mod file contains several of the same command in a row, they're all passed to this method
+    at once. Any lines which split into exactly the given number of arguments, none of which look
+    like options, are passed straight to the handler. Anything else is passed to the command's
+    standard `_handle_cmd`.
+
+    Since nothing else runs in between the lines of a batch, the handler may cache state which would
+    be unsafe to keep for longer. `on_batch` is called before each batch, to reset it.
+
+    Args:
+        cmd: The command to add the method to.
+        splitter: The command's splitter.
+        num_args: The number of positional arguments the command takes.
+        handler: The function to call for simple lines, called with each argument positionally.
+        on_batch: If not None, called before each batch is handled.
+    """
+
+    def handle_cmd_batch(lines: Sequence[tuple[str, int]]) -> None:
+        if on_batch is not None:
+            on_batch()
+        for line, cmd_len in lines:
+            args = splitter(line[cmd_len:])
+            if len(args) != num_args or any(arg.startswith("-") for arg in args):
+                cmd._handle_cmd(line, cmd_len)  # pyright: ignore[reportPrivateUsage]
+            else:
+                handler(*args)
+
+    cmd._handle_cmd_batch = handle_cmd_batch  # pyright: ignore[reportAttributeAccessIssue]
@@ -6,7 +6,7 @@ from mods_base import command
 from unrealsdk import logging
 from unrealsdk.unreal import UObject
 
-from . import RE_OBJ_NAME, obj_name_splitter, parse_object
+from . import RE_OBJ_NAME, add_batch_handler, obj_name_splitter, parse_object
 
 suppress_exists_warning: bool = False
 
@@ -72,18 +72,31 @@ def parse_clone_target(name: str, src_class: str) -> tuple[UObject | None, str]
     return dst_outer_object, dst_match.group("name")
 
 
-@command(splitter=obj_name_splitter, description="Creates a clone of an existing object.")
-def clone(args: argparse.Namespace) -> None:  # noqa: D103
-    src = parse_object(args.base)
+def clone_by_name(base: str, clone_name: str) -> None:
+    """
+    Clones an object, given the names of the source object and the clone.
+
+    If unable to, logs an error to console.
+
+    Args:
+        base: The name of the object to create a copy of.
+        clone_name: The name of the clone to create.
+    """
+    src = parse_object(base)
     if src is None:
         return
-    outer, name = parse_clone_target(args.clone, src.Class.Name)
+    outer, name = parse_clone_target(clone_name, src.Class.Name)
     if name is None:
         return
 
     clone_object(src, outer, name)
 
 
+@command(splitter=obj_name_splitter, description="Creates a clone of an existing object.")
+def clone(args: argparse.Namespace) -> None:  # noqa: D103
+    clone_by_name(args.base, args.clone)
+
+
 clone.add_argument("base", help="The object to create a copy of.")
 clone.add_argument("clone", help="The name of the clone to create.")
 clone.add_argument(
@@ -92,6 +105,7 @@ clone.add_argument(
     action="store_true",
     help="Deprecated, does nothing. See 'clone_dbg_suppress_exists' instead.",
 )
+add_batch_handler(clone, obj_name_splitter, 2, clone_by_name)
 
 
 @command(
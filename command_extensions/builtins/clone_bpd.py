@@ -1,6 +1,8 @@
 import argparse
 import functools
-from collections.abc import Callable
+import time
+from collections.abc import Callable, Iterator, MutableMapping
+from dataclasses import dataclass, field
 
 import unrealsdk
 from mods_base import command
@@ -11,84 +13,207 @@ from . import obj_name_splitter, parse_object
 from .clone import clone_object, parse_clone_target
 
 
-# There are a bunch of different fields skills can be stored in, hence the field arg
-def fixup_skill_field(field: str, behavior: UObject, known_clones: dict[UObject, UObject]) -> None:
+@dataclass
+class CloneState:
     """
-    Clones skills referenced in skill bpds, as well as other bpds stored on those skills.
+    Tracks the progress of cloning a BPD and everything it references.
+
+    Attributes:
+        known_clones: A dict of objects to their clones, used to prevent double-cloning.
+        pending_bpds: Cloned BPDs found by a fixup, which still need to be looked through.
+        num_cloned: How many objects have been cloned so far.
+    """
+
+    known_clones: dict[UObject, UObject]
+    pending_bpds: list[UObject] = field(default_factory=list[UObject])
+    num_cloned: int = 0
+
+
+type BehaviorFixup = Callable[[UObject, CloneState], None]
+# Fixups written before the clone state existed only receive the known clones dict
+type LegacyBehaviorFixup = Callable[[UObject, dict[UObject, UObject]], None]
+
+"""
+Dict of objects to their clones, shared between all `clone_bpd --share` calls in the same file.
+Cleared after each file finishes executing.
+"""
+shared_clones: dict[UObject, UObject] = {}
+
+
+def clone_subobject(src: UObject, outer: UObject, state: CloneState) -> UObject | None:
+    """
+    Clones an object referenced by something which was already cloned.
+
+    Args:
+        src: The object to clone.
+        outer: The outer object the clone should be created under.
+        state: The current clone state, to record the clone in.
+    Returns:
+        The cloned object, or None if it failed to clone.
+    """
+    # Empty string gives us the auto numbering back
+    cloned = clone_object(src, outer, "" if src.Name == src.Class.Name else src.Name)
+    if cloned is None:
+        return None
+
+    state.known_clones[src] = cloned
+    state.num_cloned += 1
+    return cloned
+
+
+# There are a bunch of different fields skills can be stored in, hence the field_name arg
+def fixup_skill_field(
+    field_name: str,
+    behavior: UObject,
+    state: CloneState | dict[UObject, UObject],
+) -> None:
+    """
+    Clones skills referenced in skill bpds, and queues up other bpds stored on those skills.
 
     Args:
-        field: The name of the field on the behavior object which the skill's stored in.
+        field_name: The name of the field on the behavior object which the skill's stored in.
         behavior: The behavior object which references a skill.
-        known_clones: A dict of objects to their clones, used to prevent double-cloning.
+        state: The current clone state. For backwards compatibility, may also be a known clones
+               dict, in which case any bpd on the skill is looked through immediately.
     """
-    skill = getattr(behavior, field)
+    if isinstance(state, dict):
+        legacy_state = CloneState(state)
+        fixup_skill_field(field_name, behavior, legacy_state)
+        while legacy_state.pending_bpds:
+            fixup_bpd(legacy_state.pending_bpds.pop(0), legacy_state)
+        return
+
+    skill = getattr(behavior, field_name)
     if skill is None:
         return
 
-    if skill in known_clones:
-        setattr(behavior, field, known_clones[skill])
+    if skill in state.known_clones:
+        setattr(behavior, field_name, state.known_clones[skill])
         return
 
-    cloned_skill = clone_object(
-        skill,
-        behavior,
-        # Empty string gives us the auto numbering back
-        "" if skill.Name == skill.Class.Name else skill.Name,
-    )
+    cloned_skill = clone_subobject(skill, behavior, state)
     if cloned_skill is None:
         return
-    known_clones[skill] = cloned_skill
 
-    setattr(behavior, field, cloned_skill)
+    setattr(behavior, field_name, cloned_skill)
 
     bpd = cloned_skill.BehaviorProviderDefinition
     if bpd is None:
         return
 
-    if bpd in known_clones:
-        cloned_skill.BehaviorProviderDefinition = known_clones[bpd]
+    if bpd in state.known_clones:
+        cloned_skill.BehaviorProviderDefinition = state.known_clones[bpd]
         return
 
-    cloned_bpd = clone_object(bpd, cloned_skill, "" if bpd.Name == bpd.Class.Name else bpd.Name)
+    cloned_bpd = clone_subobject(bpd, cloned_skill, state)
     if cloned_bpd is None:
         return
-    known_clones[bpd] = cloned_bpd
 
     cloned_skill.BehaviorProviderDefinition = cloned_bpd
-    fixup_bpd(cloned_bpd, known_clones)
+    state.pending_bpds.append(cloned_bpd)
+
+
+# Dict mapping each behavior class we've seen to the fixups which apply to it
+fixup_cache: dict[UClass, tuple[BehaviorFixup, ...]] = {}
+
+
+class BehaviorFixupRegistry(MutableMapping[UClass, BehaviorFixup | LegacyBehaviorFixup]):
+    """
+    Dict-like registry of behavior classes to functions that perform extra fixups on them.
+
+    Fixups added using `register` receive the current `CloneState`. Fixups assigned like a dict
+    entry keep the old call shape, and receive just the known clones dict.
+
+    Any change automatically clears `fixup_cache`.
+    """
+
+    def __init__(self) -> None:
+        # Each class maps to the fixup as it was added, and the function to actually call
+        self._fixups: dict[UClass, tuple[BehaviorFixup | LegacyBehaviorFixup, BehaviorFixup]] = {}
+
+    def register(self, cls: UClass, fixup: BehaviorFixup) -> None:
+        """
+        Adds a fixup which receives the current clone state.
+
+        Args:
+            cls: The behavior class to run the fixup on, including subclasses.
+            fixup: The fixup function.
+        """
+        self._fixups[cls] = (fixup, fixup)
+        fixup_cache.clear()
+
+    def __setitem__(self, cls: UClass, fixup: BehaviorFixup | LegacyBehaviorFixup) -> None:
+        # Anything assigned directly was written against the old dict, so assume the old call shape
+        def adapter(behavior: UObject, state: CloneState) -> None:
+            fixup(behavior, state.known_clones)  # pyright: ignore[reportArgumentType]
+
+        self._fixups[cls] = (fixup, adapter)
+        fixup_cache.clear()
+
+    def __getitem__(self, cls: UClass) -> BehaviorFixup | LegacyBehaviorFixup:
+        return self._fixups[cls][0]
+
+    def __delitem__(self, cls: UClass) -> None:
+        del self._fixups[cls]
+        fixup_cache.clear()
+
+    def __iter__(self) -> Iterator[UClass]:
+        return iter(self._fixups)
+
+    def __len__(self) -> int:
+        return len(self._fixups)
+
+    def resolve(self, cls: UClass) -> tuple[BehaviorFixup, ...]:
+        """
+        Gets all the extra fixups which apply to a behavior class, including those from its parents.
+
+        Args:
+            cls: The behavior class.
+        Returns:
+            The fixups to run on behaviors of this class.
+        """
+        if (fixups := fixup_cache.get(cls)) is None:
+            fixups = tuple(
+                fixup for fixup_cls, (_, fixup) in self._fixups.items() if cls._inherits(fixup_cls)
+            )
+            fixup_cache[cls] = fixups
+        return fixups
 
 
 """
-Dict mapping behavior class names to functions that perform extra fixups on them, incase there are
- extra objects that need to be cloned.
+Registry of behavior classes to functions that perform extra fixups on them, incase there are extra
+ objects that need to be cloned.
 """
-extra_behaviour_fixups: dict[UClass, Callable[[UObject, dict[UObject, UObject]], None]] = {
-    unrealsdk.find_class("Behavior_AttributeEffect"): functools.partial(
-        fixup_skill_field,
-        "AttributeEffect",
-    ),
-    unrealsdk.find_class("Behavior_ActivateSkill"): functools.partial(
-        fixup_skill_field,
-        "SkillToActivate",
-    ),
-    unrealsdk.find_class("Behavior_ActivateListenerSkill"): functools.partial(
-        fixup_skill_field,
-        "SkillToActivate",
-    ),
-    unrealsdk.find_class("Behavior_DeactivateSkill"): functools.partial(
-        fixup_skill_field,
-        "SkillToDeactivate",
-    ),
-}
+extra_behaviour_fixups = BehaviorFixupRegistry()
+extra_behaviour_fixups.register(
+    unrealsdk.find_class("Behavior_AttributeEffect"),
+    functools.partial(fixup_skill_field, "AttributeEffect"),
+)
+extra_behaviour_fixups.register(
+    unrealsdk.find_class("Behavior_ActivateSkill"),
+    functools.partial(fixup_skill_field, "SkillToActivate"),
+)
+extra_behaviour_fixups.register(
+    unrealsdk.find_class("Behavior_ActivateListenerSkill"),
+    functools.partial(fixup_skill_field, "SkillToActivate"),
+)
+extra_behaviour_fixups.register(
+    unrealsdk.find_class("Behavior_DeactivateSkill"),
+    functools.partial(fixup_skill_field, "SkillToDeactivate"),
+)
 
 
-def fixup_bpd(cloned: UObject, known_clones: dict[UObject, UObject]) -> None:
+def iter_fixup_behaviors(cloned: UObject, state: CloneState) -> Iterator[None]:
     """
-    Looks through a BPD for subobjects which still need to be cloned.
+    Looks through a single BPD for subobjects which still need to be cloned.
+
+    Yields whenever a fixup finds nested BPDs, so that they can be looked through before continuing.
 
     Args:
         cloned: The cloned BPD.
-        known_clones: A dict of objects to their clones, used to prevent double-cloning.
+        state: The current clone state.
+    Yields:
+        None, each time there are new pending BPDs.
     """
     for sequence in cloned.BehaviorSequences:
         # There are a bunch of other fields, but this seems to be the only used one
@@ -97,24 +222,50 @@ def fixup_bpd(cloned: UObject, known_clones: dict[UObject, UObject]) -> None:
             if behavior is None:
                 continue
 
-            if behavior in known_clones:
-                data.Behavior = known_clones[behavior]
+            if behavior in state.known_clones:
+                data.Behavior = state.known_clones[behavior]
                 continue
 
-            cloned_behavior = clone_object(
-                behavior,
-                cloned,
-                "" if behavior.Name == behavior.Class.Name else behavior.Name,
-            )
+            cloned_behavior = clone_subobject(behavior, cloned, state)
             if cloned_behavior is None:
                 continue
-            known_clones[behavior] = cloned_behavior
 
             data.Behavior = cloned_behavior
 
-            for cls, fixup in extra_behaviour_fixups.items():
-                if cloned_behavior.Class._inherits(cls):
-                    fixup(cloned_behavior, known_clones)
+            for fixup in extra_behaviour_fixups.resolve(cloned_behavior.Class):
+                fixup(cloned_behavior, state)
+                if state.pending_bpds:
+                    yield
+
+
+def fixup_bpd(cloned: UObject, state: CloneState | dict[UObject, UObject]) -> None:
+    """
+    Looks through a BPD, and all the BPDs nested inside it, for subobjects which need to be cloned.
+
+    Args:
+        cloned: The cloned root BPD.
+        state: The current clone state. For backwards compatibility, may also be a known clones
+               dict.
+    """
+    if isinstance(state, dict):
+        state = CloneState(state)
+
+    # Rather than recursing, keep a stack of the BPDs we're part way through. Nested BPDs are still
+    # looked through as soon as they're found, so that everything is cloned in the same order, and
+    # under the same outers, as a recursive walk would.
+    stack: list[Iterator[None]] = []
+    state.pending_bpds.append(cloned)
+    while True:
+        # If a fixup found multiple, make sure we finish the first before starting the next
+        stack.extend(iter_fixup_behaviors(bpd, state) for bpd in reversed(state.pending_bpds))
+        state.pending_bpds.clear()
+        if not stack:
+            break
+
+        try:
+            next(stack[-1])
+        except StopIteration:
+            stack.pop()
 
 
 @command(
@@ -126,6 +277,8 @@ def fixup_bpd(cloned: UObject, known_clones: dict[UObject, UObject]) -> None:
     ),
 )
 def clone_bpd(args: argparse.Namespace) -> None:  # noqa: D103
+    start = time.perf_counter()
+
     src = parse_object(args.base)
     if src is None:
         return
@@ -140,11 +293,32 @@ def clone_bpd(args: argparse.Namespace) -> None:  # noqa: D103
     cloned = clone_object(src, outer, name)
     if cloned is None:
         return
-    fixup_bpd(cloned, {})
+
+    state = CloneState(shared_clones if args.share else {}, num_cloned=1)
+    fixup_bpd(cloned, state)
+
+    if args.stats:
+        logging.info(
+            f"Cloned {state.num_cloned} objects in {(time.perf_counter() - start) * 1000:.2f}ms",
+        )
 
 
 clone_bpd.add_argument("base", help="The bpd to create a copy of.")
 clone_bpd.add_argument("clone", help="The name of the clone to create.")
+clone_bpd.add_argument(
+    "-s",
+    "--share",
+    action="store_true",
+    help=(
+        "Reuse the clones of any subobjects which were already cloned by a previous 'clone_bpd"
+        " --share' in the same file, rather than cloning them again."
+    ),
+)
+clone_bpd.add_argument(
+    "--stats",
+    action="store_true",
+    help="Print how many objects were cloned, and how long it took.",
+)
 clone_bpd.add_argument(
     "-x",
     "--suppress-exists",
@@ -2,7 +2,27 @@ import argparse
 
 from mods_base import command
 
-from . import obj_name_splitter, parse_object
+from . import add_batch_handler, obj_name_splitter, parse_object
+
+
+def keep_alive_by_name(name: str, undo: bool = False) -> None:
+    """
+    Keeps an object alive, given its name.
+
+    If unable to find the object, logs an error to console.
+
+    Args:
+        name: The name of the object.
+        undo: If true, reverses a previous call instead.
+    """
+    obj = parse_object(name)
+    if obj is None:
+        return
+
+    if undo:
+        obj.ObjectFlags &= ~0x4000
+    else:
+        obj.ObjectFlags |= 0x4000
 
 
 @command(
@@ -13,14 +33,7 @@ from . import obj_name_splitter, parse_object
     ),
 )
 def keep_alive(args: argparse.Namespace) -> None:  # noqa: D103
-    obj = parse_object(args.object)
-    if obj is None:
-        return
-
-    if args.undo:
-        obj.ObjectFlags &= ~0x4000
-    else:
-        obj.ObjectFlags |= 0x4000
+    keep_alive_by_name(args.object, args.undo)
 
 
 keep_alive.add_argument("object", help="The object to keep alive.")
@@ -30,3 +43,4 @@ keep_alive.add_argument(
     action="store_true",
     help="Undo a previous keep alive call.",
 )
+add_batch_handler(keep_alive, obj_name_splitter, 1, keep_alive_by_name)
@@ -1,35 +1,270 @@
 import argparse
+import bisect
 import fnmatch
 import itertools
+import json
+import os
 import sys
+import time
+import traceback
+from collections import deque
+from collections.abc import Callable, Sequence
+from contextlib import suppress
+from dataclasses import dataclass, field
 from pathlib import Path
 
 import unrealsdk
-from mods_base import command
+from mods_base import SETTINGS_DIR, command, get_pc
 from unrealsdk import logging
 
+from command_extensions import object_cache, scheduler
+
 game_dir = Path(sys.executable).parent.parent.parent
-all_upks = sorted(
-    upk.stem
-    for upk in itertools.chain(
-        (game_dir / "WillowGame" / "CookedPCConsole").glob("*.upk"),
-        ((game_dir / "DLC").glob("*/*/Content/*.upk")),
-    )
-)
+cooked_dir = game_dir / "WillowGame" / "CookedPCConsole"
+dlc_dir = game_dir / "DLC"
+
+INDEX_CACHE_FILE = SETTINGS_DIR / "command_extensions" / "upk_index.json"
+INDEX_CACHE_VERSION = 1
+
+GLOB_CHARS = "*?["
+
+
+@dataclass
+class PackageIndex:
+    """
+    An index of all known packages, for quickly matching glob patterns against them.
+
+    Attributes:
+        names: All package names, sorted by their normalized names.
+        keys: The normalized name of each package, in the same order.
+    """
+
+    names: list[str]
+    keys: list[str]
+
+    @classmethod
+    def from_names(cls, names: list[str]) -> "PackageIndex":
+        """
+        Creates a new index.
+
+        Args:
+            names: The package names to index, in any order.
+        Returns:
+            The new index.
+        """
+        # fnmatch is case insensitive on Windows, make sure we match it
+        pairs = sorted((os.path.normcase(name), name) for name in names)
+        return cls([name for _, name in pairs], [key for key, _ in pairs])
+
+    def match(self, pattern: str) -> list[str]:
+        """
+        Finds all packages matching a glob pattern.
+
+        Args:
+            pattern: The glob pattern to match.
+        Returns:
+            The matching package names.
+        """
+        # Anything before the first wildcard must match exactly, so we only need to look at the
+        # range of packages starting with it
+        wildcard_idx = next((idx for idx, c in enumerate(pattern) if c in GLOB_CHARS), len(pattern))
+        prefix = os.path.normcase(pattern[:wildcard_idx])
+
+        start = bisect.bisect_left(self.keys, prefix)
+        end = start
+        while end < len(self.keys) and self.keys[end].startswith(prefix):
+            end += 1
+
+        return fnmatch.filter(self.names[start:end], pattern)
+
+
+package_index: PackageIndex | None = None
+
+
+def get_index_key() -> dict[str, int]:
+    """
+    Gets the modify times of all directories which may contain packages.
+
+    Adding or removing a package changes the modify time of its directory, so if these haven't
+    changed, neither has the set of packages.
+
+    Returns:
+        A dict mapping each directory to its modify time.
+    """
+    dirs = [cooked_dir, dlc_dir]
+    with suppress(OSError):
+        dlcs = [path for path in dlc_dir.iterdir() if path.is_dir()]
+        dirs.extend(dlcs)
+        for dlc in dlcs:
+            for path in dlc.iterdir():
+                if path.is_dir():
+                    dirs.append(path)
+                    dirs.append(path / "Content")
+
+    key: dict[str, int] = {}
+    for path in dirs:
+        with suppress(OSError):
+            key[str(path)] = path.stat().st_mtime_ns
+    return key
+
+
+def load_cached_index(key: dict[str, int]) -> list[str] | None:
+    """
+    Tries to load the package names from the on disk cache.
+
+    Args:
+        key: The current index key.
+    Returns:
+        The cached package names, or None if the cache doesn't exist or is out of date.
+    """
+    with suppress(OSError, ValueError, TypeError, KeyError, AttributeError):
+        with INDEX_CACHE_FILE.open() as file:
+            cached = json.load(file)
+        if cached["version"] != INDEX_CACHE_VERSION or cached["key"] != key:
+            return None
+        return [str(name) for name in cached["packages"]]
+    return None
+
+
+def save_cached_index(key: dict[str, int], names: list[str]) -> None:
+    """
+    Writes the package names to the on disk cache.
+
+    Args:
+        key: The current index key.
+        names: The package names.
+    """
+    with suppress(OSError):
+        INDEX_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first, so we never leave a half written cache if something goes wrong
+        temp_path = INDEX_CACHE_FILE.with_suffix(".tmp")
+        with temp_path.open("w") as file:
+            json.dump({"version": INDEX_CACHE_VERSION, "key": key, "packages": names}, file)
+        temp_path.replace(INDEX_CACHE_FILE)
+
+
+def get_package_index() -> PackageIndex:
+    """
+    Gets the index of all known packages, building it on first use.
+
+    Returns:
+        The package index.
+    """
+    global package_index
+    if package_index is not None:
+        return package_index
+
+    key = get_index_key()
+    names = load_cached_index(key)
+    if names is None:
+        names = [
+            upk.stem
+            for upk in itertools.chain(
+                cooked_dir.glob("*.upk"),
+                dlc_dir.glob("*/*/Content/*.upk"),
+            )
+        ]
+        save_cached_index(key, names)
+
+    package_index = PackageIndex.from_names(names)
+    return package_index
+
+
+@dataclass
+class AsyncLoad:
+    # The packages which still need to be loaded
+    packages: deque[str]
+    # Run once all packages have been loaded
+    callback: Callable[[], None] | None = None
+    # The max time to spend loading packages each tick, in seconds. 0 means one package per tick.
+    budget: float = 0
+    total: int = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.total = len(self.packages)
+
+
+# Loads waiting to run, the first one may be partially complete
+pending_loads: deque[AsyncLoad] = deque()
+
+
+def load_packages_async(
+    packages: Sequence[str],
+    callback: Callable[[], None] | None = None,
+    budget: float = 0,
+) -> None:
+    """
+    Loads a set of packages over the following engine ticks, to avoid freezing the game.
+
+    If other async loads are already running, these packages are loaded after them.
+
+    Args:
+        packages: The names of the packages to load.
+        callback: If not None, called once all the packages have been loaded.
+        budget: The max time to spend loading packages each tick, in seconds. At least one package
+                is always loaded per tick. 0 means exactly one package per tick.
+    """
+    pending_loads.append(AsyncLoad(deque(packages), callback, budget))
+    scheduler.add_tick_callback(run_load_slice)
+
+
+def run_load_slice() -> bool:
+    """
+    Loads pending packages until we run out of time this tick.
+
+    Returns:
+        True if there are still packages left to load.
+    """
+    start = time.perf_counter()
+    while pending_loads:
+        current = pending_loads[0]
+        while current.packages:
+            package = current.packages.popleft()
+            loaded = current.total - len(current.packages)
+            try:
+                unrealsdk.load_package(package)
+            except Exception:  # noqa: BLE001
+                # Skip it and carry on with the rest, rather than leaving the hook stuck retrying
+                logging.error(f"Failed to load package {loaded}/{current.total}: {package}")
+                traceback.print_exc()
+            else:
+                logging.info(f"Loaded package {loaded}/{current.total}: {package}")
+            # Even a failed load may have loaded some objects
+            object_cache.invalidate()
+
+            if current.packages and time.perf_counter() - start >= current.budget:
+                return True
+
+        pending_loads.popleft()
+        if current.callback is not None:
+            try:
+                current.callback()
+            except Exception:  # noqa: BLE001
+                traceback.print_exc()
+        # Don't start on the next load in the same tick, it may have a different budget
+        if pending_loads:
+            return True
+
+    return False
 
 
 @command(
     description=(
         "Loads a package and all objects contained within it. This freezes the game as it loads; it"
         " should be used sparingly. Supports using glob-style wildcards to load up to 10 packages"
-        " at once, though being explicit should still be preferred."
+        " at once, though being explicit should still be preferred. Using --async instead loads the"
+        " packages over the following ticks, without a limit on how many."
     ),
 )
 def load_package(args: argparse.Namespace) -> None:  # noqa: D103
-    upks = fnmatch.filter(all_upks, args.package)
+    if not args.async_ and (args.budget is not None or args.exec is not None):
+        load_package.parser.error("--budget and --exec can only be used with --async")
+
+    index = get_package_index()
+    upks = index.match(args.package)
 
     if args.list:
-        if upks == all_upks:
+        if len(upks) == len(index.names):
             logging.info("All known packages:")
         else:
             logging.info(f"Packages matching '{args.package}':")
@@ -40,11 +275,20 @@ def load_package(args: argparse.Namespace) -> None:  # noqa: D103
 
     if len(upks) <= 0:
         logging.info(f"Could not find package '{args.package}'!")
+    elif args.async_:
+        exec_file: str | None = args.exec
+        load_packages_async(
+            upks,
+            None if exec_file is None else lambda: get_pc().ConsoleCommand(f'exec "{exec_file}"'),
+            0 if args.budget is None else args.budget / 1000,
+        )
     elif len(upks) > 10:  # noqa: PLR2004
         logging.info(f"'{args.package}' matches more than 10 packages!")
     else:
         for package in upks:
             unrealsdk.load_package(package)
+        # Loading may replace objects we already found
+        object_cache.invalidate()
 
 
 load_package.add_argument(
@@ -61,3 +305,23 @@ load_package.add_argument(
     action="store_true",
     help="List all packages matching the given pattern, instead of trying to load any.",
 )
+load_package.add_argument(
+    "--async",
+    action="store_true",
+    dest="async_",
+    help="Load the packages one at a time over the following ticks, rather than all at once.",
+)
+load_package.add_argument(
+    "--budget",
+    type=float,
+    metavar="MS",
+    help=(
+        "When loading asynchronously, keep loading packages each tick until this many milliseconds"
+        " have passed. Defaults to loading one package per tick."
+    ),
+)
+load_package.add_argument(
+    "--exec",
+    metavar="FILE",
+    help="When loading asynchronously, exec this file once all the packages have been loaded.",
+)
@@ -6,6 +6,8 @@ import traceback
 from mods_base import command
 from unrealsdk import logging
 
+from command_extensions.code_cache import compile_cached
+
 RE_OPTIONAL_ARG = re.compile(r"^\s*--?\w+")  # type: ignore
 
 cached_lines: list[str] = []
@@ -29,7 +31,7 @@ def pyb(args: argparse.Namespace) -> None:  # noqa: D103
     if args.exec:
         joined = "\n".join(cached_lines)
         try:
-            exec(joined, {})  # noqa: S102
+            exec(compile_cached(joined), {})  # noqa: S102
         except Exception:  # noqa: BLE001
             logging.error("Error occurred during 'pyb' command:")
             logging.error(joined)
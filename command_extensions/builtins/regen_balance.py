@@ -45,19 +45,19 @@ class ManufacturerDataProxy:
     # Storing the BVC tuple directly, rather than the index
     DefaultWeight: BVCTuple
 
-    def as_struct(self, caid: list[BVCTuple]) -> WrappedStruct:
+    def as_struct(self, caid_index: dict[BVCTuple, int]) -> WrappedStruct:
         """
         Coverts this to a wrapped struct.
 
         Args:
-            caid: The caid list to index into.
+            caid_index: A dict mapping each caid entry to its index.
         Returns:
             The wrapped struct equivalent.
         """
         return unrealsdk.make_struct(
             "ManufacturerCustomGradeWeightData",
             Manufacturer=self.Manufacturer,
-            DefaultWeightIndex=caid.index(self.DefaultWeight),
+            DefaultWeightIndex=caid_index[self.DefaultWeight],
         )
 
 
@@ -70,22 +70,22 @@ class WeightedPartProxy:
     MaxGameStageIndex: BVCTuple
     DefaultWeightIndex: BVCTuple
 
-    def as_struct(self, caid: list[BVCTuple]) -> WrappedStruct:
+    def as_struct(self, caid_index: dict[BVCTuple, int]) -> WrappedStruct:
         """
         Coverts this to a wrapped struct.
 
         Args:
-            caid: The caid list to index into.
+            caid_index: A dict mapping each caid entry to its index.
         Returns:
             The wrapped struct equivalent.
         """
         return unrealsdk.make_struct(
             "PartGradeWeightData",
             Part=self.Part,
-            Manufacturers=[m.as_struct(caid) for m in self.Manufacturers],
-            MinGameStageIndex=caid.index(self.MinGameStageIndex),
-            MaxGameStageIndex=caid.index(self.MaxGameStageIndex),
-            DefaultWeightIndex=caid.index(self.DefaultWeightIndex),
+            Manufacturers=[m.as_struct(caid_index) for m in self.Manufacturers],
+            MinGameStageIndex=caid_index[self.MinGameStageIndex],
+            MaxGameStageIndex=caid_index[self.MaxGameStageIndex],
+            DefaultWeightIndex=caid_index[self.DefaultWeightIndex],
         )
 
 
@@ -178,24 +178,71 @@ def get_caid(parts_list: UObject, index: int) -> BVCTuple:
     )
 
 
+type PartsDict = dict[str, list[WeightedPartProxy]]
+
+
+def read_parts_list(parts_list: UObject, item_type: ItemType, parts: PartsDict) -> None:
+    """
+    Reads the enabled slots of a base parts list, overwriting them in a parts dict.
+
+    Args:
+        parts_list: The parts list to read.
+        item_type: What item type the parts list is for.
+        parts: The parts dict to write to.
+    """
+    for slot in LIST_SLOTS[item_type]:
+        part_data = getattr(parts_list, slot)
+
+        # If the slot isn't enabled, keep what's stored before
+        if not part_data.bEnabled:
+            continue
+
+        # Parse from the standard struct into our proxy, where we store caid values directly
+        parts[slot] = [
+            WeightedPartProxy(
+                entry.Part,
+                [
+                    ManufacturerDataProxy(
+                        m.Manufacturer,
+                        get_caid(parts_list, m.DefaultWeightIndex),
+                    )
+                    for m in entry.Manufacturers
+                ],
+                get_caid(parts_list, entry.MinGameStageIndex),
+                get_caid(parts_list, entry.MaxGameStageIndex),
+                get_caid(parts_list, entry.DefaultWeightIndex),
+            )
+            for entry in part_data.WeightedParts
+        ]
+
+
 def gather_parts_lists(
     final_bal: UObject,
     item_type: ItemType,
-) -> dict[str, list[WeightedPartProxy]] | None:
+    cache: dict[UObject, PartsDict] | None = None,
+) -> PartsDict | None:
     """
     Given a balance, work out what it's final parts list should be.
 
     Args:
         final_bal: The balance to gather the parts lists of.
         item_type: What item type this balance is.
+        cache: If not None, a dict of balances to their already gathered parts lists. Any base
+               balances found in it aren't read again, and any newly gathered balances are added.
     Returns:
         A parts list dict, or None on error.
     """
 
     # Since the later balances overwrite earlier ones, put them into a stack
     balance_stack: list[UObject] = []
+    parts: PartsDict = {}
     bal = final_bal
     while bal is not None:
+        if cache is not None and bal in cache:
+            # The lists themselves are never modified, only replaced, so a shallow copy is enough
+            parts = dict(cache[bal])
+            break
+
         if not bal.Class._inherits(BALANCE_CLASSES[item_type]):
             logging.error(
                 f"Base balance '{bal.PathName(bal)}' is of a different class than the final balance"
@@ -207,7 +254,6 @@ def gather_parts_lists(
         bal = bal.BaseDefinition
 
     # Find what the runtime parts list should use
-    parts: dict[str, list[WeightedPartProxy]] = {}
     while balance_stack:
         bal = balance_stack.pop()
         parts_list = getattr(bal, BASE_LIST_FIELD[item_type])
@@ -215,35 +261,14 @@ def gather_parts_lists(
             logging.error(f"Base balance '{bal.PathName(bal)}' does not contain a parts list!")
             return None
 
-        for slot in LIST_SLOTS[item_type]:
-            part_data = getattr(parts_list, slot)
-
-            # If the slot isn't enabled, keep what's stored before
-            if not part_data.bEnabled:
-                continue
-
-            # Parse from the standard struct into our proxy, where we store caid values directly
-            parts[slot] = [
-                WeightedPartProxy(
-                    entry.Part,
-                    [
-                        ManufacturerDataProxy(
-                            m.Manufacturer,
-                            get_caid(parts_list, m.DefaultWeightIndex),
-                        )
-                        for m in entry.Manufacturers
-                    ],
-                    get_caid(parts_list, entry.MinGameStageIndex),
-                    get_caid(parts_list, entry.MaxGameStageIndex),
-                    get_caid(parts_list, entry.DefaultWeightIndex),
-                )
-                for entry in part_data.WeightedParts
-            ]
+        read_parts_list(parts_list, item_type, parts)
+        if cache is not None:
+            cache[bal] = dict(parts)
 
     return parts
 
 
-def gather_required_caid(parts: dict[str, list[WeightedPartProxy]]) -> list[BVCTuple]:
+def gather_required_caid(parts: PartsDict) -> list[BVCTuple]:
     """
     Gathers all tuples that need to be placed into the CAID for the given parts.
 
@@ -264,6 +289,103 @@ def gather_required_caid(parts: dict[str, list[WeightedPartProxy]]) -> list[BVCT
     return sorted(caid, key=lambda b: b.BaseValueConstant)  # type: ignore
 
 
+def write_runtime_parts_list(
+    runtime_parts_list: UObject,
+    item_type: ItemType,
+    parts: PartsDict,
+) -> None:
+    """
+    Overwrites a runtime parts list with the given parts.
+
+    Args:
+        runtime_parts_list: The runtime parts list to overwrite.
+        item_type: What item type the parts list is for.
+        parts: The parts dict to write.
+    """
+    caid = gather_required_caid(parts)
+    runtime_parts_list.ConsolidatedAttributeInitData = [x.as_struct() for x in caid]
+    # Looking up indexes in the list is linear, which gets slow on large parts lists
+    caid_index = {bvc: idx for idx, bvc in enumerate(caid)}
+
+    for slot in LIST_SLOTS[item_type]:
+        part_type_data = getattr(runtime_parts_list, slot)
+        # If a slot's not defined, make sure to set it as not enabled
+        if slot not in parts:
+            part_type_data.bEnabled = False
+            part_type_data.WeightedParts = []
+            continue
+
+        part_type_data.bEnabled = True
+        part_type_data.WeightedParts = [x.as_struct(caid_index) for x in parts[slot]]
+
+
+def build_dependents_index() -> dict[UObject, list[tuple[UObject, ItemType]]]:
+    """
+    Builds an index of which loaded balances directly depend on each base balance or parts list.
+
+    Returns:
+        A dict mapping each base balance or parts list to the balances directly using it, and their
+        item types.
+    """
+    dependents: dict[UObject, list[tuple[UObject, ItemType]]] = {}
+    for item_type in ItemType:
+        for bal in unrealsdk.find_all(BALANCE_CLASSES[item_type], exact=False):
+            for dependency in (bal.BaseDefinition, getattr(bal, BASE_LIST_FIELD[item_type])):
+                if dependency is not None:
+                    dependents.setdefault(dependency, []).append((bal, item_type))
+    return dependents
+
+
+def find_dependents(obj: UObject) -> list[tuple[UObject, ItemType]]:
+    """
+    Finds all loaded balances which depend on a base balance or parts list, directly or indirectly.
+
+    Args:
+        obj: The base balance or parts list.
+    Returns:
+        A list of the dependent balances and their item types, in the order they were found.
+    """
+    dependents = build_dependents_index()
+
+    found: dict[UObject, ItemType] = {}
+    pending = [obj]
+    while pending:
+        for bal, item_type in dependents.get(pending.pop(), ()):
+            if bal not in found:
+                found[bal] = item_type
+                pending.append(bal)
+    return list(found.items())
+
+
+def regen_dependents(obj: UObject) -> None:
+    """
+    Regenerates the given object, if it's a balance, and all loaded balances which depend on it.
+
+    Args:
+        obj: The changed base balance or parts list.
+    """
+    balances = find_dependents(obj)
+    for item_type in ItemType:
+        if obj.Class._inherits(BALANCE_CLASSES[item_type]):
+            balances.insert(0, (obj, item_type))
+
+    # Shared between all balances, so that common bases are only read once
+    cache: dict[UObject, PartsDict] = {}
+    regenerated = 0
+    for bal, item_type in balances:
+        # Base balances which are only used to be inherited from don't need regenerating
+        runtime_parts_list = bal.RuntimePartListCollection
+        if runtime_parts_list is None:
+            continue
+        if (parts := gather_parts_lists(bal, item_type, cache)) is None:
+            continue
+
+        write_runtime_parts_list(runtime_parts_list, item_type, parts)
+        regenerated += 1
+
+    logging.info(f"Regenerated {regenerated} balances depending on '{obj.PathName(obj)}'")
+
+
 @command(
     splitter=obj_name_splitter,
     description=(
@@ -277,6 +399,10 @@ def regen_balance(args: argparse.Namespace) -> None:  # noqa: D103
     if final_bal is None:
         return
 
+    if args.dependents:
+        regen_dependents(final_bal)
+        return
+
     if (item_type := ItemType.detect(final_bal)) is None:
         return
 
@@ -288,19 +414,22 @@ def regen_balance(args: argparse.Namespace) -> None:  # noqa: D103
     if (parts := gather_parts_lists(final_bal, item_type)) is None:
         return
 
-    caid = gather_required_caid(parts)
-    runtime_parts_list.ConsolidatedAttributeInitData = [x.as_struct() for x in caid]
-
-    for slot in LIST_SLOTS[item_type]:
-        part_type_data = getattr(runtime_parts_list, slot)
-        # If a slot's not defined, make sure to set it as not enabled
-        if slot not in parts:
-            part_type_data.bEnabled = False
-            part_type_data.WeightedParts = []
-            continue
-
-        part_type_data.bEnabled = True
-        part_type_data.WeightedParts = [x.as_struct(caid) for x in parts[slot]]
+    write_runtime_parts_list(runtime_parts_list, item_type, parts)
 
 
-regen_balance.add_argument("balance", help="The balance to regenerate.")
+regen_balance.add_argument(
+    "balance",
+    help=(
+        "The balance to regenerate. If using --dependents, the base balance or parts list which"
+        " was changed."
+    ),
+)
+regen_balance.add_argument(
+    "-d",
+    "--dependents",
+    action="store_true",
+    help=(
+        "Regenerate every loaded balance which depends on the given base balance or parts list,"
+        " directly or through other balances."
+    ),
+)
@@ -1,6 +1,260 @@
 import argparse
+import re
+from contextlib import suppress
+from typing import Any, cast
 
 from mods_base import command, get_pc
+from unrealsdk.unreal import (
+    UBoolProperty,
+    UByteProperty,
+    UClass,
+    UFloatProperty,
+    UIntProperty,
+    UNameProperty,
+    UObject,
+    UObjectProperty,
+    UProperty,
+)
+
+from command_extensions import object_cache
+
+from . import RE_OBJ_NAME, add_batch_handler
+
+RE_INT = re.compile(r"[+-]?\d+")
+RE_FLOAT = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+RE_NAME = re.compile(r"\w+")
+
+INT_MIN = -(2**31)
+INT_MAX = 2**31 - 1
+BYTE_MAX = 0xFF
+
+BOOL_VALUES = {"true": True, "1": True, "false": False, "0": False}
+
+# Only valid for the current batch - objects may be destroyed by commands run in between batches
+batch_objects: dict[str, UObject | None] = {}
+batch_properties: dict[tuple[UClass, str], UProperty | None] = {}
+
+direct_sets: int = 0
+fallback_sets: int = 0
+
+
+def set_early_raw(args: str) -> None:
+    """
+    Runs a set command.
+
+    Args:
+        args: The raw set command arguments.
+    """
+    get_pc().ConsoleCommand("set " + args)
+
+
+def clear_batch_cache() -> None:
+    """Clears the objects and properties cached during the last batch."""
+    batch_objects.clear()
+    batch_properties.clear()
+
+
+def find_cached_object(name: str) -> UObject | None:
+    """
+    Finds an object, reusing the result if the same name was already looked up this batch.
+
+    Args:
+        name: The object name to look for.
+    Returns:
+        The object, or None if it couldn't be found.
+    """
+    if name in batch_objects:
+        return batch_objects[name]
+
+    obj: UObject | None = None
+    if (match := RE_OBJ_NAME.match(name)) is not None:
+        with suppress(ValueError):
+            obj = object_cache.find_object(
+                match.group("class") or "Object",
+                match.group("fullname"),
+            )
+
+    batch_objects[name] = obj
+    return obj
+
+
+def find_cached_property(cls: UClass, name: str) -> UProperty | None:
+    """
+    Finds a property on a class, reusing the result if it was already looked up this batch.
+
+    Args:
+        cls: The class to look for the property on.
+        name: The property's name.
+    Returns:
+        The property, or None if it doesn't exist.
+    """
+    key = (cls, name.lower())
+    if key in batch_properties:
+        return batch_properties[key]
+
+    prop: UProperty | None = None
+    with suppress(ValueError):
+        prop = cls._find_prop(name)
+
+    batch_properties[key] = prop
+    return prop
+
+
+def convert_int(value: str, min_value: int, max_value: int) -> int:
+    """
+    Converts the text value of a set command into an integer, making sure it's in range.
+
+    Args:
+        value: The value text.
+        min_value: The minimum allowed value.
+        max_value: The maximum allowed value.
+    Returns:
+        The converted value.
+    Raises:
+        ValueError: If the value isn't a plain integer, or is out of range.
+    """
+    if not RE_INT.fullmatch(value):
+        raise ValueError(f"'{value}' is not a plain integer")
+    converted = int(value)
+    if not min_value <= converted <= max_value:
+        raise ValueError(f"'{value}' is out of range")
+    return converted
+
+
+def get_outermost(obj: UObject) -> UObject:
+    """
+    Gets the package an object is contained in.
+
+    Args:
+        obj: The object to get the package of.
+    Returns:
+        The outermost object.
+    """
+    while obj.Outer is not None:
+        obj = obj.Outer
+    return obj
+
+
+def convert_object(prop: UObjectProperty, value: str, owner: UObject) -> UObject | None:
+    """
+    Converts the text value of a set command into an object to write to a property.
+
+    Args:
+        prop: The property being set.
+        value: The value text.
+        owner: The object the property is being set on.
+    Returns:
+        The object, or None if the value was None.
+    Raises:
+        ValueError: If the object couldn't be found, can't be stored in this property, or is in a
+                    different package to the owner.
+    """
+    if value.lower() == "none":
+        return None
+    obj = find_cached_object(value)
+    if obj is None or not obj.Class._inherits(prop.PropertyClass):
+        raise ValueError(f"'{value}' is not a valid object for this property")
+    # The engine refuses references to private objects in other packages, leave it to do the check
+    if get_outermost(obj) != get_outermost(owner):
+        raise ValueError(f"'{value}' is in a different package")
+    return obj
+
+
+def convert_value(prop: UProperty, value: str, owner: UObject) -> Any:
+    """
+    Converts the text value of a set command into the Python value to write to a property.
+
+    Only handles simple values, where we can be sure we're interpreting the text the same way the
+    engine would.
+
+    Args:
+        prop: The property being set.
+        value: The value text.
+        owner: The object the property is being set on.
+    Returns:
+        The converted value.
+    Raises:
+        ValueError: If this property or value isn't supported.
+    """
+    # Check the exact type, since subclasses (e.g. class properties) add extra requirements
+    prop_type = type(prop)
+
+    if prop_type is UIntProperty:
+        return convert_int(value, INT_MIN, INT_MAX)
+    if prop_type is UByteProperty:
+        return convert_int(value, 0, BYTE_MAX)
+    if prop_type is UFloatProperty and RE_FLOAT.fullmatch(value):
+        return float(value)
+    if prop_type is UBoolProperty and value.lower() in BOOL_VALUES:
+        return BOOL_VALUES[value.lower()]
+    if prop_type is UNameProperty and RE_NAME.fullmatch(value):
+        return value
+    if prop_type is UObjectProperty:
+        # Checking the type through a variable doesn't narrow it
+        return convert_object(cast("UObjectProperty", prop), value, owner)
+
+    raise ValueError(f"Can't directly set {prop_type.__name__} to '{value}'")
+
+
+def try_set_directly(args: str) -> bool:
+    """
+    Tries to apply a set command by writing to the property directly.
+
+    This skips the engine having to parse the command and look up the object again for every line,
+    which adds up when setting many properties on the same few objects.
+
+    Args:
+        args: The raw set command arguments.
+    Returns:
+        True if the property was set, false if the command must be run through the console instead.
+    """
+    split = args.split(maxsplit=2)
+    if len(split) != 3:  # noqa: PLR2004
+        return False
+    obj_name, prop_name, value = split
+
+    obj = find_cached_object(obj_name)
+    # Setting on a class applies to all its instances, leave that to the engine
+    if obj is None or obj.Class.Name == "Class":
+        return False
+
+    if not RE_NAME.fullmatch(prop_name):
+        return False
+    prop = find_cached_property(obj.Class, prop_name)
+    if prop is None or prop.ArrayDim != 1:
+        return False
+
+    try:
+        setattr(obj, prop.Name, convert_value(prop, value.strip(), obj))
+    except (ValueError, TypeError, AttributeError):
+        return False
+    return True
+
+
+def set_early_bulk(args: str) -> None:
+    """
+    Runs a set command as part of a batch, directly setting the property where possible.
+
+    Args:
+        args: The raw set command arguments.
+    """
+    global direct_sets, fallback_sets
+
+    if try_set_directly(args):
+        direct_sets += 1
+    else:
+        fallback_sets += 1
+        set_early_raw(args)
+
+
+def get_stats() -> list[str]:
+    """
+    Gets a set of human readable stats about the bulk set engine.
+
+    Returns:
+        A list of lines to print.
+    """
+    return [f"Bulk set_early: {direct_sets} set directly, {fallback_sets} run through the console"]
 
 
 @command(
@@ -11,7 +265,7 @@ from mods_base import command, get_pc
     ),
 )
 def set_early(args: argparse.Namespace) -> None:  # noqa: D103
-    get_pc().ConsoleCommand("set " + " ".join(args.args))
+    set_early_raw(" ".join(args.args))
 
 
 set_early.add_argument(
@@ -20,3 +274,10 @@ set_early.add_argument(
     # This doesn't do anything cause of the custom splitter, but it looks better in the help text
     nargs=argparse.REMAINDER,
 )
+add_batch_handler(
+    set_early,
+    lambda m: [m.lstrip()],
+    1,
+    set_early_bulk,
+    on_batch=clear_batch_cache,
+)
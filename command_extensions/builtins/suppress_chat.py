@@ -1,14 +1,94 @@
 import argparse
 import fnmatch
+import os
+import re
 from typing import Any
 
 from mods_base import command, hook
 from unrealsdk.hooks import Block
 from unrealsdk.unreal import BoundFunction, UObject, WrappedStruct
 
+# Patterns in the order they were added, mapped to how many more messages they should suppress.
+# Patterns which run out are left at 0 until the combined regex is next rebuilt.
 suppressed_patterns: dict[str, int] = {}
 suppress_global_count: int = 0
 
+# Each pattern is only translated into a regex once
+translated_patterns: dict[str, str] = {}
+# All live patterns combined into a single regex, with a named group per pattern, or None if empty
+combined_regex: re.Pattern[str] | None = None
+# The pattern each of the combined regex's groups matches
+combined_patterns: list[str] = []
+combined_dirty: bool = False
+
+
+def add_suppressed_pattern(pattern: str) -> None:
+    """
+    Suppresses the next chat message matching a glob pattern.
+
+    Args:
+        pattern: The glob pattern to suppress.
+    """
+    global combined_dirty
+
+    if suppressed_patterns.get(pattern, 0) > 0:
+        suppressed_patterns[pattern] += 1
+        return
+
+    # Make sure a pattern which had run out moves to the end of the order, like a new one would
+    suppressed_patterns.pop(pattern, None)
+    suppressed_patterns[pattern] = 1
+
+    if pattern not in translated_patterns:
+        # Same as fnmatch.fnmatch, normalize case on case insensitive platforms
+        translated_patterns[pattern] = fnmatch.translate(os.path.normcase(pattern))
+    combined_dirty = True
+
+
+def rebuild_combined_regex() -> None:
+    """Rebuilds the combined regex, dropping any patterns which have run out."""
+    global combined_regex, combined_patterns, combined_dirty
+
+    for pattern in [pattern for pattern, count in suppressed_patterns.items() if count <= 0]:
+        del suppressed_patterns[pattern]
+
+    combined_patterns = list(suppressed_patterns)
+    combined_regex = (
+        re.compile(
+            "|".join(
+                f"(?P<p{idx}>{translated_patterns[pattern]})"
+                for idx, pattern in enumerate(combined_patterns)
+            ),
+        )
+        if combined_patterns
+        else None
+    )
+    combined_dirty = False
+
+
+def find_suppressed_pattern(msg: str) -> str | None:
+    """
+    Finds the first added pattern which matches a message, and should still be suppressed.
+
+    Args:
+        msg: The message to check.
+    Returns:
+        The matching pattern, or None if no patterns match.
+    """
+    if combined_dirty:
+        rebuild_combined_regex()
+
+    msg = os.path.normcase(msg)
+    while combined_regex is not None and (match := combined_regex.match(msg)) is not None:
+        pattern = combined_patterns[int((match.lastgroup or "p0")[1:])]
+        if suppressed_patterns[pattern] > 0:
+            return pattern
+
+        # Matched a pattern which has already run out, drop it and try again
+        rebuild_combined_regex()
+
+    return None
+
 
 @command(
     description=(
@@ -25,9 +105,7 @@ def suppress_next_chat(args: argparse.Namespace) -> None:  # noqa: D103
         suppress_global_count += 1
         return
 
-    if args.pattern not in suppressed_patterns:
-        suppressed_patterns[args.pattern] = 0
-    suppressed_patterns[args.pattern] += 1
+    add_suppressed_pattern(args.pattern)
 
 
 suppress_next_chat.add_argument(
@@ -47,13 +125,9 @@ def server_say_hook(  # noqa: D103
 ) -> type[Block] | None:
     global suppress_global_count
 
-    for pattern, count in suppressed_patterns.items():
-        if fnmatch.fnmatch(args.msg, pattern):
-            if count == 1:
-                del suppressed_patterns[pattern]
-            else:
-                suppressed_patterns[pattern] -= 1
-            return Block
+    if (pattern := find_suppressed_pattern(args.msg)) is not None:
+        suppressed_patterns[pattern] -= 1
+        return Block
 
     if suppress_global_count > 0:
         suppress_global_count -= 1
@@ -2,24 +2,37 @@ import argparse
 
 from mods_base import command
 
-from . import obj_name_splitter, parse_object
+from . import add_batch_handler, obj_name_splitter, parse_object
 
 
-@command(
-    splitter=obj_name_splitter,
-    description="Unlocks an object allowing it to be referenced cross-package.",
-)
-def unlock_package(args: argparse.Namespace) -> None:  # noqa: D103
-    obj = parse_object(args.object)
+def unlock_package_by_name(name: str, undo: bool = False) -> None:
+    """
+    Unlocks an object's package, given its name.
+
+    If unable to find the object, logs an error to console.
+
+    Args:
+        name: The name of the object.
+        undo: If true, reverses a previous call instead.
+    """
+    obj = parse_object(name)
     if obj is None:
         return
 
-    if args.undo:
+    if undo:
         obj.ObjectFlags &= ~4
     else:
         obj.ObjectFlags |= 4
 
 
+@command(
+    splitter=obj_name_splitter,
+    description="Unlocks an object allowing it to be referenced cross-package.",
+)
+def unlock_package(args: argparse.Namespace) -> None:  # noqa: D103
+    unlock_package_by_name(args.object, args.undo)
+
+
 unlock_package.add_argument("object", help="The object to unlock.")
 unlock_package.add_argument(
     "-u",
@@ -27,3 +40,4 @@ unlock_package.add_argument(
     action="store_true",
     help="Undo a previous unlock package call.",
 )
+add_batch_handler(unlock_package, obj_name_splitter, 1, unlock_package_by_name)
@@ -0,0 +1,141 @@
+import hashlib
+import importlib.util
+import marshal
+from contextlib import suppress
+from types import CodeType
+
+from mods_base import SETTINGS_DIR
+
+__all__: tuple[str, ...] = (
+    "clear",
+    "compile_cached",
+    "get_stats",
+    "save",
+)
+
+CACHE_FILE = SETTINGS_DIR / "command_extensions" / "code_cache.marshal"
+# Only the most recently used entries are kept, both in memory and on disk, so that the cache
+# doesn't grow forever as mods get edited
+MAX_ENTRIES = 4096
+
+hits: int = 0
+misses: int = 0
+
+# Insertion order doubles as recency, entries are moved to the end whenever they're used
+compiled: dict[str, CodeType] = {}
+
+loaded_from_disk: bool = False
+dirty: bool = False
+
+
+def evict_oldest() -> None:
+    """Removes the least recently used entries, until we're back under the max size."""
+    while len(compiled) > MAX_ENTRIES:
+        del compiled[next(iter(compiled))]
+
+
+def load() -> None:
+    """Loads the on disk cache, if it hasn't been already."""
+    global loaded_from_disk
+    if loaded_from_disk:
+        return
+    loaded_from_disk = True
+
+    with suppress(OSError, EOFError, ValueError, TypeError):
+        data = CACHE_FILE.read_bytes()
+
+        # Marshal's format isn't stable between Python versions, ignore the cache if it came from a
+        # different one
+        magic = importlib.util.MAGIC_NUMBER
+        if not data.startswith(magic):
+            return
+
+        # This is our own file, in the settings folder, it's no less trusted than the mod files
+        # we're about to run
+        loaded = marshal.loads(data[len(magic) :])  # noqa: S302
+        if not isinstance(loaded, dict):
+            return
+
+        for key, code in loaded.items():  # pyright: ignore[reportUnknownVariableType]
+            if isinstance(key, str) and isinstance(code, CodeType):
+                compiled.setdefault(key, code)
+        evict_oldest()
+
+
+def compile_cached(source: str, filename: str = "<string>") -> CodeType:
+    """
+    Compiles a block of source code, reusing the previous code object if it's been seen before.
+
+    Args:
+        source: The source code to compile.
+        filename: The filename to compile the code under.
+    Returns:
+        The compiled code object.
+    """
+    global hits, misses, dirty
+
+    load()
+
+    key = hashlib.sha256(f"{filename}\0{source}".encode(errors="surrogatepass")).hexdigest()
+    if (code := compiled.pop(key, None)) is not None:
+        hits += 1
+    else:
+        misses += 1
+        code = compile(source, filename, "exec", dont_inherit=True)
+        dirty = True
+    compiled[key] = code
+    evict_oldest()
+
+    return code
+
+
+def save() -> None:
+    """Writes the on disk cache, if anything has changed since the last save."""
+    global dirty
+    if not dirty:
+        return
+    dirty = False
+
+    with suppress(OSError, ValueError):
+        CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = CACHE_FILE.with_suffix(".tmp")
+        temp_path.write_bytes(importlib.util.MAGIC_NUMBER + marshal.dumps(compiled))
+        temp_path.replace(CACHE_FILE)
+
+
+def clear() -> int:
+    """
+    Deletes all cached code objects, both in memory and on disk, and resets the hit/miss counters.
+
+    Returns:
+        The number of cache entries which were deleted.
+    """
+    global hits, misses, dirty
+
+    load()
+    count = len(compiled)
+
+    compiled.clear()
+    hits = 0
+    misses = 0
+    dirty = False
+
+    CACHE_FILE.unlink(missing_ok=True)
+    return count
+
+
+def get_stats() -> list[str]:
+    """
+    Gets a set of human readable stats about the cache.
+
+    Returns:
+        A list of lines to print.
+    """
+    total = hits + misses
+    hit_rate = 0 if total == 0 else 100 * hits / total
+    return [
+        (
+            f"Code cache: {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate),"
+            f" {len(compiled)} entries"
+        ),
+    ]
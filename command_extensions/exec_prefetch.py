@@ -0,0 +1,142 @@
+import os
+from collections.abc import Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
+from pathlib import Path
+
+from . import file_parser, parse_cache
+from .parse_cache import PositionedMatch
+
+__all__: tuple[str, ...] = (
+    "executing",
+    "get_matches",
+    "prefetch",
+)
+
+executor = ThreadPoolExecutor(thread_name_prefix="ce_exec_prefetch")
+
+
+@dataclass
+class ParsedFile:
+    matches: list[PositionedMatch]
+    # The commands the file added via CE_NewCmd, which only get added once it's actually executed
+    new_commands: list[str]
+    # The command version from before the file was parsed
+    commands_version: int
+
+
+# All the parses started during the current top level exec, keyed on normalized path. These are
+# thrown away once it finishes, so that we pick up any changes the next time a file's exec'd.
+parses: dict[str, Future[ParsedFile]] = {}
+# The normalized paths of all files currently being executed, innermost last
+exec_stack: list[str] = []
+
+
+def normalize(file_path: Path) -> str:
+    """
+    Normalizes a path, so that different ways of referring to the same file compare equal.
+
+    Args:
+        file_path: The path to normalize.
+    Returns:
+        The normalized path.
+    """
+    return os.path.normcase(file_path.resolve())
+
+
+def parse_file(file_path: Path) -> ParsedFile:
+    """
+    Parses a file, recording the command version it was parsed with.
+
+    Any CE_NewCmd lines only apply to this file, they don't affect other parses until it's executed.
+
+    Args:
+        file_path: The file to parse.
+    Returns:
+        The parsed file.
+    """
+    commands_version = file_parser.get_commands_version()
+    new_commands: list[str] = []
+    matches = parse_cache.parse(file_path, new_commands)
+    return ParsedFile(matches, new_commands, commands_version)
+
+
+def prefetch(file_path: Path) -> None:
+    """
+    Starts parsing a file on a background thread, in anticipation of it being executed later.
+
+    Does nothing if the file has already been parsed during this top level exec.
+
+    Args:
+        file_path: The file to parse.
+    """
+    key = normalize(file_path)
+    if key not in parses:
+        parses[key] = executor.submit(parse_file, file_path)
+
+
+def get_matches(file_path: Path) -> list[PositionedMatch]:
+    """
+    Gets the custom commands in a file, using the prefetched results if possible.
+
+    Should be called right as the file is executed, since this is when the commands it added via
+    CE_NewCmd get added, for all files parsed after it.
+
+    Args:
+        file_path: The file to parse.
+    Returns:
+        A list of 6-tuples, of the raw command name, the full line, the command length, the line
+        number, the byte offset of the line, and the line's hash.
+    """
+    key = normalize(file_path)
+
+    if (future := parses.get(key)) is not None:
+        # If the background parse failed, we just try again below, so that any errors are raised in
+        # the same place as a normal parse
+        with suppress(Exception):
+            parsed = future.result()
+            # The commands may have been changed since we started the parse, either because a
+            # command we've since run registered a new one, or because a file executed in the
+            # meantime used CE_NewCmd. Versions only go up, so if it's the same as before we
+            # started, it can't have changed during the parse either.
+            if parsed.commands_version == file_parser.get_commands_version():
+                parse_cache.add_new_commands(parsed.new_commands)
+                return parsed.matches
+
+    parsed = parse_file(file_path)
+    future = Future[ParsedFile]()
+    future.set_result(parsed)
+    parses[key] = future
+
+    parse_cache.add_new_commands(parsed.new_commands)
+    return parsed.matches
+
+
+@contextmanager
+def executing(file_path: Path) -> Generator[bool]:
+    """
+    Context manager which marks a file as being executed.
+
+    Once the outermost file finishes executing, clears all prefetched results.
+
+    Args:
+        file_path: The file being executed.
+    Yields:
+        False if the file is already being executed, in which case it should be skipped to avoid
+        recursing forever, True otherwise.
+    """
+    key = normalize(file_path)
+    if key in exec_stack:
+        yield False
+        return
+
+    exec_stack.append(key)
+    try:
+        yield True
+    finally:
+        exec_stack.pop()
+        if not exec_stack:
+            for future in parses.values():
+                future.cancel()
+            parses.clear()
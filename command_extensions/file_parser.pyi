@@ -1,4 +1,10 @@
+from collections.abc import Iterator
+from concurrent.futures import Future
 from os import PathLike
+from typing import Literal, overload
+
+type Match = tuple[str, str, int]
+type PositionedMatch = tuple[str, str, int, int, int, int]
 
 class EnableStrategy:
     All: EnableStrategy
@@ -19,16 +25,179 @@ class EnableStrategy:
 
 class BLCMParserError(RuntimeError): ...
 
-def parse(file_path: PathLike[str]) -> list[tuple[str, str, int]]:
+@overload
+def parse(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: Literal[False] = False,
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> list[Match]: ...
+@overload
+def parse(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: Literal[True],
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> list[PositionedMatch]: ...
+def parse(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: bool = False,
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> list[Match] | list[PositionedMatch]:
     """
     Parses custom commands out of mod file.
 
     Must have called update_commands() first, otherwise this won't match anything.
 
+    The GIL is released while reading and parsing the file.
+
     Args:
         file_path: The file to parse.
+        use_mmap: If true, reads the file via a memory mapping. Mostly intended for benchmarking.
+        with_positions: If true, each match additionally includes the 1-indexed line number and
+                        byte offset of the start of its line, and a 64-bit FNV-1a hash of the line.
+        use_dom: If true, always parses BLCMM files by building the full DOM, rather than trying a
+                 single pass scan first. Mostly intended for testing.
+        new_commands: If not None, the commands added by any CE_NewCmd lines only apply to this
+                      parse, and are appended to this list, rather than being added to the
+                      global set of matched commands.
     Returns:
-        A list of 3-tuples, of the raw command name, the full line, and the command length.
+        A list of 3-tuples, of the raw command name, the full line, and the command length. If
+        including positions, 6-tuples, additionally including the line number, offset, and hash.
+    """
+
+@overload
+def parse_async(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: Literal[False] = False,
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> Future[list[Match]]: ...
+@overload
+def parse_async(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: Literal[True],
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> Future[list[PositionedMatch]]: ...
+def parse_async(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: bool = False,
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> Future[list[Match]] | Future[list[PositionedMatch]]:
+    """
+    Parses custom commands out of mod file, on a background thread.
+
+    Must have called update_commands() first, otherwise this won't match anything.
+
+    Since any CE_NewCmd lines are also processed on the background thread, they will only affect
+    other parses which run after they've been read. Pass new_commands to keep them local to this
+    parse instead.
+
+    Args:
+        file_path: The file to parse.
+        use_mmap: If true, reads the file via a memory mapping. Mostly intended for benchmarking.
+        with_positions: If true, each match additionally includes the 1-indexed line number and
+                        byte offset of the start of its line, and a 64-bit FNV-1a hash of the line.
+        use_dom: If true, always parses BLCMM files by building the full DOM, rather than trying a
+                 single pass scan first. Mostly intended for testing.
+        new_commands: If not None, the commands added by any CE_NewCmd lines only apply to this
+                      parse, and are appended to this list, rather than being added to the
+                      global set of matched commands.
+    Returns:
+        A future resolving to the same list parse() would return.
+    """
+
+@overload
+def iter_parse(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: Literal[False] = False,
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> Iterator[Match]: ...
+@overload
+def iter_parse(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: Literal[True],
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> Iterator[PositionedMatch]: ...
+def iter_parse(
+    file_path: PathLike[str],
+    *,
+    use_mmap: bool = True,
+    with_positions: bool = False,
+    use_dom: bool = False,
+    new_commands: list[str] | None = None,
+) -> Iterator[Match] | Iterator[PositionedMatch]:
+    """
+    Lazily parses custom commands out of mod file.
+
+    Must have called update_commands() first, otherwise this won't match anything.
+
+    Plain text files are read line by line as the iterator is advanced, so commands may be
+    processed before the rest of the file has been read. BLCMM files must still be parsed in full
+    upfront, only the conversion to Python objects is delayed.
+
+    Args:
+        file_path: The file to parse.
+        use_mmap: If true, reads the file via a memory mapping. Mostly intended for benchmarking.
+        with_positions: If true, each match additionally includes the 1-indexed line number and
+                        byte offset of the start of its line, and a 64-bit FNV-1a hash of the line.
+        use_dom: If true, always parses BLCMM files by building the full DOM, rather than trying a
+                 single pass scan first. Mostly intended for testing.
+        new_commands: If not None, the commands added by any CE_NewCmd lines only apply to this
+                      parse, and are appended to this list, rather than being added to the
+                      global set of matched commands.
+    Returns:
+        An iterator of 3-tuples, of the raw command name, the full line, and the command length.
+        If including positions, 6-tuples, additionally including the line number, offset, and
+        hash.
+    """
+
+def scan_mod_file(
+    file_path: PathLike[str],
+    *,
+    new_commands: list[str] | None = None,
+) -> tuple[int | None, str | None, list[str] | None, list[PositionedMatch]]:
+    """
+    Scans a mod file for both the info mod loaders use, and its custom commands.
+
+    The info is extracted using the same rules as TextModLoader. The file is only read once, and the
+    GIL is released while reading and parsing it.
+
+    Must have called update_commands() first, otherwise this won't match anything.
+
+    Any CE_NewCmd lines only apply while scanning this file, they never change the global set of
+    matched commands.
+
+    Args:
+        file_path: The file to scan.
+        new_commands: If not None, the commands added by any CE_NewCmd lines are appended to this
+                      list.
+    Returns:
+        A 4-tuple of the index of the spark service the file's hotfixes are set on, the game the
+        file was made for, the first comment block, and the same list parse() returns with
+        positions included. The first two may be None. The comments are None for plain text files
+        which don't contain any commands, which likely aren't mods.
     """
 
 def update_commands(commands: list[str]) -> None:
@@ -38,3 +207,46 @@ def update_commands(commands: list[str]) -> None:
     Args:
         commands: The commands to match.
     """
+
+def get_commands_version() -> int:
+    """
+    Gets a counter which is incremented every time the matched commands change.
+
+    This includes both calls to update_commands(), and any new commands added by CE_NewCmd lines
+    while parsing. Parse results are only guaranteed to be reproducible while this stays the same.
+
+    Returns:
+        The current version.
+    """
+
+def get_commands() -> list[str]:
+    """
+    Gets all commands currently being matched.
+
+    This includes any new commands added by CE_NewCmd lines.
+
+    Returns:
+        The lowercase commands, sorted.
+    """
+
+def add_new_command(cmd: str) -> None:
+    """
+    Adds a single new command to match, the same as a CE_NewCmd line does.
+
+    Unlike update_commands(), this keeps all existing commands.
+
+    Args:
+        cmd: The command to add.
+    """
+
+def split_obj_names(args: str) -> list[str]:
+    """
+    Splits a command's arguments, keeping object names as single tokens.
+
+    Gives exactly the same output as builtins.obj_name_splitter's shlex based fallback.
+
+    Args:
+        args: The arguments to split.
+    Returns:
+        A list of individual arguments split out from the input string.
+    """
@@ -1,6 +1,7 @@
 #include "pch.h"
 #include "blcm_parser.h"
 #include "blcm_preprocessor/blcm_preprocessor.h"
+#include "mapped_file.h"
 #include "matcher.h"
 
 namespace ce {
@@ -185,7 +186,8 @@ void handle_category(const pugi::xml_node& category,
         static const constexpr CaseInsensitiveStringView comment = "comment";
         if (child_name == comment) {
             const std::string_view line = child.child_value();
-            auto [cmd, match] = try_match_command(line);
+            // Since we parse in place, pugixml leaves a null terminator after the value
+            auto [cmd, match] = try_match_command(line, true);
             if (!cmd.empty()) {
                 block.handle_standard_command(cmd, line, std::move(match));
             }
@@ -212,7 +214,7 @@ void handle_category(const pugi::xml_node& category,
             for (auto hotfix_child : child) {
                 handle_child_element(hotfix_child.name(), hotfix_child);
             }
-            return;
+            continue;
         }
 
         handle_child_element(child_name, child);
@@ -221,16 +223,22 @@ void handle_category(const pugi::xml_node& category,
 
 }  // namespace
 
-std::vector<CommandMatch> parse_blcmm_file(std::istream& stream) {
-    std::stringstream processed_xml{};
-    blcm_preprocessor::preprocess(stream, processed_xml);
-    // Move the string out of the stream
-    auto processed_str = std::move(processed_xml).str();
+namespace {
 
+/**
+ * @brief Parses through preprocessed BLCMM xml, collecting all matching commands.
+ *
+ * @param processed_str The preprocessed xml. Parsed in place, will be modified.
+ * @return A list of enabled command matches, holding views into the processed string.
+ */
+std::vector<CommandMatch> parse_processed_xml(std::string& processed_str) {
     pugi::xml_document doc{};
-    // Use latin1 to try avoid any char conversions
+    // BLCMM files use the system codepage, which we decode later, so we want pugixml to leave the
+    // raw bytes alone. Telling it the file's utf8 means it doesn't do any conversion, which also
+    // guarantees it parses in place, so the matches can hold views into our buffer. If we said it
+    // was latin1, it would convert any non-ascii files into a new buffer it owns.
     auto res = doc.load_buffer_inplace(processed_str.data(), processed_str.size(),
-                                       pugi::parse_default, pugi::encoding_latin1);
+                                       pugi::parse_default, pugi::encoding_utf8);
     if (res.status != pugi::status_ok) {
         throw blcm_preprocessor::ParserError(res.description());
     }
@@ -250,4 +258,721 @@ std::vector<CommandMatch> parse_blcmm_file(std::istream& stream) {
     return output;
 }
 
+/**
+ * @brief Fills in the positions of a set of matches, by mapping them back to the original file.
+ *
+ * @param matches The matches to fill in. Must be views into the processed string.
+ * @param processed_str The preprocessed xml.
+ * @param line_starts The line starts recorded while preprocessing.
+ */
+void add_positions(std::vector<CommandMatch>& matches,
+                   const std::string& processed_str,
+                   const std::vector<blcm_preprocessor::LineStart>& line_starts) {
+    for (auto& match : matches) {
+        auto output_offset = (size_t)(match.line.data() - processed_str.data());
+
+        // Find the last line which started at or before the match
+        // If there are multiple lines at the same offset, the earlier ones generated no output, so
+        // the match must be from the last one
+        auto next_line = std::ranges::upper_bound(line_starts, output_offset, {},
+                                                  &blcm_preprocessor::LineStart::output_offset);
+        if (next_line == line_starts.begin()) {
+            continue;
+        }
+        auto line = std::prev(next_line);
+
+        match.line_number = (size_t)(line - line_starts.begin()) + 1;
+        match.offset = line->input_offset;
+    }
+}
+
+}  // namespace
+
+namespace {
+
+// Thrown when the streaming scanner finds something it doesn't know how to handle. Rather than try
+// replicate exactly how pugixml handles every malformed file, we fall back to the DOM parser.
+class UnsupportedStructure : public std::exception {};
+
+/**
+ * @brief Finds the end of an opening tag, skipping over any attributes.
+ *
+ * @param line The line containing the tag.
+ * @param tag_name_end The index into the line where the tag name ends.
+ * @return The index of the closing `>`.
+ */
+size_t find_tag_end(std::string_view line, size_t tag_name_end) {
+    for (auto idx = tag_name_end; idx < line.size(); idx++) {
+        if (line[idx] == '>') {
+            return idx;
+        }
+        if (line[idx] != '"') {
+            continue;
+        }
+
+        // Skip to the end of the attribute value - BLCMM escapes quotes inside them using `\"`
+        for (idx++; idx < line.size() && line[idx] != '"'; idx++) {
+            if (line[idx] == '\\' && idx + 1 < line.size() && line[idx + 1] == '"') {
+                idx++;
+            }
+        }
+    }
+    throw UnsupportedStructure{};
+}
+
+/**
+ * @brief Gets the value of an attribute, decoded in the same way pugixml would.
+ *
+ * @param attributes The section of the tag containing all attributes.
+ * @param name The name of the attribute to get.
+ * @return The attribute's value, or an empty optional if it doesn't exist.
+ */
+std::optional<std::string> get_attribute(std::string_view attributes, std::string_view name) {
+    for (size_t idx = 0; idx < attributes.size();) {
+        auto name_start = attributes.find_first_not_of(" \t/", idx);
+        if (name_start == std::string_view::npos) {
+            break;
+        }
+        auto name_end = attributes.find('=', name_start);
+        if (name_end == std::string_view::npos || name_end + 1 >= attributes.size()
+            || attributes[name_end + 1] != '"') {
+            throw UnsupportedStructure{};
+        }
+
+        std::string value{};
+        for (idx = name_end + 2; idx < attributes.size() && attributes[idx] != '"'; idx++) {
+            auto chr = attributes[idx];
+            if (chr == '\\' && idx + 1 < attributes.size() && attributes[idx + 1] == '"') {
+                chr = '"';
+                idx++;
+            } else if (chr == '\t' || chr == '\r' || chr == '\n') {
+                chr = ' ';
+            }
+            value += chr;
+        }
+        if (idx >= attributes.size()) {
+            throw UnsupportedStructure{};
+        }
+        idx++;
+
+        if (attributes.substr(name_start, name_end - name_start) == name) {
+            return value;
+        }
+    }
+    return std::nullopt;
+}
+
+// A single tag on a BLCMM line
+struct Tag {
+    std::string_view name;
+    // The section of the tag containing the element's attributes
+    std::string_view attributes;
+    // The element's value, or an empty optional if it spans multiple lines
+    std::optional<std::string_view> content;
+    // True if this is a closing tag
+    bool is_closing;
+    // True if the element spans multiple lines, and is still open
+    bool is_open;
+};
+
+/**
+ * @brief Splits the tag on a line of a BLCMM file into its parts.
+ * @note Throws UnsupportedStructure if the line isn't in the format BLCMM writes.
+ *
+ * @param line The line to split.
+ * @return The tag, or an empty optional if the line should be skipped.
+ */
+std::optional<Tag> split_tag(std::string_view line) {
+    auto tag_start = line.find('<');
+    if (tag_start == std::string_view::npos) {
+        throw UnsupportedStructure{};
+    }
+    if (tag_start > 0
+        && line.substr(tag_start - 1).starts_with(blcm_preprocessor::FILTERTOOL_WARNING)) {
+        return std::nullopt;
+    }
+
+    auto tag_name_end = line.find_first_of("> \t", tag_start);
+    if (tag_name_end == std::string_view::npos) {
+        throw UnsupportedStructure{};
+    }
+    auto name = line.substr(tag_start + 1, tag_name_end - tag_start - 1);
+
+    if (name.starts_with('/')) {
+        return Tag{.name = name.substr(1),
+                   .attributes = {},
+                   .content = std::nullopt,
+                   .is_closing = true,
+                   .is_open = false};
+    }
+
+    auto tag_end = find_tag_end(line, tag_name_end);
+    auto attributes = line.substr(tag_name_end, tag_end - tag_name_end);
+
+    auto self_closing = line[tag_end - 1] == '/';
+    if (name.ends_with('/')) {
+        name.remove_suffix(1);
+    }
+
+    std::optional<std::string_view> content = std::nullopt;
+    if (!self_closing) {
+        auto rest = line.substr(tag_end + 1);
+        if (std::ranges::any_of(rest, [](auto chr) { return std::isspace(chr) == 0; })) {
+            // Single line element, make sure it closes properly, same as the preprocessor
+            auto closing_tag_start = rest.rfind("</");
+            if (closing_tag_start == std::string_view::npos
+                || rest.substr(closing_tag_start + 2, name.size()) != name) {
+                throw UnsupportedStructure{};
+            }
+            auto closing_tag_end =
+                rest.find_first_not_of(" \t", closing_tag_start + 2 + name.size());
+            if (closing_tag_end == std::string_view::npos || rest[closing_tag_end] != '>') {
+                throw UnsupportedStructure{};
+            }
+            content = rest.substr(0, closing_tag_start);
+        }
+    }
+
+    return Tag{.name = name,
+               .attributes = attributes,
+               .content = content,
+               .is_closing = false,
+               .is_open = !self_closing && !content.has_value()};
+}
+
+/**
+ * @brief Single pass scanner which collects the enabled commands in a BLCMM file, without building
+ *        a full DOM.
+ * @note Relies on the line based structure BLCMM writes - each line contains exactly one tag,
+ *       either an opening tag, a closing tag, or a full element. This is the same assumption the
+ *       preprocessor makes.
+ */
+class BlcmmScanner {
+   private:
+    enum class ElementType : uint8_t {
+        ROOT,
+        HEAD,
+        PROFILES,
+        BODY,
+        CATEGORY,
+        HOTFIX,
+        IGNORED,
+    };
+
+    struct OpenElement {
+        std::string name;
+        ElementType type;
+    };
+
+    // This is slightly bad practice, but we're not using this as a normal class, we'll never
+    // transfer these objects, it makes the code cleaner to just act like they're all locals
+    // NOLINTNEXTLINE(cppcoreguidelines-avoid-const-or-ref-data-members)
+    std::vector<CommandMatch>& output;
+    // If not null, the lines we're given only live until the next one, so we need to copy any
+    // matches into here
+    std::deque<std::string>* line_storage;
+
+    std::vector<OpenElement> elements;
+    // One block per open category, innermost last. A deque so they never need to be moved.
+    std::deque<CommandBlock> blocks;
+
+    std::optional<std::string> profile;
+    bool seen_body = false;
+    bool seen_root_category = false;
+
+    /**
+     * @brief Handles a comment inside a category.
+     *
+     * @param value The comment's value.
+     * @param line_number The line's 1-indexed line number.
+     * @param offset The byte offset of the start of the line.
+     */
+    void handle_comment(std::string_view value, size_t line_number, size_t offset) {
+        auto [cmd, match] = try_match_command(value, false);
+        if (cmd.empty()) {
+            return;
+        }
+
+        if (this->line_storage != nullptr) {
+            value = this->line_storage->emplace_back(value);
+            match.line = value;
+            cmd = value.substr(match.cmd_start, match.cmd_len - match.cmd_start);
+        }
+        match.line_number = line_number;
+        match.offset = offset;
+
+        this->blocks.back().handle_standard_command(cmd, value, std::move(match));
+    }
+
+    /**
+     * @brief Handles an element inside a category.
+     *
+     * @param name The element's name.
+     * @param attributes The section of the tag containing the element's attributes.
+     * @param content The element's value, or an empty optional if it spans multiple lines.
+     * @param is_open True if the element spans multiple lines, and is still open.
+     * @param line_number The line's 1-indexed line number.
+     * @param offset The byte offset of the start of the line.
+     * @return The type to track the element as, if it's open.
+     */
+    ElementType handle_category_child(std::string_view name,
+                                      std::string_view attributes,
+                                      std::optional<std::string_view> content,
+                                      bool is_open,
+                                      size_t line_number,
+                                      size_t offset) {
+        static const constexpr CaseInsensitiveStringView category = "category";
+        if (name == category) {
+            if (is_open) {
+                this->blocks.emplace_back(this->output, this->blocks.back().strategy);
+                return ElementType::CATEGORY;
+            }
+            return ElementType::IGNORED;
+        }
+
+        static const constexpr CaseInsensitiveStringView comment = "comment";
+        if (name == comment) {
+            if (content.has_value()) {
+                this->handle_comment(*content, line_number, offset);
+            }
+            return ElementType::IGNORED;
+        }
+
+        static const constexpr CaseInsensitiveStringView code = "code";
+        if (name == code) {
+            auto is_enabled = blcm_preprocessor::in_comma_separated_list(
+                this->profile.value_or("default"),
+                get_attribute(attributes, "profiles").value_or(""));
+
+            this->blocks.back().handle_standard_command(is_enabled);
+            return ElementType::IGNORED;
+        }
+
+        // A hotfix's children are logically on the same layer as it, but this doesn't recurse
+        static const constexpr CaseInsensitiveStringView hotfix = "hotfix";
+        if (name == hotfix && this->elements.back().type == ElementType::CATEGORY) {
+            return ElementType::HOTFIX;
+        }
+
+        return ElementType::IGNORED;
+    }
+
+    /**
+     * @brief Handles a new element.
+     *
+     * @param name The element's name.
+     * @param attributes The section of the tag containing the element's attributes.
+     * @param content The element's value, or an empty optional if it spans multiple lines.
+     * @param is_open True if the element spans multiple lines, and is still open.
+     * @param line_number The line's 1-indexed line number.
+     * @param offset The byte offset of the start of the line.
+     * @return The type to track the element as, if it's open.
+     */
+    ElementType handle_element(std::string_view name,
+                               std::string_view attributes,
+                               std::optional<std::string_view> content,
+                               bool is_open,
+                               size_t line_number,
+                               size_t offset) {
+        // These all match the exact paths the DOM parser uses
+        switch (this->elements.back().type) {
+            case ElementType::ROOT:
+                if (name == "head") {
+                    // If the profiles come after the body, we'd need to go back over it
+                    if (this->seen_body) {
+                        throw UnsupportedStructure{};
+                    }
+                    return ElementType::HEAD;
+                }
+                if (name == "body") {
+                    this->seen_body = true;
+                    return ElementType::BODY;
+                }
+                return ElementType::IGNORED;
+
+            case ElementType::HEAD:
+                return name == "profiles" ? ElementType::PROFILES : ElementType::IGNORED;
+
+            case ElementType::PROFILES:
+                if (name == "profile" && !this->profile.has_value()
+                    && get_attribute(attributes, "current") == "true") {
+                    this->profile = get_attribute(attributes, "name");
+                }
+                return ElementType::IGNORED;
+
+            case ElementType::BODY:
+                // Only the first category in the body is used
+                if (name == "category" && !this->seen_root_category) {
+                    this->seen_root_category = true;
+                    if (is_open) {
+                        this->blocks.emplace_back(this->output, EnableStrategy::ANY);
+                        return ElementType::CATEGORY;
+                    }
+                }
+                return ElementType::IGNORED;
+
+            case ElementType::CATEGORY:
+            case ElementType::HOTFIX:
+                return this->handle_category_child(name, attributes, content, is_open, line_number,
+                                                   offset);
+
+            case ElementType::IGNORED:
+            default:
+                return ElementType::IGNORED;
+        }
+    }
+
+   public:
+    /**
+     * @brief Creates a new scanner.
+     *
+     * @param output The list of commands to output to.
+     * @param line_storage If not null, storage to copy matched lines into. Must be provided if the
+     *                     lines passed to `handle_line` don't outlive the scanner.
+     */
+    BlcmmScanner(std::vector<CommandMatch>& output, std::deque<std::string>* line_storage)
+        : output(output), line_storage(line_storage) {}
+
+    /**
+     * @brief Handles the next line of the file.
+     * @note Throws UnsupportedStructure if the file needs to be parsed using the DOM parser.
+     *
+     * @param line The line to handle.
+     * @param line_number The line's 1-indexed line number.
+     * @param offset The byte offset of the start of the line.
+     * @return True while there may be more lines, false once the root element closes.
+     */
+    bool handle_line(std::string_view line, size_t line_number, size_t offset) {
+        auto tag = split_tag(line);
+        if (!tag.has_value()) {
+            return true;
+        }
+
+        if (tag->is_closing) {
+            if (this->elements.empty() || this->elements.back().name != tag->name) {
+                throw UnsupportedStructure{};
+            }
+            if (this->elements.back().type == ElementType::CATEGORY) {
+                this->blocks.pop_back();
+            }
+            this->elements.pop_back();
+            return !this->elements.empty();
+        }
+
+        if (this->elements.empty()) {
+            if (tag->name != "BLCMM" || !tag->is_open) {
+                throw UnsupportedStructure{};
+            }
+            this->elements.push_back({.name = std::string{tag->name}, .type = ElementType::ROOT});
+            return true;
+        }
+
+        auto type = this->handle_element(tag->name, tag->attributes, tag->content, tag->is_open,
+                                         line_number, offset);
+        if (tag->is_open) {
+            this->elements.push_back({.name = std::string{tag->name}, .type = type});
+        }
+        return true;
+    }
+
+    /**
+     * @brief Finishes scanning, after the last line.
+     * @note Throws UnsupportedStructure if the file needs to be parsed using the DOM parser.
+     */
+    void finish(void) {
+        if (!this->elements.empty() || !this->seen_root_category) {
+            throw UnsupportedStructure{};
+        }
+    }
+};
+
+/**
+ * @brief Moves the lines of a set of matches into a buffer, which they then hold views into.
+ *
+ * @param matches The matches to move.
+ * @param buffer The buffer to move the lines into.
+ */
+void move_lines_into_buffer(std::vector<CommandMatch>& matches, std::string& buffer) {
+    size_t total_size = 0;
+    for (const auto& match : matches) {
+        total_size += match.line.size() + 1;
+    }
+
+    buffer.clear();
+    buffer.reserve(total_size);
+    for (const auto& match : matches) {
+        buffer += match.line;
+        buffer += '\0';
+    }
+
+    // Only take views once the buffer's finished, so it can't reallocate under us
+    size_t line_start = 0;
+    for (auto& match : matches) {
+        auto line_size = match.line.size();
+        match.line = std::string_view{buffer}.substr(line_start, line_size);
+        match.null_terminated = true;
+        line_start += line_size + 1;
+    }
+}
+
+/**
+ * @brief Scans through a blcmm file stream in a single pass, collecting all matching commands.
+ * @note Throws UnsupportedStructure if the file needs to be parsed using the DOM parser.
+ *
+ * @param stream The stream to read from.
+ * @param buffer Buffer to hold the matched lines in.
+ * @return A list of enabled command matches, with their positions filled in.
+ */
+std::vector<CommandMatch> scan_blcmm_file(std::istream& stream, std::string& buffer) {
+    std::vector<CommandMatch> output{};
+    std::deque<std::string> line_storage{};
+    {
+        BlcmmScanner scanner{output, &line_storage};
+
+        size_t offset = 0;
+        size_t line_number = 0;
+        for (std::string line; std::getline(stream, line);) {
+            auto line_start = offset;
+            offset += line.size() + 1;
+            line_number++;
+
+#ifdef _WIN32
+            // If the stream was opened in binary mode, match the CRLF conversion text mode does
+            if (line.ends_with('\r')) {
+                line.pop_back();
+            }
+#endif
+
+            if (!scanner.handle_line(line, line_number, line_start)) {
+                break;
+            }
+        }
+        if (stream.bad()) {
+            throw blcm_preprocessor::ParserError("IO Error while reading input");
+        }
+
+        scanner.finish();
+    }
+
+    move_lines_into_buffer(output, buffer);
+    return output;
+}
+
+/**
+ * @brief Scans through an in memory blcmm file in a single pass, collecting all matching commands.
+ * @note Throws UnsupportedStructure if the file needs to be parsed using the DOM parser.
+ *
+ * @param data The file contents. Not referenced by the returned matches.
+ * @param buffer Buffer to hold the matched lines in.
+ * @return A list of enabled command matches, with their positions filled in.
+ */
+std::vector<CommandMatch> scan_blcmm_file(std::string_view data, std::string& buffer) {
+    std::vector<CommandMatch> output{};
+    {
+        BlcmmScanner scanner{output, nullptr};
+
+        size_t line_number = 0;
+        for (size_t line_start = 0; line_start < data.size();) {
+            line_number++;
+
+            auto line_end = data.find('\n', line_start);
+            auto line = data.substr(line_start, line_end - line_start);
+            auto offset = line_start;
+            line_start = (line_end == std::string_view::npos) ? data.size() : line_end + 1;
+
+#ifdef _WIN32
+            // Match the CRLF conversion text mode streams do on Windows
+            if (line_end != std::string_view::npos && line.ends_with('\r')) {
+                line.remove_suffix(1);
+            }
+#endif
+
+            if (!scanner.handle_line(line, line_number, offset)) {
+                break;
+            }
+        }
+
+        scanner.finish();
+    }
+
+    move_lines_into_buffer(output, buffer);
+    return output;
+}
+
+/**
+ * @brief Parses through a blcmm file stream using the DOM parser.
+ *
+ * @param stream The stream to read from.
+ * @param buffer Buffer to hold the processed file in.
+ * @param with_positions If true, fills in the position of each match in the original file.
+ * @return A list of enabled command matches
+ */
+std::vector<CommandMatch> parse_blcmm_file_dom(std::istream& stream,
+                                               std::string& buffer,
+                                               bool with_positions) {
+    std::vector<blcm_preprocessor::LineStart> line_starts{};
+
+    std::stringstream processed_xml{};
+    blcm_preprocessor::preprocess(stream, processed_xml, with_positions ? &line_starts : nullptr);
+    // Move the string out of the stream
+    buffer = std::move(processed_xml).str();
+
+    auto matches = parse_processed_xml(buffer);
+    if (with_positions) {
+        add_positions(matches, buffer, line_starts);
+    }
+    return matches;
+}
+
+/**
+ * @brief Parses through an in memory blcmm file using the DOM parser.
+ *
+ * @param data The file contents. Not referenced by the returned matches.
+ * @param buffer Buffer to hold the processed file in.
+ * @param with_positions If true, fills in the position of each match in the original file.
+ * @return A list of enabled command matches
+ */
+std::vector<CommandMatch> parse_blcmm_file_dom(std::string_view data,
+                                               std::string& buffer,
+                                               bool with_positions) {
+    std::vector<blcm_preprocessor::LineStart> line_starts{};
+
+    // Preprocessing directly into the buffer pugixml parses in place means this is the only copy of
+    // the file we make
+    buffer.clear();
+    // Escaping means we'll generally end up a little bigger than the input
+    buffer.reserve(data.size() + (data.size() / 8));
+    blcm_preprocessor::preprocess(data, buffer, with_positions ? &line_starts : nullptr);
+
+    auto matches = parse_processed_xml(buffer);
+    if (with_positions) {
+        add_positions(matches, buffer, line_starts);
+    }
+    return matches;
+}
+
+}  // namespace
+
+std::vector<CommandMatch> parse_blcmm_file(std::istream& stream,
+                                           std::string& buffer,
+                                           bool with_positions,
+                                           bool use_dom) {
+    if (!use_dom) {
+        auto start = stream.tellg();
+        try {
+            return scan_blcmm_file(stream, buffer);
+        } catch (const UnsupportedStructure&) {
+            // Rewind and try again
+            stream.clear();
+            stream.seekg(start);
+        }
+    }
+
+    return parse_blcmm_file_dom(stream, buffer, with_positions);
+}
+
+std::vector<CommandMatch> parse_blcmm_file(std::string_view data,
+                                           std::string& buffer,
+                                           bool with_positions,
+                                           bool use_dom) {
+    if (!use_dom) {
+        try {
+            return scan_blcmm_file(data, buffer);
+        } catch (const UnsupportedStructure&) {}
+    }
+
+    return parse_blcmm_file_dom(data, buffer, with_positions);
+}
+
+void get_blcmm_mod_info(std::string_view data, ModInfo& info) {
+    // Matches how TextModLoader reads the DOM: take all comments at the start of the root category,
+    // unless they're immediately followed by a description category, in which case take all
+    // comments at the start of that instead
+    enum class CommentState : uint8_t { BEFORE_ROOT, ROOT, DESCRIPTION, DONE };
+    auto state = CommentState::BEFORE_ROOT;
+
+    // Since we exit early, we can only extract this if the head comes before the body - which it
+    // always does in files BLCMM writes
+    std::vector<std::string_view> elements{};
+
+    auto& comments = info.comments.emplace();
+    auto handle_comment = [&](const Tag& tag) {
+        if (tag.name != "comment" || tag.is_open) {
+            return false;
+        }
+        auto value = tag.content.value_or("");
+        if (is_info_command(value, false)) {
+            return false;
+        }
+        comments.emplace_back(value);
+        return true;
+    };
+
+    try {
+        std::string_view line;
+        for (size_t offset = 0; state != CommentState::DONE && next_line(data, offset, line);) {
+            auto tag = split_tag(line);
+            if (!tag.has_value()) {
+                continue;
+            }
+
+            if (tag->is_closing) {
+                if (elements.empty()) {
+                    break;
+                }
+                elements.pop_back();
+                if ((state == CommentState::ROOT && elements.size() <= 2)
+                    || (state == CommentState::DESCRIPTION && elements.size() <= 3)) {
+                    state = CommentState::DONE;
+                }
+                continue;
+            }
+
+            auto depth = elements.size();
+            if (depth == 0) {
+                if (tag->name != "BLCMM") {
+                    break;
+                }
+                if (get_attribute(tag->attributes, "v") != "1") {
+                    throw blcm_preprocessor::ParserError("Unknown BLCMM file version");
+                }
+            } else if (depth == 2 && elements[1] == "head") {
+                if (tag->name == "type" && !info.game.has_value()) {
+                    info.game = get_attribute(tag->attributes, "name");
+                    if (info.game == "") {
+                        info.game = std::nullopt;
+                    }
+                }
+            } else if (depth == 2 && elements[1] == "body") {
+                if (tag->name == "category" && state == CommentState::BEFORE_ROOT) {
+                    state = tag->is_open ? CommentState::ROOT : CommentState::DONE;
+                }
+            } else if (depth == 3 && state == CommentState::ROOT) {
+                if (tag->name == "category") {
+                    state = CommentState::DONE;
+                    auto name = get_attribute(tag->attributes, "name").value_or("");
+                    if (is_description_category(name)) {
+                        comments.clear();
+                        if (tag->is_open) {
+                            state = CommentState::DESCRIPTION;
+                        }
+                    }
+                } else if (!handle_comment(*tag)) {
+                    state = CommentState::DONE;
+                }
+            } else if (depth == 4 && state == CommentState::DESCRIPTION) {
+                if (!handle_comment(*tag)) {
+                    state = CommentState::DONE;
+                }
+            }
+
+            if (tag->is_open) {
+                elements.push_back(tag->name);
+            }
+        }
+    } catch (const UnsupportedStructure&) {
+        // Just keep whatever we managed to extract, we only need a best effort
+    }
+}
+
 }  // namespace ce
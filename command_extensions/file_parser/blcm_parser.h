@@ -3,6 +3,7 @@
 
 #include "pch.h"
 #include "matcher.h"
+#include "mod_info.h"
 
 namespace ce {
 
@@ -13,10 +14,52 @@ enum class EnableStrategy { ALL, ANY, FORCE, NEXT };
 
 /**
  * @brief Parses through a blcmm file stream, collecting all matching commands.
+ * @note By default, first tries a single pass scan, which only needs memory proportional to the
+ *       category depth and the number of matches. If the file has an unusual structure, falls back
+ *       to preprocessing it into xml and parsing the full DOM, which needs the stream to be
+ *       seekable.
  *
+ * @param stream The stream to read from.
+ * @param buffer Buffer to hold the matched lines in. Must be kept alive, and not be modified, for
+ *               as long as the returned matches are used.
+ * @param with_positions If true, fills in the position of each match in the original file. May
+ *                       also be filled in if false, if it's free to do so.
+ * @param use_dom If true, always uses the DOM parser.
  * @return A list of enabled command matches
  */
-std::vector<CommandMatch> parse_blcmm_file(std::istream& stream);
+std::vector<CommandMatch> parse_blcmm_file(std::istream& stream,
+                                           std::string& buffer,
+                                           bool with_positions = false,
+                                           bool use_dom = false);
+
+/**
+ * @brief Parses through an in memory blcmm file, collecting all matching commands.
+ * @note By default, first tries a single pass scan, which only needs memory proportional to the
+ *       category depth and the number of matches. If the file has an unusual structure, falls back
+ *       to preprocessing it into xml and parsing the full DOM.
+ *
+ * @param data The file contents. Not referenced by the returned matches.
+ * @param buffer Buffer to hold the matched lines in. Must be kept alive, and not be modified, for
+ *               as long as the returned matches are used.
+ * @param with_positions If true, fills in the position of each match in the original file. May
+ *                       also be filled in if false, if it's free to do so.
+ * @param use_dom If true, always uses the DOM parser.
+ * @return A list of enabled command matches
+ */
+std::vector<CommandMatch> parse_blcmm_file(std::string_view data,
+                                           std::string& buffer,
+                                           bool with_positions = false,
+                                           bool use_dom = false);
+
+/**
+ * @brief Extracts the game and first comment block out of an in memory blcmm file.
+ * @note Only reads as far into the file as it needs to. Throws a ParserError if the file has an
+ *       unknown version.
+ *
+ * @param data The file contents.
+ * @param info The info object to fill in.
+ */
+void get_blcmm_mod_info(std::string_view data, ModInfo& info);
 
 }  // namespace ce
 
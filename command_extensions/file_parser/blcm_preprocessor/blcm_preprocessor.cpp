@@ -11,35 +11,31 @@ namespace blcm_preprocessor {
 
 namespace {
 
-constexpr std::string_view FILTERTOOL_WARNING =
-    "#<!!!You opened a file saved with BLCMM in FilterTool. Please update to BLCMM to properly "
-    "open this file!!!>";
-
 /**
- * @brief Adds a character to the stream, xml escaping if needed.
+ * @brief Adds a character to the output, xml escaping if needed.
  *
  * @param chr The character to add.
- * @param stream The stream to write to.
+ * @param output The string to write to.
  */
-constexpr void put_xml_escaped(char chr, std::ostream& stream) {
+constexpr void put_xml_escaped(char chr, std::string& output) {
     switch (chr) {
         case '"':
-            stream << "&quot;";
+            output += "&quot;";
             break;
         case '\'':
-            stream << "&apos;";
+            output += "&apos;";
             break;
         case '<':
-            stream << "&lt;";
+            output += "&lt;";
             break;
         case '>':
-            stream << "&gt;";
+            output += "&gt;";
             break;
         case '&':
-            stream << "&amp;";
+            output += "&amp;";
             break;
         default:
-            stream << chr;
+            output += chr;
             break;
     }
 }
@@ -86,12 +82,12 @@ bool check_root_tag_closed(std::string_view tag_name, RootTagState& root_tag_sta
  * @brief Process though any attributes and return the start of the content.
  *
  * @param line The line to process.
- * @param xml_output The stream to output valid xml into.
+ * @param xml_output The string to output valid xml into.
  * @param tag_name_end The index into the line where the tag name ends.
  * @return The index into the line where the content starts.
  */
 size_t process_attributes_and_get_content_start(std::string_view line,
-                                                std::ostream& xml_output,
+                                                std::string& xml_output,
                                                 size_t tag_name_end) {
     // If there was no whitespace at the end of the tag, return immediately
     if (line[tag_name_end] == '>') {
@@ -106,7 +102,7 @@ size_t process_attributes_and_get_content_start(std::string_view line,
             throw ParserError(std::format("Failed to parse line (tag doesn't close):\n{}", line));
         }
 
-        xml_output << line.substr(tag_body_section_start,
+        xml_output += line.substr(tag_body_section_start,
                                   tag_body_section_end - tag_body_section_start + 1);
 
         // We found the end of the tag
@@ -126,7 +122,7 @@ size_t process_attributes_and_get_content_start(std::string_view line,
                 continue;
             }
             if (chr == '"') {
-                xml_output << '"';
+                xml_output += '"';
                 tag_body_section_start = idx + 1;
                 finished_attribute = true;
                 break;
@@ -144,11 +140,11 @@ size_t process_attributes_and_get_content_start(std::string_view line,
  * @brief Process though the content of a tag, after seeing the opening tag.
  *
  * @param line The line to process.
- * @param xml_output The stream to output valid xml into.
+ * @param xml_output The string to output valid xml into.
  * @param tag_name_end The index into the line where the tag name ends.
  */
 void process_tag_content(std::string_view line,
-                         std::ostream& xml_output,
+                         std::string& xml_output,
                          std::string_view tag_name,
                          size_t content_start) {
     // We've not sure if we have a single or multiline tag yet
@@ -160,7 +156,7 @@ void process_tag_content(std::string_view line,
         if (std::isspace(chr) == 0) {
             break;
         }
-        xml_output << chr;
+        xml_output += chr;
     }
 
     if (ittr == line.end()) {
@@ -189,19 +185,21 @@ void process_tag_content(std::string_view line,
         put_xml_escaped(chr, xml_output);
     }
 
-    xml_output << "</" << tag_name << ">";
+    xml_output += "</";
+    xml_output += tag_name;
+    xml_output += '>';
 }
 
 /**
  * @brief Preprocesses an individual line of a blcmm file.
  *
  * @param line The line to process
- * @param xml_output The stream to output valid xml into.
+ * @param xml_output The string to output valid xml into.
  * @param root_tag_state Extra state required by the root tag processing.
  * @return True while successfully processed, false after the end of the document.
  */
 bool preprocess_line(std::string_view line,
-                     std::ostream& xml_output,
+                     std::string& xml_output,
                      RootTagState& root_tag_state) {
     auto tag_start = line.find_first_of('<');
     if (tag_start == std::string_view::npos) {
@@ -223,12 +221,14 @@ bool preprocess_line(std::string_view line,
     // Note this may include a leading `/` if looking at a closing tag
     auto tag_name = line.substr(tag_start + 1, tag_name_end - tag_start - 1);
 
-    xml_output << '<' << tag_name << line[tag_name_end];
+    xml_output += '<';
+    xml_output += tag_name;
+    xml_output += line[tag_name_end];
 
     if (check_root_tag_closed(tag_name, root_tag_state)) {
         // Add the closing `>` if we didn't previously
         if (line[tag_name_end] != '>') {
-            xml_output << '>';
+            xml_output += '>';
         }
         return false;
     }
@@ -238,7 +238,7 @@ bool preprocess_line(std::string_view line,
     if (tag_name[0] == '/') {
         // Again may need to add the closing `>`
         if (line[tag_name_end] != '>') {
-            xml_output << '>';
+            xml_output += '>';
         }
         return true;
     }
@@ -256,12 +256,36 @@ bool preprocess_line(std::string_view line,
 
 }  // namespace
 
-void preprocess(std::istream& blcmm_input, std::ostream& xml_output) {
+void preprocess(std::istream& blcmm_input,
+                std::ostream& xml_output,
+                std::vector<LineStart>* line_starts) {
     RootTagState root_tag_state{};
 
-    for (std::string line;
-         std::getline(blcmm_input, line) && preprocess_line(line, xml_output, root_tag_state);) {
-        xml_output << std::flush;
+    size_t input_offset = 0;
+    size_t output_offset = 0;
+
+    std::string processed_line;
+    for (std::string line; std::getline(blcmm_input, line);) {
+        if (line_starts != nullptr) {
+            line_starts->push_back({.input_offset = input_offset, .output_offset = output_offset});
+        }
+        input_offset += line.size() + 1;
+
+#ifdef _WIN32
+        // If the stream was opened in binary mode, match the CRLF conversion text mode does
+        if (line.ends_with('\r')) {
+            line.pop_back();
+        }
+#endif
+
+        processed_line.clear();
+        auto more_lines = preprocess_line(line, processed_line, root_tag_state);
+        output_offset += processed_line.size();
+
+        xml_output << processed_line << std::flush;
+        if (!more_lines) {
+            break;
+        }
     }
 
     if (blcmm_input.fail()) {
@@ -280,6 +304,38 @@ void preprocess(std::istream& blcmm_input, std::ostream& xml_output) {
     }
 }
 
+void preprocess(std::string_view blcmm_input,
+                std::string& xml_output,
+                std::vector<LineStart>* line_starts) {
+    RootTagState root_tag_state{};
+
+    for (size_t line_start = 0; line_start < blcmm_input.size();) {
+        if (line_starts != nullptr) {
+            line_starts->push_back({.input_offset = line_start, .output_offset = xml_output.size()});
+        }
+
+        auto line_end = blcmm_input.find('\n', line_start);
+        auto line = blcmm_input.substr(line_start, line_end - line_start);
+        line_start = (line_end == std::string_view::npos) ? blcmm_input.size() : line_end + 1;
+
+#ifdef _WIN32
+        // Match the CRLF conversion text mode streams do on Windows
+        if (line_end != std::string_view::npos && line.ends_with('\r')) {
+            line.remove_suffix(1);
+        }
+#endif
+
+        if (!preprocess_line(line, xml_output, root_tag_state)) {
+            return;
+        }
+    }
+
+    // If we didn't have an opening tag, it's an empty file, exit without error
+    if (root_tag_state.started()) {
+        throw ParserError("IO Error while reading input (eof)");
+    }
+}
+
 bool in_comma_separated_list(std::string_view value, std::string_view list) {
     for (size_t entry_start = 0; entry_start < list.size();) {
         auto entry_end = list.find_first_of(',', entry_start);
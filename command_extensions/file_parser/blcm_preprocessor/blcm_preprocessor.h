@@ -3,7 +3,9 @@
 
 #include <iostream>
 #include <stdexcept>
+#include <string>
 #include <string_view>
+#include <vector>
 
 namespace blcm_preprocessor {
 
@@ -11,6 +13,20 @@ class ParserError : public std::runtime_error {
     using std::runtime_error::runtime_error;
 };
 
+// The warning line FilterTool adds to BLCMM files, which should be ignored
+constexpr std::string_view FILTERTOOL_WARNING =
+    "#<!!!You opened a file saved with BLCMM in FilterTool. Please update to BLCMM to properly "
+    "open this file!!!>";
+
+// Maps a line of the input to where it ended up in the output
+struct LineStart {
+    // The offset of the first character of the line in the input
+    size_t input_offset;
+    // The offset of the first character generated from this line in the output. If a line
+    // generates no output, this is the same as the next line.
+    size_t output_offset;
+};
+
 /**
  * @brief Preprocesses a BLCMM file into valid xml.
  * @note Leaves the stream directly after the line with the closing `</BLCMM>` tag.
@@ -19,8 +35,29 @@ class ParserError : public std::runtime_error {
  *
  * @param blcmm_input The stream containing a blcm file to consume as input.
  * @param xml_output The stream to output valid xml into.
+ * @param line_starts If not null, filled with an entry for each line of the input, which may be
+ *                    used to map positions in the output back to the input. Offsets are relative
+ *                    to where the streams started.
+ */
+void preprocess(std::istream& blcmm_input,
+                std::ostream& xml_output,
+                std::vector<LineStart>* line_starts = nullptr);
+
+/**
+ * @brief Preprocesses a BLCMM file held in memory into valid xml.
+ * @note Anything after the line with the closing `</BLCMM>` tag is ignored.
+ * @note BLCMM files use the system codepage, in case you need to translate encoding later. As all
+ *       structure is ASCII, this function has no issues with files using these characters.
+ *
+ * @param blcmm_input The contents of a blcm file to consume as input.
+ * @param xml_output The string to append valid xml to.
+ * @param line_starts If not null, filled with an entry for each line of the input, which may be
+ *                    used to map positions in the output back to the input. Output offsets are
+ *                    relative to the start of the string, including any existing contents.
  */
-void preprocess(std::istream& blcmm_input, std::ostream& xml_output);
+void preprocess(std::string_view blcmm_input,
+                std::string& xml_output,
+                std::vector<LineStart>* line_starts = nullptr);
 
 /**
  * @brief Checks if a string is in a comma separated list.
@@ -0,0 +1,80 @@
+#include "command_set.h"
+
+#include <algorithm>
+
+namespace ce {
+
+namespace {
+
+constexpr auto LOWER_TABLE = []() {
+    std::array<char, 256> table{};
+    for (size_t idx = 0; idx < table.size(); idx++) {
+        auto chr = (char)idx;
+        table[idx] = ('A' <= chr && chr <= 'Z') ? (char)(chr - 'A' + 'a') : chr;
+    }
+    return table;
+}();
+
+// Most commands are short enough to fit in this buffer, so we don't need to allocate while
+// lowercasing them
+constexpr size_t LOWERCASE_BUFFER_SIZE = 64;
+
+}  // namespace
+
+char ascii_tolower(char chr) {
+    return LOWER_TABLE[(unsigned char)chr];
+}
+
+void CommandSet::clear(void) {
+    this->commands.clear();
+    this->lengths.reset();
+    this->first_chars.reset();
+    this->max_length = 0;
+}
+
+bool CommandSet::add(std::string_view cmd) {
+    if (cmd.empty()) {
+        return false;
+    }
+
+    std::string lower{cmd};
+    std::ranges::transform(lower, lower.begin(), ascii_tolower);
+
+    if (cmd.size() < MAX_TRACKED_LENGTH) {
+        this->lengths.set(cmd.size());
+    }
+    this->first_chars.set((unsigned char)lower.front());
+    this->max_length = std::max(this->max_length, cmd.size());
+
+    return this->commands.emplace(std::move(lower)).second;
+}
+
+bool CommandSet::contains(std::string_view cmd) const {
+    if (cmd.empty() || cmd.size() > this->max_length) {
+        return false;
+    }
+    if (cmd.size() < MAX_TRACKED_LENGTH && !this->lengths.test(cmd.size())) {
+        return false;
+    }
+    if (!this->first_chars.test((unsigned char)ascii_tolower(cmd.front()))) {
+        return false;
+    }
+
+    if (cmd.size() <= LOWERCASE_BUFFER_SIZE) {
+        std::array<char, LOWERCASE_BUFFER_SIZE> buffer{};
+        std::ranges::transform(cmd, buffer.begin(), ascii_tolower);
+        return this->commands.contains(std::string_view{buffer.data(), cmd.size()});
+    }
+
+    std::string lower{cmd};
+    std::ranges::transform(lower, lower.begin(), ascii_tolower);
+    return this->commands.contains(lower);
+}
+
+std::vector<std::string> CommandSet::list(void) const {
+    std::vector<std::string> sorted{this->commands.begin(), this->commands.end()};
+    std::ranges::sort(sorted);
+    return sorted;
+}
+
+}  // namespace ce
@@ -0,0 +1,78 @@
+#ifndef FILE_PARSER_COMMAND_SET_H
+#define FILE_PARSER_COMMAND_SET_H
+
+// This file deliberately doesn't depend on Python, so that it can be benchmarked standalone
+
+#include <array>
+#include <bitset>
+#include <cstdint>
+#include <functional>
+#include <string>
+#include <string_view>
+#include <unordered_set>
+#include <vector>
+
+namespace ce {
+
+/**
+ * @brief Converts an ASCII character to lowercase.
+ * @note Uses a lookup table, rather than going through the locale like `std::tolower`.
+ *
+ * @param chr The character to convert.
+ * @return The lowercase character.
+ */
+char ascii_tolower(char chr);
+
+/**
+ * @brief A set of command names, which are matched case insensitively.
+ */
+class CommandSet {
+   private:
+    struct Hash {
+        using is_transparent = void;
+        size_t operator()(std::string_view str) const { return std::hash<std::string_view>{}(str); }
+    };
+
+    // All commands are stored lowercase
+    std::unordered_set<std::string, Hash, std::equal_to<>> commands;
+
+    // Before hashing, we can quickly reject most non-commands by looking at their length and first
+    // character. Any commands longer than the bitset are assumed to always match the length check.
+    static constexpr size_t MAX_TRACKED_LENGTH = 64;
+    std::bitset<MAX_TRACKED_LENGTH> lengths;
+    std::bitset<256> first_chars;
+    size_t max_length = 0;
+
+   public:
+    /**
+     * @brief Removes all commands from the set.
+     */
+    void clear(void);
+
+    /**
+     * @brief Adds a command to the set.
+     *
+     * @param cmd The command to add.
+     * @return True if the command was newly added, false if it was already in the set.
+     */
+    bool add(std::string_view cmd);
+
+    /**
+     * @brief Checks if the set contains a command.
+     *
+     * @param cmd The command to check, in any case.
+     * @return True if the command is in the set.
+     */
+    [[nodiscard]] bool contains(std::string_view cmd) const;
+
+    /**
+     * @brief Gets all commands in the set.
+     *
+     * @return The lowercase commands, sorted.
+     */
+    [[nodiscard]] std::vector<std::string> list(void) const;
+};
+
+}  // namespace ce
+
+#endif /* FILE_PARSER_COMMAND_SET_H */
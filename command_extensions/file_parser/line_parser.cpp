@@ -1,34 +1,84 @@
 #include "pch.h"
 #include "line_parser.h"
+#include "mapped_file.h"
 #include "matcher.h"
 
 namespace ce {
 
-std::vector<CommandMatch> parse_file_line_by_line(std::istream& stream) {
-    std::vector<CommandMatch> output{};
+namespace {
 
-    std::string line;
-    while (std::getline(stream, line)) {
-        auto [cmd, match] = try_match_command(line);
-        if (cmd.empty()) {
-            continue;
-        }
+/**
+ * @brief Handles a single line of the file.
+ *
+ * @param line The line to handle.
+ * @param null_terminated True if the line is directly followed by a null terminator.
+ * @param line_number The line's 1-indexed line number.
+ * @param offset The byte offset of the start of the line.
+ * @return The command match, or an empty optional if the line shouldn't be returned.
+ */
+std::optional<CommandMatch> handle_line(std::string_view line,
+                                        bool null_terminated,
+                                        size_t line_number,
+                                        size_t offset) {
+    auto [cmd, match] = try_match_command(line, null_terminated);
+    if (cmd.empty()) {
+        return std::nullopt;
+    }
+    match.line_number = line_number;
+    match.offset = offset;
+
+    static const constexpr CaseInsensitiveStringView enable_on = "CE_EnableOn";
+    if (cmd == enable_on) {
+        // Nothing to do in the line-based parser, but we should not return this command back
+        return std::nullopt;
+    }
+    static const constexpr CaseInsensitiveStringView new_cmd = "CE_NewCmd";
+    if (cmd == new_cmd) {
+        add_new_command(line.substr(match.cmd_len));
+        return std::nullopt;
+    }
+
+    return match;
+}
 
-        static const constexpr CaseInsensitiveStringView enable_on = "CE_EnableOn";
-        if (cmd == enable_on) {
-            // Nothing to do in the line-based parser, but we should not return this command back
-            continue;
+}  // namespace
+
+std::optional<CommandMatch> parse_next_line(std::istream& stream,
+                                            std::string& line_buffer,
+                                            size_t& offset,
+                                            size_t& line_number) {
+    while (std::getline(stream, line_buffer)) {
+        auto line_start = offset;
+        offset += line_buffer.size() + 1;
+        line_number++;
+
+#ifdef _WIN32
+        // If the stream was opened in binary mode, match the CRLF conversion text mode does
+        if (line_buffer.ends_with('\r')) {
+            line_buffer.pop_back();
         }
-        static const constexpr CaseInsensitiveStringView new_cmd = "CE_NewCmd";
-        if (cmd == new_cmd) {
-            add_new_command(std::string_view{line}.substr(match.cmd_len));
-            continue;
+#endif
+
+        if (auto match = handle_line(line_buffer, true, line_number, line_start)) {
+            return match;
         }
+    }
 
-        output.emplace_back(std::move(match));
+    return std::nullopt;
+}
+
+std::optional<CommandMatch> parse_next_line(std::string_view data,
+                                            size_t& offset,
+                                            size_t& line_number) {
+    std::string_view line;
+    for (auto line_start = offset; next_line(data, offset, line); line_start = offset) {
+        line_number++;
+        if (auto match = handle_line(line, false, line_number, line_start)) {
+            return match;
+        }
     }
 
-    return output;
+    return std::nullopt;
 }
 
 }  // namespace ce
@@ -7,11 +7,32 @@
 namespace ce {
 
 /**
- * @brief Parses through a file stream line by line, collecting all matching commands.
+ * @brief Reads through a file stream line by line, until it finds the next matching command.
  *
- * @return A list of command matches
+ * @param stream The stream to read from. Left directly after the matched line.
+ * @param line_buffer Buffer to read lines into. The returned match is a view into this buffer, so
+ *                    it's only valid until it's next modified.
+ * @param offset The number of bytes read from the stream so far. Incremented as lines are read.
+ * @param line_number The number of lines read from the stream so far. Incremented as lines are
+ *                    read.
+ * @return The next command match, or an empty optional if we reached the end of the stream.
  */
-std::vector<CommandMatch> parse_file_line_by_line(std::istream& stream);
+std::optional<CommandMatch> parse_next_line(std::istream& stream,
+                                            std::string& line_buffer,
+                                            size_t& offset,
+                                            size_t& line_number);
+
+/**
+ * @brief Reads through an in memory file line by line, until it finds the next matching command.
+ *
+ * @param data The file contents. The returned match is a view into this data.
+ * @param offset The offset to start reading at. Left directly after the matched line.
+ * @param line_number The number of lines read so far. Incremented as lines are read.
+ * @return The next command match, or an empty optional if we reached the end of the data.
+ */
+std::optional<CommandMatch> parse_next_line(std::string_view data,
+                                            size_t& offset,
+                                            size_t& line_number);
 
 }  // namespace ce
 
@@ -2,7 +2,11 @@
 #include "blcm_parser.h"
 #include "blcm_preprocessor/blcm_preprocessor.h"
 #include "line_parser.h"
+#include "mapped_file.h"
 #include "matcher.h"
+#include "mod_info.h"
+#include "obj_name_splitter.h"
+#include "parse_iterator.h"
 
 namespace ce {
 
@@ -19,11 +23,148 @@ pybind11::error_already_set file_not_found(const std::filesystem::path& filename
     return {};
 }
 
+/**
+ * @brief Converts a file error into the matching Python OSError subclass.
+ * @note Requires the GIL.
+ *
+ * @param err The error to convert.
+ */
+void set_file_error(const FileError& err) {
+    // Using the base OSError lets Python pick the subclass based on the error code, e.g.
+    // FileNotFoundError or PermissionError, the same as the builtin file functions do
+#ifdef _WIN32
+    PyErr_SetExcFromWindowsErrWithFilename(PyExc_OSError, err.code().value(),
+                                           err.file_path.string().c_str());
+#else
+    errno = err.code().value();
+    PyErr_SetFromErrnoWithFilename(PyExc_OSError, err.file_path.string().c_str());
+#endif
+}
+
+/**
+ * @brief Parses a mod file.
+ *
+ * @param file_path The file to parse.
+ * @param use_mmap If true, reads the file via a memory mapping, rather than a file stream.
+ * @param with_positions If true, includes the position and hash of each match.
+ * @param use_dom If true, always parses BLCMM files using the DOM parser.
+ * @param new_commands If set, collects any new commands locally, and appends them to this list.
+ * @return A list of the matches, converted to Python tuples.
+ */
+py::list parse(const std::filesystem::path& file_path,
+               bool use_mmap,
+               bool with_positions,
+               bool use_dom,
+               const std::optional<py::list>& new_commands) {
+    if (!std::filesystem::exists(file_path)) {
+        throw file_not_found(file_path);
+    }
+
+    // Only the final conversion touches Python, do everything else without the GIL
+    std::unique_ptr<ParseIterator> iterator;
+    std::vector<CommandMatch> matches;
+    {
+        const py::gil_scoped_release gil{};
+        iterator = std::make_unique<ParseIterator>(file_path, use_mmap, with_positions, use_dom,
+                                                   new_commands.has_value());
+        matches = iterator->collect();
+    }
+
+    if (new_commands.has_value()) {
+        iterator->new_commands_out = *new_commands;
+        iterator->report_new_commands();
+    }
+
+    py::list output{matches.size()};
+    for (size_t i = 0; i < matches.size(); i++) {
+        output[i] = matches[i].to_python(with_positions);
+    }
+    return output;
+}
+
+/**
+ * @brief Scans a mod file for both its mod info and its custom commands, in a single read.
+ *
+ * @note Any new commands are always collected locally, scanning never changes the global set.
+ *
+ * @param file_path The file to scan.
+ * @param new_commands If set, appends any new commands to this list.
+ * @return A 4-tuple of the spark service index, the game, the list of comments, and the list of
+ *         matches, converted to Python objects.
+ */
+py::tuple scan_mod_file(const std::filesystem::path& file_path,
+                        const std::optional<py::list>& new_commands) {
+    if (!std::filesystem::exists(file_path)) {
+        throw file_not_found(file_path);
+    }
+
+    // Plain text matches are views into the mapping, so it must outlive the conversion
+    std::optional<MappedFile> mapping;
+    std::string blcmm_buffer;
+    ModInfo info;
+    std::vector<CommandMatch> matches;
+    NewCommandCollector collector;
+    {
+        const py::gil_scoped_release gil{};
+        const CollectNewCommands guard{&collector};
+        mapping.emplace(file_path);
+        auto data = mapping->view();
+
+        info = get_mod_info(data);
+
+        if (data.starts_with("<BLCMM")) {
+            matches = parse_blcmm_file(data, blcmm_buffer, true);
+        } else {
+            size_t offset = 0;
+            size_t line_number = 0;
+            while (auto match = parse_next_line(data, offset, line_number)) {
+                matches.push_back(*match);
+            }
+        }
+    }
+
+    if (new_commands.has_value()) {
+        for (const auto& name : collector.get_names()) {
+            new_commands->attr("append")(name);
+        }
+    }
+
+    py::list output{matches.size()};
+    for (size_t i = 0; i < matches.size(); i++) {
+        output[i] = matches[i].to_python(true);
+    }
+
+    auto py_info = info.to_python();
+    return py::make_tuple(py_info[0], py_info[1], py_info[2], output);
+}
+
+/**
+ * @brief Gets the executor used to run background parses.
+ *
+ * @return The executor.
+ */
+py::object& get_executor(void) {
+    // Intentionally leaked, for the same reasons as the interned command names
+    static auto* executor = new py::object(
+        py::module_::import("concurrent.futures")
+            .attr("ThreadPoolExecutor")("thread_name_prefix"_a = "file_parser"));
+    return *executor;
+}
+
 }  // namespace
 
 PYBIND11_MODULE(file_parser, mod) {
     py::register_exception<blcm_preprocessor::ParserError>(mod, "BLCMParserError",
                                                            PyExc_RuntimeError);
+    py::register_exception_translator([](std::exception_ptr ptr) {
+        try {
+            if (ptr) {
+                std::rethrow_exception(ptr);
+            }
+        } catch (const FileError& err) {
+            set_file_error(err);
+        }
+    });
 
     py::enum_<EnableStrategy>(mod, "EnableStrategy")
         .value("All", EnableStrategy::ALL)
@@ -31,42 +172,146 @@ PYBIND11_MODULE(file_parser, mod) {
         .value("Force", EnableStrategy::FORCE)
         .value("Next", EnableStrategy::NEXT);
 
-    mod.def(
-        "parse",
-        [](const std::filesystem::path& file_path) {
-            if (!std::filesystem::exists(file_path)) {
-                throw file_not_found(file_path);
+    py::class_<ParseIterator>(mod, "ParseIterator")
+        .def("__iter__", [](py::object self) { return self; })
+        .def("__next__", [](ParseIterator& self) {
+            auto match = self.next();
+            // New commands get reported as soon as they're read, before the next match is
+            self.report_new_commands();
+            if (!match.has_value()) {
+                throw py::stop_iteration();
             }
+            return match->to_python(self.returns_positions());
+        });
 
-            std::ifstream file{file_path};
+    mod.def(
+        "parse", parse,
+        "Parses custom commands out of mod file.\n"
+        "\n"
+        "Must have called update_commands() first, otherwise this won't match anything.\n"
+        "\n"
+        "The GIL is released while reading and parsing the file.\n"
+        "\n"
+        "Args:\n"
+        "    file_path: The file to parse.\n"
+        "    use_mmap: If true, reads the file via a memory mapping. Mostly intended for\n"
+        "              benchmarking.\n"
+        "    with_positions: If true, each match additionally includes the 1-indexed line\n"
+        "                    number and byte offset of the start of its line, and a 64-bit\n"
+        "                    FNV-1a hash of the line.\n"
+        "    use_dom: If true, always parses BLCMM files by building the full DOM, rather than\n"
+        "             trying a single pass scan first. Mostly intended for testing.\n"
+        "    new_commands: If not None, the commands added by any CE_NewCmd lines only apply\n"
+        "                  to this parse, and are appended to this list, rather than being\n"
+        "                  added to the global set of matched commands.\n"
+        "Returns:\n"
+        "    A list of 3-tuples, of the raw command name, the full line, and the command length.\n"
+        "    If including positions, 6-tuples, additionally including the line number, offset,\n"
+        "    and hash.",
+        "file_path"_a, py::kw_only{}, "use_mmap"_a = true, "with_positions"_a = false,
+        "use_dom"_a = false, "new_commands"_a = py::none());
 
-            std::string line;
-            std::getline(file, line);
-            file.seekg(0);
+    mod.def(
+        "parse_async",
+        [](const std::filesystem::path& file_path, bool use_mmap, bool with_positions,
+           bool use_dom, const std::optional<py::list>& new_commands) {
+            return get_executor().attr("submit")(py::cpp_function(parse), file_path, use_mmap,
+                                                 with_positions, use_dom, new_commands);
+        },
+        "Parses custom commands out of mod file, on a background thread.\n"
+        "\n"
+        "Must have called update_commands() first, otherwise this won't match anything.\n"
+        "\n"
+        "Since any CE_NewCmd lines are also processed on the background thread, they will only\n"
+        "affect other parses which run after they've been read. Pass new_commands to keep them\n"
+        "local to this parse instead.\n"
+        "\n"
+        "Args:\n"
+        "    file_path: The file to parse.\n"
+        "    use_mmap: If true, reads the file via a memory mapping. Mostly intended for\n"
+        "              benchmarking.\n"
+        "    with_positions: If true, each match additionally includes the 1-indexed line\n"
+        "                    number and byte offset of the start of its line, and a 64-bit\n"
+        "                    FNV-1a hash of the line.\n"
+        "    use_dom: If true, always parses BLCMM files by building the full DOM, rather than\n"
+        "             trying a single pass scan first. Mostly intended for testing.\n"
+        "    new_commands: If not None, the commands added by any CE_NewCmd lines only apply\n"
+        "                  to this parse, and are appended to this list, rather than being\n"
+        "                  added to the global set of matched commands.\n"
+        "Returns:\n"
+        "    A future resolving to the same list parse() would return.",
+        "file_path"_a, py::kw_only{}, "use_mmap"_a = true, "with_positions"_a = false,
+        "use_dom"_a = false, "new_commands"_a = py::none());
 
-            std::vector<CommandMatch> matches{};
-            if (line.starts_with("<BLCMM")) {
-                matches = parse_blcmm_file(file);
-            } else {
-                matches = parse_file_line_by_line(file);
+    mod.def(
+        "iter_parse",
+        [](const std::filesystem::path& file_path, bool use_mmap, bool with_positions,
+           bool use_dom, const std::optional<py::list>& new_commands) {
+            if (!std::filesystem::exists(file_path)) {
+                throw file_not_found(file_path);
             }
 
-            std::vector<py::tuple> output;
-            std::ranges::transform(matches, std::back_inserter(output), [](auto& match) {
-                return py::make_tuple(match.py_cmd, match.line, match.cmd_len);
-            });
-
-            return output;
+            std::unique_ptr<ParseIterator> iterator;
+            {
+                // The constructor is where BLCMM files get parsed, so is worth releasing the GIL
+                const py::gil_scoped_release gil{};
+                iterator = std::make_unique<ParseIterator>(file_path, use_mmap, with_positions,
+                                                           use_dom, new_commands.has_value());
+            }
+            if (new_commands.has_value()) {
+                iterator->new_commands_out = *new_commands;
+            }
+            return iterator;
         },
-        "Parses custom commands out of mod file.\n"
+        "Lazily parses custom commands out of mod file.\n"
         "\n"
         "Must have called update_commands() first, otherwise this won't match anything.\n"
         "\n"
+        "Plain text files are read line by line as the iterator is advanced, so commands may be\n"
+        "processed before the rest of the file has been read. BLCMM files must still be parsed\n"
+        "in full upfront, only the conversion to Python objects is delayed.\n"
+        "\n"
         "Args:\n"
         "    file_path: The file to parse.\n"
+        "    use_mmap: If true, reads the file via a memory mapping. Mostly intended for\n"
+        "              benchmarking.\n"
+        "    with_positions: If true, each match additionally includes the 1-indexed line\n"
+        "                    number and byte offset of the start of its line, and a 64-bit\n"
+        "                    FNV-1a hash of the line.\n"
+        "    use_dom: If true, always parses BLCMM files by building the full DOM, rather than\n"
+        "             trying a single pass scan first. Mostly intended for testing.\n"
+        "    new_commands: If not None, the commands added by any CE_NewCmd lines only apply\n"
+        "                  to this parse, and are appended to this list, rather than being\n"
+        "                  added to the global set of matched commands.\n"
         "Returns:\n"
-        "    A list of 3-tuples, of the raw command name, the full line, and the command length.",
-        "file_path"_a);
+        "    An iterator of 3-tuples, of the raw command name, the full line, and the command\n"
+        "    length. If including positions, 6-tuples, additionally including the line number,\n"
+        "    offset, and hash.",
+        "file_path"_a, py::kw_only{}, "use_mmap"_a = true, "with_positions"_a = false,
+        "use_dom"_a = false, "new_commands"_a = py::none());
+
+    mod.def("scan_mod_file", scan_mod_file,
+            "Scans a mod file for both the info mod loaders use, and its custom commands.\n"
+            "\n"
+            "The info is extracted using the same rules as TextModLoader. The file is only read\n"
+            "once, and the GIL is released while reading and parsing it.\n"
+            "\n"
+            "Must have called update_commands() first, otherwise this won't match anything.\n"
+            "\n"
+            "Any CE_NewCmd lines only apply while scanning this file, they never change the\n"
+            "global set of matched commands.\n"
+            "\n"
+            "Args:\n"
+            "    file_path: The file to scan.\n"
+            "    new_commands: If not None, the commands added by any CE_NewCmd lines are appended\n"
+            "                  to this list.\n"
+            "Returns:\n"
+            "    A 4-tuple of the index of the spark service the file's hotfixes are set on, the\n"
+            "    game the file was made for, the first comment block, and the same list parse()\n"
+            "    returns with positions included. The first two may be None. The comments are\n"
+            "    None for plain text files which don't contain any commands, which likely\n"
+            "    aren't mods.",
+            "file_path"_a, py::kw_only{}, "new_commands"_a = py::none());
 
     mod.def("update_commands", update_commands,
             "Updates the commands which are matched by parse().\n"
@@ -74,6 +319,45 @@ PYBIND11_MODULE(file_parser, mod) {
             "Args:\n"
             "    commands: The commands to match.",
             "commands"_a);
+
+    mod.def("get_commands_version", get_commands_version,
+            "Gets a counter which is incremented every time the matched commands change.\n"
+            "\n"
+            "This includes both calls to update_commands(), and any new commands added by\n"
+            "CE_NewCmd lines while parsing. Parse results are only guaranteed to be reproducible\n"
+            "while this stays the same.\n"
+            "\n"
+            "Returns:\n"
+            "    The current version.");
+
+    mod.def("get_commands", get_commands,
+            "Gets all commands currently being matched.\n"
+            "\n"
+            "This includes any new commands added by CE_NewCmd lines.\n"
+            "\n"
+            "Returns:\n"
+            "    The lowercase commands, sorted.");
+
+    mod.def(
+        "add_new_command", [](std::string_view cmd) { add_new_command(cmd); },
+        "Adds a single new command to match, the same as a CE_NewCmd line does.\n"
+        "\n"
+        "Unlike update_commands(), this keeps all existing commands.\n"
+        "\n"
+        "Args:\n"
+        "    cmd: The command to add.",
+        "cmd"_a);
+
+    mod.def("split_obj_names", split_obj_names,
+            "Splits a command's arguments, keeping object names as single tokens.\n"
+            "\n"
+            "Gives exactly the same output as builtins.obj_name_splitter's shlex based fallback.\n"
+            "\n"
+            "Args:\n"
+            "    args: The arguments to split.\n"
+            "Returns:\n"
+            "    A list of individual arguments split out from the input string.",
+            "args"_a);
 }
 
 }  // namespace ce
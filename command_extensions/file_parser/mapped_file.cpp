@@ -0,0 +1,198 @@
+#include "pch.h"
+#include "mapped_file.h"
+
+#ifdef _WIN32
+#define WIN32_LEAN_AND_MEAN
+#define NOMINMAX
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+
+namespace ce {
+
+namespace {
+
+/**
+ * @brief Throws an exception for the last OS error.
+ *
+ * @param msg The message to include in the exception.
+ * @param file_path The file which caused the error.
+ */
+[[noreturn]] void throw_last_error(const char* msg, const std::filesystem::path& file_path) {
+#ifdef _WIN32
+    throw FileError({(int)GetLastError(), std::system_category()}, msg, file_path);
+#else
+    throw FileError({errno, std::generic_category()}, msg, file_path);
+#endif
+}
+
+}  // namespace
+
+FileError::FileError(std::error_code code, const char* msg, std::filesystem::path file_path)
+    : std::system_error(code, msg), file_path(std::move(file_path)) {}
+
+#ifdef _WIN32
+
+MappedFile::MappedFile(const std::filesystem::path& file_path) {
+    // Allow other programs to keep editing, renaming, or deleting the file while we have it open,
+    // the same as a file stream does
+    this->file_handle =
+        CreateFileW(file_path.c_str(), GENERIC_READ,
+                    FILE_SHARE_READ | FILE_SHARE_WRITE | FILE_SHARE_DELETE, nullptr, OPEN_EXISTING,
+                    FILE_FLAG_SEQUENTIAL_SCAN, nullptr);
+    if (this->file_handle == INVALID_HANDLE_VALUE) {
+        this->file_handle = nullptr;
+        throw_last_error("Failed to open file", file_path);
+    }
+
+    LARGE_INTEGER file_size{};
+    if (GetFileSizeEx(this->file_handle, &file_size) == 0) {
+        this->close();
+        throw_last_error("Failed to get file size", file_path);
+    }
+    this->size = (size_t)file_size.QuadPart;
+    if (this->size == 0) {
+        return;
+    }
+
+    this->mapping_handle =
+        CreateFileMappingW(this->file_handle, nullptr, PAGE_READONLY, 0, 0, nullptr);
+    if (this->mapping_handle == nullptr) {
+        this->close();
+        throw_last_error("Failed to create file mapping", file_path);
+    }
+
+    this->ptr = static_cast<const char*>(
+        MapViewOfFile(this->mapping_handle, FILE_MAP_READ, 0, 0, this->size));
+    if (this->ptr == nullptr) {
+        this->close();
+        throw_last_error("Failed to map file", file_path);
+    }
+}
+
+void MappedFile::close(void) noexcept {
+    if (this->ptr != nullptr) {
+        UnmapViewOfFile(this->ptr);
+    }
+    if (this->mapping_handle != nullptr) {
+        CloseHandle(this->mapping_handle);
+    }
+    if (this->file_handle != nullptr) {
+        CloseHandle(this->file_handle);
+    }
+
+    this->ptr = nullptr;
+    this->size = 0;
+    this->mapping_handle = nullptr;
+    this->file_handle = nullptr;
+}
+
+MappedFile::MappedFile(MappedFile&& other) noexcept
+    : file_handle(std::exchange(other.file_handle, nullptr)),
+      mapping_handle(std::exchange(other.mapping_handle, nullptr)),
+      ptr(std::exchange(other.ptr, nullptr)),
+      size(std::exchange(other.size, 0)) {}
+
+MappedFile& MappedFile::operator=(MappedFile&& other) noexcept {
+    if (this != &other) {
+        this->close();
+        this->file_handle = std::exchange(other.file_handle, nullptr);
+        this->mapping_handle = std::exchange(other.mapping_handle, nullptr);
+        this->ptr = std::exchange(other.ptr, nullptr);
+        this->size = std::exchange(other.size, 0);
+    }
+    return *this;
+}
+
+#else
+
+MappedFile::MappedFile(const std::filesystem::path& file_path) {
+    this->fd = open(file_path.c_str(), O_RDONLY | O_CLOEXEC);
+    if (this->fd < 0) {
+        throw_last_error("Failed to open file", file_path);
+    }
+
+    struct stat file_stat{};
+    if (fstat(this->fd, &file_stat) != 0) {
+        this->close();
+        throw_last_error("Failed to get file size", file_path);
+    }
+    this->size = (size_t)file_stat.st_size;
+    if (this->size == 0) {
+        return;
+    }
+
+    void* mapping = mmap(nullptr, this->size, PROT_READ, MAP_PRIVATE, this->fd, 0);
+    if (mapping == MAP_FAILED) {
+        this->size = 0;
+        this->close();
+        throw_last_error("Failed to map file", file_path);
+    }
+    this->ptr = static_cast<const char*>(mapping);
+    madvise(mapping, this->size, MADV_SEQUENTIAL);
+}
+
+void MappedFile::close(void) noexcept {
+    if (this->ptr != nullptr) {
+        // NOLINTNEXTLINE(cppcoreguidelines-pro-type-const-cast)
+        munmap(const_cast<char*>(this->ptr), this->size);
+    }
+    if (this->fd >= 0) {
+        ::close(this->fd);
+    }
+
+    this->ptr = nullptr;
+    this->size = 0;
+    this->fd = -1;
+}
+
+MappedFile::MappedFile(MappedFile&& other) noexcept
+    : fd(std::exchange(other.fd, -1)),
+      ptr(std::exchange(other.ptr, nullptr)),
+      size(std::exchange(other.size, 0)) {}
+
+MappedFile& MappedFile::operator=(MappedFile&& other) noexcept {
+    if (this != &other) {
+        this->close();
+        this->fd = std::exchange(other.fd, -1);
+        this->ptr = std::exchange(other.ptr, nullptr);
+        this->size = std::exchange(other.size, 0);
+    }
+    return *this;
+}
+
+#endif
+
+MappedFile::~MappedFile() {
+    this->close();
+}
+
+bool next_line(std::string_view data, size_t& offset, std::string_view& line) {
+    if (offset >= data.size()) {
+        return false;
+    }
+
+    auto line_end = data.find('\n', offset);
+    if (line_end == std::string_view::npos) {
+        line = data.substr(offset);
+        offset = data.size();
+    } else {
+        line = data.substr(offset, line_end - offset);
+        offset = line_end + 1;
+
+#ifdef _WIN32
+        // Streams opened in text mode automatically convert CRLF to LF on Windows, match them
+        if (line.ends_with('\r')) {
+            line.remove_suffix(1);
+        }
+#endif
+    }
+
+    return true;
+}
+
+}  // namespace ce
@@ -0,0 +1,82 @@
+#ifndef FILE_PARSER_MAPPED_FILE_H
+#define FILE_PARSER_MAPPED_FILE_H
+
+#include "pch.h"
+
+namespace ce {
+
+/**
+ * @brief Exception thrown when a file can't be opened or mapped.
+ */
+class FileError : public std::system_error {
+   public:
+    // The file which caused the error
+    std::filesystem::path file_path;
+
+    /**
+     * @brief Constructs a new file error.
+     *
+     * @param code The OS error code.
+     * @param msg The message to include in the exception.
+     * @param file_path The file which caused the error.
+     */
+    FileError(std::error_code code, const char* msg, std::filesystem::path file_path);
+};
+
+/**
+ * @brief A read only memory mapping of an entire file.
+ */
+class MappedFile {
+   private:
+#ifdef _WIN32
+    void* file_handle = nullptr;
+    void* mapping_handle = nullptr;
+#else
+    int fd = -1;
+#endif
+    const char* ptr = nullptr;
+    size_t size = 0;
+
+    /**
+     * @brief Releases all resources held by this mapping.
+     */
+    void close(void) noexcept;
+
+   public:
+    /**
+     * @brief Maps a file into memory.
+     * @note Empty files are never actually mapped, and just give an empty view.
+     *
+     * @param file_path The file to map.
+     * @throws FileError If the file couldn't be opened or mapped.
+     */
+    explicit MappedFile(const std::filesystem::path& file_path);
+    ~MappedFile();
+
+    MappedFile(const MappedFile&) = delete;
+    MappedFile(MappedFile&& other) noexcept;
+    MappedFile& operator=(const MappedFile&) = delete;
+    MappedFile& operator=(MappedFile&& other) noexcept;
+
+    /**
+     * @brief Gets a view over the contents of the file.
+     * @note Only valid for as long as this object is alive.
+     *
+     * @return The file contents.
+     */
+    [[nodiscard]] std::string_view view(void) const { return {this->ptr, this->size}; }
+};
+
+/**
+ * @brief Splits the next line out of a buffer, matching the semantics of `std::getline`.
+ *
+ * @param data The buffer to split lines from.
+ * @param offset The offset to start at. Incremented past the end of the line.
+ * @param line Output variable set to the line, without the newline.
+ * @return True if a line was extracted, false if we were already at the end of the buffer.
+ */
+bool next_line(std::string_view data, size_t& offset, std::string_view& line);
+
+}  // namespace ce
+
+#endif /* FILE_PARSER_MAPPED_FILE_H */
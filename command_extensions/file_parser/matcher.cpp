@@ -1,5 +1,6 @@
 #include "pch.h"
 #include "matcher.h"
+#include "command_set.h"
 
 namespace ce {
 
@@ -25,9 +26,6 @@ int CaseInsensitiveTraits::compare(const char* chr_a, const char* chr_b, size_t
     return 0;
 }
 
-CaseInsensitiveString::CaseInsensitiveString(std::string_view str)
-    : CaseInsensitiveString(str.data(), str.size()) {}
-
 CaseInsensitiveStringView::CaseInsensitiveStringView(std::string_view str)
     : CaseInsensitiveStringView(str.data(), str.size()) {}
 
@@ -41,21 +39,41 @@ bool CaseInsensitiveStringView::operator==(std::string_view str) const {
 
 namespace {
 
-// To match strings somewhat efficiently we'll use a binary search - while not profiled I don't
-// think we have enough strings and enough matching prefixes to make a full radix trie worth it.
-
-// For this we need to keep our list of commands sorted.
-std::vector<CaseInsensitiveString> sorted_commands;
+// This is checked for every single line, so we use a hash set, with a few cheap checks to reject
+// lines before needing to hash them
+CommandSet known_commands;
+// Matching runs without the GIL, so may run on multiple threads at once, or at the same time as the
+// commands get updated from Python
+std::shared_mutex known_commands_mutex;
+// Incremented every time the known commands change
+std::atomic<uint64_t> known_commands_version = 0;
+
+// The collector for the parse currently running on this thread, if any
+thread_local NewCommandCollector* active_collector = nullptr;
+
+struct TransparentHash {
+    using is_transparent = void;
+    size_t operator()(std::string_view str) const { return std::hash<std::string_view>{}(str); }
+};
+
+// Since the same few commands get matched over and over again, we decode each spelling of each
+// command name once, and reuse the same Python string for all of them.
+// This is intentionally leaked, since it holds Python objects it can't safely be destroyed after
+// the interpreter's shut down.
+auto* interned_cmd_names =
+    new std::unordered_map<std::string, py::object, TransparentHash, std::equal_to<>>();
 
 }  // namespace
 
 void update_commands(const std::vector<std::string_view>& commands) {
-    sorted_commands.clear();
-    sorted_commands.reserve(commands.size());
+    interned_cmd_names->clear();
 
-    std::ranges::transform(commands, std::back_inserter(sorted_commands),
-                           [](auto cmd) { return CaseInsensitiveString{cmd}; });
-    std::ranges::sort(sorted_commands);
+    const std::unique_lock lock{known_commands_mutex};
+    known_commands.clear();
+    for (auto cmd : commands) {
+        known_commands.add(cmd);
+    }
+    known_commands_version++;
 }
 
 void add_new_command(CaseInsensitiveStringView cmd) {
@@ -75,14 +93,50 @@ void add_new_command(CaseInsensitiveStringView cmd) {
         }
     }
 
-    CaseInsensitiveString cmd_name{non_space, cmd_name_end};
-    sorted_commands.insert(std::ranges::lower_bound(sorted_commands, cmd_name),
-                           std::move(cmd_name));
+    const std::string_view name{non_space, cmd_name_end};
+    if (active_collector != nullptr) {
+        active_collector->add(name);
+        return;
+    }
+
+    const std::unique_lock lock{known_commands_mutex};
+    if (known_commands.add(name)) {
+        known_commands_version++;
+    }
+}
+
+void NewCommandCollector::add(std::string_view cmd) {
+    if (this->commands.add(cmd)) {
+        std::string lower{cmd};
+        std::ranges::transform(lower, lower.begin(), ascii_tolower);
+        this->names.push_back(std::move(lower));
+    }
+}
+
+bool NewCommandCollector::contains(std::string_view cmd) const {
+    return this->commands.contains(cmd);
+}
+
+CollectNewCommands::CollectNewCommands(NewCommandCollector* collector)
+    : previous(std::exchange(active_collector, collector)) {}
+
+CollectNewCommands::~CollectNewCommands() {
+    active_collector = this->previous;
+}
+
+uint64_t get_commands_version(void) {
+    return known_commands_version;
+}
+
+std::vector<std::string> get_commands(void) {
+    const std::shared_lock lock{known_commands_mutex};
+    return known_commands.list();
 }
 
 #pragma endregion
 
-std::pair<std::string_view, CommandMatch> try_match_command(std::string_view line) {
+std::pair<std::string_view, CommandMatch> try_match_command(std::string_view line,
+                                                            bool null_terminated) {
     auto non_space = std::ranges::find_if_not(line, [](auto chr) { return std::isspace(chr); });
     if (non_space == line.end()) {
         return {};
@@ -90,26 +144,74 @@ std::pair<std::string_view, CommandMatch> try_match_command(std::string_view lin
 
     auto cmd_end = std::find_if(non_space, line.end(), [](auto chr) { return std::isspace(chr); });
 
-    // NOLINTNEXTLINE(modernize-use-ranges)
-    if (!std::binary_search(sorted_commands.begin(), sorted_commands.end(),
-                            CaseInsensitiveStringView{non_space, cmd_end})) {
+    const std::string_view cmd{non_space, cmd_end};
+    bool known = false;
+    {
+        const std::shared_lock lock{known_commands_mutex};
+        known = known_commands.contains(cmd);
+    }
+    if (!known && (active_collector == nullptr || !active_collector->contains(cmd))) {
         return {};
     }
 
+    const CommandMatch match{.line = line,
+                             .cmd_start = (size_t)(non_space - line.begin()),
+                             .cmd_len = (size_t)(cmd_end - line.begin()),
+                             .null_terminated = null_terminated};
+
+    return std::make_pair(cmd, match);
+}
+
+py::object decode_locale(std::string_view str) {
     // We want to use these Python conversion functions since they automatically handle the locale
     // for us (using the system one like blcmm does)
     // Unfortunately Python requires a null terminator :/
-    std::string cmd_str{non_space, cmd_end};
-    std::string line_str{line};
+    auto decoded = py::reinterpret_steal<py::object>(
+        PyUnicode_DecodeLocaleAndSize(str.data(), (Py_ssize_t)str.size(), nullptr));
+    if (decoded.ptr() == nullptr) {
+        throw py::error_already_set();
+    }
+    return decoded;
+}
 
-    const CommandMatch match{
-        .py_cmd = py::reinterpret_steal<py::object>(
-            PyUnicode_DecodeLocaleAndSize(cmd_str.data(), (Py_ssize_t)cmd_str.size(), nullptr)),
-        .line = py::reinterpret_steal<py::object>(
-            PyUnicode_DecodeLocaleAndSize(line_str.data(), (Py_ssize_t)line_str.size(), nullptr)),
-        .cmd_len = cmd_end - line.begin()};
+uint64_t CommandMatch::hash(void) const {
+    static constexpr uint64_t fnv_offset_basis = 0xcbf29ce484222325;
+    static constexpr uint64_t fnv_prime = 0x00000100000001b3;
 
-    return std::make_pair(std::string_view{non_space, cmd_end}, match);
+    uint64_t hash = fnv_offset_basis;
+    for (auto chr : this->line) {
+        hash ^= (uint8_t)chr;
+        hash *= fnv_prime;
+    }
+    return hash;
+}
+
+py::tuple CommandMatch::to_python(bool with_positions) const {
+    auto cmd = this->line.substr(this->cmd_start, this->cmd_len - this->cmd_start);
+    auto interned = interned_cmd_names->find(cmd);
+    if (interned == interned_cmd_names->end()) {
+        std::string key{cmd};
+        auto decoded = decode_locale(key);
+        interned = interned_cmd_names->emplace(std::move(key), std::move(decoded)).first;
+    }
+
+    py::object py_line;
+    if (this->null_terminated) {
+        py_line = decode_locale(this->line);
+    } else {
+        // If the source doesn't have a terminator, we have to copy the line somewhere which does.
+        // Reuse the same buffer, so this at least doesn't need a new allocation each time. This is
+        // only ever used while holding the GIL.
+        static std::string line_buffer{};
+        line_buffer.assign(this->line);
+        py_line = decode_locale(line_buffer);
+    }
+
+    if (with_positions) {
+        return py::make_tuple(interned->second, py_line, (Py_ssize_t)this->cmd_len,
+                              this->line_number, this->offset, this->hash());
+    }
+    return py::make_tuple(interned->second, py_line, (Py_ssize_t)this->cmd_len);
 }
 
 }  // namespace ce
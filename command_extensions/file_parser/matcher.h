@@ -2,6 +2,7 @@
 #define FILE_PARSER_MATCHER_H
 
 #include "pch.h"
+#include "command_set.h"
 
 namespace ce {
 
@@ -11,11 +12,6 @@ struct CaseInsensitiveTraits : public std::char_traits<char> {
     static bool lt(char chr_a, char chr_b);
     static int compare(const char* chr_a, const char* chr_b, size_t n);
 };
-struct CaseInsensitiveString : public std::basic_string<char, CaseInsensitiveTraits> {
-    using std::basic_string<char, CaseInsensitiveTraits>::basic_string;
-
-    CaseInsensitiveString(std::string_view str);
-};
 struct CaseInsensitiveStringView : public std::basic_string_view<char, CaseInsensitiveTraits> {
     using std::basic_string_view<char, CaseInsensitiveTraits>::basic_string_view;
 
@@ -32,34 +28,135 @@ void update_commands(const std::vector<std::string_view>& commands);
 
 /**
  * @brief Adds an individual new command to the list.
+ * @note If a collector is active on this thread, adds it to the collector instead.
  *
  * @param cmd The command to add. May have leading/trailing whitespace.
  */
 void add_new_command(CaseInsensitiveStringView cmd);
 
-// By default, pybind tries to compile with visibility hidden
-// If we have default visibility in a type holding pybind objects as members, this may cause a
-// warning, since our type has greater visibility than it's members
-// This macro sets the right visibility
-#if defined(__MINGW32__)
-#define PY_OBJECT_VISIBILITY __attribute__((visibility("hidden")))
-#else
-#define PY_OBJECT_VISIBILITY
-#endif
-
-struct PY_OBJECT_VISIBILITY CommandMatch {
-    py::object py_cmd;
-    py::object line;
-    Py_ssize_t cmd_len;
+/**
+ * @brief Collects the new commands added by CE_NewCmd lines during a single parse, rather than
+ *        adding them to the global set.
+ */
+class NewCommandCollector {
+   private:
+    CommandSet commands;
+    std::vector<std::string> names;
+
+   public:
+    /**
+     * @brief Adds a new command.
+     *
+     * @param cmd The command to add, without any whitespace.
+     */
+    void add(std::string_view cmd);
+
+    /**
+     * @brief Checks if a command was added to this collector.
+     *
+     * @param cmd The command to check, in any case.
+     * @return True if the command was added.
+     */
+    [[nodiscard]] bool contains(std::string_view cmd) const;
+
+    /**
+     * @brief Gets all commands added to this collector.
+     *
+     * @return The lowercase commands, in the order they were first added.
+     */
+    [[nodiscard]] const std::vector<std::string>& get_names(void) const { return this->names; }
+};
+
+/**
+ * @brief RAII guard which makes a collector active on the current thread.
+ * @note While active, commands are matched against both the global set and the collector.
+ */
+class CollectNewCommands {
+   private:
+    NewCommandCollector* previous;
+
+   public:
+    /**
+     * @brief Activates a collector.
+     *
+     * @param collector The collector to activate. If null, new commands go to the global set.
+     */
+    explicit CollectNewCommands(NewCommandCollector* collector);
+    ~CollectNewCommands();
+
+    CollectNewCommands(const CollectNewCommands&) = delete;
+    CollectNewCommands(CollectNewCommands&&) = delete;
+    CollectNewCommands& operator=(const CollectNewCommands&) = delete;
+    CollectNewCommands& operator=(CollectNewCommands&&) = delete;
+};
+
+/**
+ * @brief Gets a counter which is incremented every time the set of commands being matched changes.
+ *
+ * @return The current version.
+ */
+uint64_t get_commands_version(void);
+
+/**
+ * @brief Gets all commands currently being matched.
+ *
+ * @return The lowercase commands, sorted.
+ */
+std::vector<std::string> get_commands(void);
+
+/**
+ * @brief Decodes a string using the system locale.
+ * @note Requires the GIL.
+ *
+ * @param str The string to decode. Must have a null terminator directly after it.
+ * @return The decoded Python string.
+ */
+py::object decode_locale(std::string_view str);
+
+// Matches are stored as raw bytes, and only decoded into Python objects when they're actually
+// handed back, so that we can iterate over them lazily
+struct CommandMatch {
+    // A view into the source buffer - it's up to whoever created the match to keep it alive
+    std::string_view line;
+    size_t cmd_start;
+    size_t cmd_len;
+    // If the source buffer has a null terminator directly after the line
+    bool null_terminated;
+
+    // Where the line was in the source file - the 1-indexed line number, and byte offset of the
+    // start of the line. Left as 0 if not known.
+    size_t line_number = 0;
+    size_t offset = 0;
+
+    /**
+     * @brief Gets a hash of the line's contents.
+     * @note Uses 64-bit FNV-1a, so is stable between runs.
+     *
+     * @return The hash.
+     */
+    [[nodiscard]] uint64_t hash(void) const;
+
+    /**
+     * @brief Converts this match into the Python tuple format.
+     * @note Requires the GIL.
+     *
+     * @param with_positions If true, also includes the line's position and hash.
+     * @return A 3-tuple of the raw command name, the full line, and the command length. If
+     *         including positions, a 6-tuple which additionally has the line number, byte offset,
+     *         and hash.
+     */
+    [[nodiscard]] py::tuple to_python(bool with_positions = false) const;
 };
 
 /**
  * @brief Attempts to match a line to a command.
  *
- * @param line The line to match.
+ * @param line The line to match. The returned match holds a view into it.
+ * @param null_terminated True if the line is directly followed by a null terminator.
  * @return The command string and a match object. On error, leaves the command string empty.
  */
-std::pair<std::string_view, CommandMatch> try_match_command(std::string_view line);
+std::pair<std::string_view, CommandMatch> try_match_command(std::string_view line,
+                                                            bool null_terminated);
 
 }  // namespace ce
 
@@ -0,0 +1,204 @@
+#include "pch.h"
+#include "mod_info.h"
+#include "blcm_parser.h"
+#include "mapped_file.h"
+#include "matcher.h"
+
+namespace ce {
+
+namespace {
+
+/**
+ * @brief Trims whitespace on both sides of a string.
+ *
+ * @param str The string to trim.
+ * @return A view of the trimmed string.
+ */
+std::string_view trim_whitespace(std::string_view str) {
+    auto start = std::ranges::find_if_not(str, [](auto chr) { return std::isspace(chr); });
+    auto end = std::find_if_not(str.rbegin(), std::make_reverse_iterator(start),
+                                [](auto chr) { return std::isspace(chr); });
+    return {start, end.base()};
+}
+
+/**
+ * @brief Removes a trailing carriage return from a line, if it has one.
+ *
+ * @param line The line to strip.
+ * @return A view of the stripped line.
+ */
+std::string_view strip_cr(std::string_view line) {
+    if (line.ends_with('\r')) {
+        line.remove_suffix(1);
+    }
+    return line;
+}
+
+/**
+ * @brief Extracts the first comment block out of a filtertool file.
+ *
+ * @param data The file contents.
+ * @param info The info object to fill in.
+ */
+void get_filtertool_mod_info(std::string_view data, ModInfo& info) {
+    auto& comments = info.comments.emplace();
+    auto found_description = false;
+
+    std::string_view line;
+    size_t offset = 0;
+    // Discard the first line (root category header)
+    next_line(data, offset, line);
+
+    while (next_line(data, offset, line)) {
+        line = strip_cr(line);
+        auto trimmed = trim_whitespace(line);
+
+        if (trimmed.starts_with("#<") && trimmed.ends_with('>')) {
+            if (found_description) {
+                break;
+            }
+            if (!is_description_category(trimmed.substr(2, trimmed.size() - 3))) {
+                break;
+            }
+            found_description = true;
+            comments.clear();
+            continue;
+        }
+        if (is_info_command(trimmed)) {
+            break;
+        }
+        comments.emplace_back(line);
+    }
+}
+
+/**
+ * @brief Extracts the first comment block out of a plain text file.
+ *
+ * @param data The file contents.
+ * @param info The info object to fill in.
+ */
+void get_generic_mod_info(std::string_view data, ModInfo& info) {
+    auto& comments = info.comments.emplace();
+
+    std::string_view line;
+    for (size_t offset = 0; next_line(data, offset, line);) {
+        line = strip_cr(line);
+
+        // No commands start with a '#', so we can strip them and push straight to the comments
+        if (line.starts_with('#')) {
+            auto first_non_hash = line.find_first_not_of('#');
+            if (first_non_hash == std::string_view::npos) {
+                comments.emplace_back();
+                continue;
+            }
+            if (line[first_non_hash] == ' ') {
+                first_non_hash++;
+            }
+            comments.emplace_back(line.substr(first_non_hash));
+            continue;
+        }
+
+        auto trimmed = line.substr(std::min(line.find_first_not_of(" \t\v\f"), line.size()));
+        if (is_info_command(trimmed, true, true)) {
+            return;
+        }
+        comments.emplace_back(line);
+    }
+
+    // It might not actually be a mod file at all, want to be able to detect that
+    info.comments = std::nullopt;
+}
+
+/**
+ * @brief Looks through a file for a hotfix command, and extracts the spark service it's set on.
+ *
+ * @param data The file contents.
+ * @return The found service index, or an empty optional if the file doesn't contain any hotfixes.
+ */
+std::optional<int> find_spark_service(std::string_view data) {
+    static const constexpr std::string_view set = "set";
+    static const constexpr std::string_view transient = "Transient.SparkServiceConfiguration_";
+
+    std::string_view line;
+    for (size_t offset = 0; next_line(data, offset, line);) {
+        auto set_offset = line.find(set);
+        if (set_offset == std::string_view::npos) {
+            continue;
+        }
+
+        auto transient_offset = line.find(transient, set_offset + set.size() + 1);
+        if (transient_offset == std::string_view::npos) {
+            continue;
+        }
+
+        auto idx_start = line.data() + transient_offset + transient.size();
+        int idx = 0;
+        auto [idx_end, err] = std::from_chars(idx_start, line.data() + line.size(), idx);
+        if (err != std::errc{}) {
+            continue;
+        }
+
+        auto rest = line.substr((size_t)(idx_end - line.data()));
+        if (rest.find("Keys") == std::string_view::npos
+            && rest.find("Values") == std::string_view::npos) {
+            continue;
+        }
+
+        return idx;
+    }
+
+    return std::nullopt;
+}
+
+}  // namespace
+
+py::tuple ModInfo::to_python(void) const {
+    py::object comments = py::none();
+    if (this->comments.has_value()) {
+        py::list comments_list{this->comments->size()};
+        for (size_t i = 0; i < this->comments->size(); i++) {
+            comments_list[i] = decode_locale((*this->comments)[i]);
+        }
+        comments = comments_list;
+    }
+
+    py::object spark_service_idx = py::none();
+    if (this->spark_service_idx.has_value()) {
+        spark_service_idx = py::int_(*this->spark_service_idx);
+    }
+    py::object game = py::none();
+    if (this->game.has_value()) {
+        game = decode_locale(*this->game);
+    }
+
+    return py::make_tuple(spark_service_idx, game, comments);
+}
+
+bool is_info_command(std::string_view line, bool allow_set, bool allow_spark) {
+    return line.starts_with("exec") || line.starts_with("say")
+           || (allow_set && line.starts_with("set"))
+           || (allow_spark && line.starts_with("Spark"));
+}
+
+bool is_description_category(std::string_view category_name) {
+    static const constexpr std::string_view description = "description";
+    return !std::ranges::search(category_name, description, CaseInsensitiveTraits::eq).empty();
+}
+
+ModInfo get_mod_info(std::string_view data) {
+    ModInfo info{};
+
+    if (data.starts_with("<BLCMM")) {
+        get_blcmm_mod_info(data, info);
+    } else if (data.starts_with("#<")) {
+        get_filtertool_mod_info(data, info);
+    } else {
+        get_generic_mod_info(data, info);
+    }
+
+    info.spark_service_idx = find_spark_service(data);
+
+    return info;
+}
+
+}  // namespace ce
@@ -0,0 +1,60 @@
+#ifndef FILE_PARSER_MOD_INFO_H
+#define FILE_PARSER_MOD_INFO_H
+
+#include "pch.h"
+
+namespace ce {
+
+/**
+ * @brief The metadata mod loaders want to know about a mod file.
+ * @note Extracted using the same rules as TextModLoader's own parser.
+ */
+struct ModInfo {
+    // The index of the spark service configuration the file's hotfixes are set on
+    std::optional<int> spark_service_idx;
+    // The game the file was made for, only available in BLCMM files
+    std::optional<std::string> game;
+    // The first comment block, which is usually the mod's description. If the file doesn't
+    // contain any commands, it's probably not a mod at all, and this is left empty.
+    std::optional<std::vector<std::string>> comments;
+
+    /**
+     * @brief Converts this info to Python objects.
+     * @note Requires the GIL.
+     *
+     * @return A 3-tuple of the spark service index, the game, and the list of comments. Any
+     *         missing values are converted to None.
+     */
+    [[nodiscard]] py::tuple to_python(void) const;
+};
+
+/**
+ * @brief Checks if a comment looks like a command, and should end the first comment block.
+ *
+ * @param line The line to check. Not trimmed.
+ * @param allow_set True if `set` commands should count.
+ * @param allow_spark True if `Spark` commands should count.
+ * @return True if the line is a command.
+ */
+bool is_info_command(std::string_view line, bool allow_set = true, bool allow_spark = false);
+
+/**
+ * @brief Checks if a category name marks it as holding the mod's description.
+ *
+ * @param category_name The category name to check.
+ * @return True if this is a description category.
+ */
+bool is_description_category(std::string_view category_name);
+
+/**
+ * @brief Extracts the mod info from an in memory mod file.
+ * @note Throws a BLCMM ParserError if a BLCMM file has an unknown version.
+ *
+ * @param data The file contents.
+ * @return The extracted info.
+ */
+ModInfo get_mod_info(std::string_view data);
+
+}  // namespace ce
+
+#endif /* FILE_PARSER_MOD_INFO_H */
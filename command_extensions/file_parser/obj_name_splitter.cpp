@@ -0,0 +1,55 @@
+#include "pch.h"
+#include "obj_name_splitter.h"
+
+namespace ce {
+
+namespace {
+
+/**
+ * @brief Checks if a character is one `shlex` considers whitespace.
+ *
+ * @param chr The character to check.
+ * @return True if it's whitespace.
+ */
+bool is_shlex_whitespace(char chr) {
+    return chr == ' ' || chr == '\t' || chr == '\r' || chr == '\n';
+}
+
+}  // namespace
+
+std::vector<std::string> split_obj_names(std::string_view args) {
+    std::vector<std::string> tokens{};
+    std::string token{};
+
+    // Since all the special characters are ASCII, we can safely work on individual bytes, we'll
+    // never split a multi-byte character
+    for (size_t idx = 0; idx < args.size(); idx++) {
+        auto chr = args[idx];
+
+        if (chr == '#') {
+            idx = args.find('\n', idx);
+            if (idx == std::string_view::npos) {
+                break;
+            }
+            continue;
+        }
+
+        if (is_shlex_whitespace(chr)) {
+            if (!token.empty()) {
+                tokens.push_back(std::move(token));
+                token.clear();
+            }
+            continue;
+        }
+
+        token += chr;
+    }
+
+    if (!token.empty()) {
+        tokens.push_back(std::move(token));
+    }
+
+    return tokens;
+}
+
+}  // namespace ce
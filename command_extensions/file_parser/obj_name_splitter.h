@@ -0,0 +1,22 @@
+#ifndef FILE_PARSER_OBJ_NAME_SPLITTER_H
+#define FILE_PARSER_OBJ_NAME_SPLITTER_H
+
+#include "pch.h"
+
+namespace ce {
+
+/**
+ * @brief Splits a command's arguments, keeping object names as single tokens.
+ * @note Matches the tokenization of the Python `obj_name_splitter` exactly, which uses a
+ *       non-posix `shlex` with whitespace splitting and no quote characters. Arguments are split
+ *       on spaces, tabs, and newlines. A '#' starts a comment, which removes everything up to and
+ *       including the next newline - *without* ending the current token.
+ *
+ * @param args The arguments to split, encoded in UTF-8.
+ * @return The individual arguments.
+ */
+std::vector<std::string> split_obj_names(std::string_view args);
+
+}  // namespace ce
+
+#endif /* FILE_PARSER_OBJ_NAME_SPLITTER_H */
@@ -0,0 +1,103 @@
+#include "pch.h"
+#include "parse_iterator.h"
+#include "blcm_parser.h"
+#include "line_parser.h"
+#include "mapped_file.h"
+#include "matcher.h"
+
+namespace ce {
+
+ParseIterator::ParseIterator(const std::filesystem::path& file_path,
+                             bool use_mmap,
+                             bool with_positions,
+                             bool use_dom,
+                             bool collect_new_commands)
+    : with_positions(with_positions) {
+    if (collect_new_commands) {
+        this->collector.emplace();
+    }
+    const CollectNewCommands guard{this->collector ? &*this->collector : nullptr};
+
+    if (use_mmap) {
+        this->mapping.emplace(file_path);
+
+        auto data = this->mapping->view();
+        this->is_blcmm = data.starts_with("<BLCMM");
+        if (this->is_blcmm) {
+            this->blcmm_matches =
+                parse_blcmm_file(data, this->blcmm_buffer, with_positions, use_dom);
+            this->mapping.reset();
+        }
+        return;
+    }
+
+    // Open in binary mode so that we can count offsets - we handle CRLFs ourselves
+    this->file.open(file_path, std::ios::binary);
+
+    std::string line;
+    std::getline(this->file, line);
+    this->file.clear();
+    this->file.seekg(0);
+
+    this->is_blcmm = line.starts_with("<BLCMM");
+    if (this->is_blcmm) {
+        this->blcmm_matches =
+            parse_blcmm_file(this->file, this->blcmm_buffer, with_positions, use_dom);
+        this->file.close();
+    }
+}
+
+std::optional<CommandMatch> ParseIterator::next(void) {
+    if (!this->is_blcmm) {
+        const CollectNewCommands guard{this->collector ? &*this->collector : nullptr};
+        if (this->mapping.has_value()) {
+            return parse_next_line(this->mapping->view(), this->offset, this->line_number);
+        }
+        return parse_next_line(this->file, this->stream_line, this->offset, this->line_number);
+    }
+
+    if (this->blcmm_idx >= this->blcmm_matches.size()) {
+        // Free the file as soon as we're done with it
+        this->blcmm_matches = {};
+        this->blcmm_buffer = {};
+        this->blcmm_idx = 0;
+        return std::nullopt;
+    }
+    return this->blcmm_matches[this->blcmm_idx++];
+}
+
+std::vector<CommandMatch> ParseIterator::collect(void) {
+    if (this->is_blcmm) {
+        // Already got everything, just hand back what we haven't returned yet
+        // Leaving the list empty means the buffer gets freed on the next call to next()
+        auto matches = std::exchange(this->blcmm_matches, {});
+        auto already_returned = (std::vector<CommandMatch>::difference_type)this->blcmm_idx;
+        matches.erase(matches.begin(), matches.begin() + already_returned);
+        this->blcmm_idx = 0;
+        return matches;
+    }
+
+    this->collected_lines.clear();
+
+    std::vector<CommandMatch> matches{};
+    while (auto match = this->next()) {
+        if (!this->mapping.has_value()) {
+            match->line = this->collected_lines.emplace_back(match->line);
+        }
+        matches.push_back(*match);
+    }
+    return matches;
+}
+
+void ParseIterator::report_new_commands(void) {
+    if (!this->collector || !this->new_commands_out) {
+        return;
+    }
+
+    const auto& names = this->collector->get_names();
+    for (; this->new_commands_reported < names.size(); this->new_commands_reported++) {
+        this->new_commands_out.attr("append")(names[this->new_commands_reported]);
+    }
+}
+
+}  // namespace ce
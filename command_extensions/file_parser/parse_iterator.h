@@ -0,0 +1,101 @@
+#ifndef FILE_PARSER_PARSE_ITERATOR_H
+#define FILE_PARSER_PARSE_ITERATOR_H
+
+#include "pch.h"
+#include "mapped_file.h"
+#include "matcher.h"
+
+namespace ce {
+
+/**
+ * @brief Lazily iterates through the commands in a mod file.
+ * @note Plain text files are parsed line by line as we go. BLCMM files need to know about the
+ *       entire category structure to work out which commands are enabled, so are still parsed all
+ *       at once on construction - only the conversion to Python objects is delayed.
+ */
+class ParseIterator {
+   private:
+    // Exactly one of these two will be used to read the file
+    std::optional<MappedFile> mapping;
+    std::ifstream file;
+    std::string stream_line;
+    // How far we've read through the file, only used by plain text files
+    size_t offset = 0;
+    size_t line_number = 0;
+    // Streams reuse the same line buffer, so when collecting we need to keep our own copies
+    std::deque<std::string> collected_lines;
+
+    bool with_positions;
+    bool is_blcmm;
+    // The matches are views into the buffer, so it must outlive them
+    std::string blcmm_buffer;
+    std::vector<CommandMatch> blcmm_matches;
+    size_t blcmm_idx = 0;
+
+    // If set, CE_NewCmd lines only affect this parse, rather than the global command set
+    std::optional<NewCommandCollector> collector;
+
+   public:
+    // A Python list to append this parse's new commands to, or null. Requires the GIL.
+    py::object new_commands_out;
+    // How many of the collected new commands have already been appended to it
+    size_t new_commands_reported = 0;
+
+    /**
+     * @brief Opens a new mod file for parsing.
+     *
+     * @param file_path The file to parse. Assumed to exist.
+     * @param use_mmap If true, reads the file via a memory mapping, rather than a file stream.
+     * @param with_positions If true, fills in the position of each match in the file. Plain text
+     *                       files always do so, since it's free.
+     * @param use_dom If true, always parses BLCMM files using the DOM parser.
+     * @param collect_new_commands If true, collects the commands added by CE_NewCmd lines locally,
+     *                             rather than adding them to the global set.
+     */
+    ParseIterator(const std::filesystem::path& file_path,
+                  bool use_mmap,
+                  bool with_positions,
+                  bool use_dom = false,
+                  bool collect_new_commands = false);
+    ~ParseIterator() = default;
+
+    // Since the matches we return hold views into our own members, we can't be moved
+    ParseIterator(const ParseIterator&) = delete;
+    ParseIterator(ParseIterator&&) = delete;
+    ParseIterator& operator=(const ParseIterator&) = delete;
+    ParseIterator& operator=(ParseIterator&&) = delete;
+
+    /**
+     * @brief Gets the next matching command in the file.
+     * @note The returned match is only valid until the next call.
+     *
+     * @return The next command match, or an empty optional if we've reached the end of the file.
+     */
+    std::optional<CommandMatch> next(void);
+
+    /**
+     * @brief Gets all remaining matching commands in the file.
+     * @note Does not require the GIL.
+     * @note The returned matches are valid until the next call to either method.
+     *
+     * @return A list of command matches.
+     */
+    std::vector<CommandMatch> collect(void);
+
+    /**
+     * @brief Checks if this iterator was created to return match positions.
+     *
+     * @return True if match positions should be returned.
+     */
+    [[nodiscard]] bool returns_positions(void) const { return this->with_positions; }
+
+    /**
+     * @brief Appends any newly collected commands to the new commands output list, if set.
+     * @note Requires the GIL.
+     */
+    void report_new_commands(void);
+};
+
+}  // namespace ce
+
+#endif /* FILE_PARSER_PARSE_ITERATOR_H */
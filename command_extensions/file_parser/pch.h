@@ -22,13 +22,22 @@
 #ifdef __cplusplus
 
 #include <algorithm>
+#include <atomic>
 #include <cctype>
+#include <charconv>
+#include <cstdint>
+#include <deque>
 #include <filesystem>
 #include <fstream>
 #include <iterator>
+#include <memory>
+#include <optional>
 #include <ranges>
+#include <shared_mutex>
 #include <string>
 #include <string_view>
+#include <system_error>
+#include <unordered_map>
 #include <unordered_set>
 #include <utility>
 #include <vector>
@@ -0,0 +1,572 @@
+# ruff: noqa: S311
+"""
+Benchmarks for the file parser module.
+
+Not run as part of the standard tests, run this file directly:
+```sh
+python command_extensions/file_parser_tests/_bench.py
+```
+"""
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from _test import (  # pyright: ignore[reportMissingImports]
+    file_parser,
+    shlex_obj_name_splitter,
+)
+
+CUSTOM_COMMANDS = ["clone", "keep_alive", "set_early"]
+REPEATS = 5
+# Large files take long enough to parse that a couple of runs is already stable
+LARGE_FILE_REPEATS = 2
+LARGE_FILE_LINES = 1_000_000
+SPLITTER_ARGS = 1_000_000
+CAID_PART_COUNTS = (100, 1_000, 5_000)
+
+SIZES = (10_000, 100_000, 1_000_000)
+COMMAND_COUNTS = (10, 1_000, 100_000)
+
+DEFAULT_BASELINE = Path(__file__).parent / "_bench_baseline.json"
+# How much worse a result can get before being reported as a regression - timings are fairly noisy
+REGRESSION_THRESHOLD = 0.2
+
+
+def generate_plain_file(path: Path, num_lines: int, custom_ratio: float = 0.2) -> None:
+    """
+    Generates a synthetic plain text mod file.
+
+    Args:
+        path: The path to write the file to.
+        num_lines: How many lines to generate.
+        custom_ratio: The share of lines which are custom commands.
+    """
+    rng = random.Random(num_lines)
+    with path.open("w") as file:
+        for idx in range(num_lines):
+            if rng.random() < custom_ratio:
+                cmd = rng.choice(CUSTOM_COMMANDS)
+                file.write(f"{cmd} GD_Bench.Object_{idx} GD_Bench.Clone_{idx}\n")
+            else:
+                file.write(f"set GD_Bench.Object_{idx} SomeProperty ({'x' * rng.randrange(200)})\n")
+
+
+def generate_blcmm_file(
+    path: Path,
+    num_lines: int,
+    custom_ratio: float = 0.2,
+    *,
+    depth: int = 1,
+    strategy: str | None = None,
+    num_profiles: int = 1,
+) -> None:
+    """
+    Generates a synthetic BLCMM mod file.
+
+    Args:
+        path: The path to write the file to.
+        num_lines: Roughly how many lines to generate.
+        custom_ratio: The share of lines which are custom commands.
+        depth: How many levels of categories each line is nested under, below the root.
+        strategy: If not None, the `CE_EnableOn` strategy to set at the start of each category.
+        num_profiles: How many profiles to create. Each code line is enabled in a random subset of
+                      them, with the first being the current one.
+    """
+    rng = random.Random(num_lines)
+    profiles = [f"profile_{idx}" for idx in range(num_profiles)]
+    with path.open("w") as file:
+        file.write(
+            '<BLCMM v="1">\n\t<head>\n\t\t<type name="BL2" offline="false"/>\n\t\t<profiles>\n',
+        )
+        for idx, profile in enumerate(profiles):
+            current = "true" if idx == 0 else "false"
+            file.write(f'\t\t\t<profile name="{profile}" current="{current}"/>\n')
+        file.write(
+            '\t\t</profiles>\n\t</head>\n\t<body>\n\t\t<category name="root">\n',
+        )
+
+        indent = "\t" * (depth + 3)
+        for idx in range(num_lines):
+            if idx % 50 == 0:
+                if idx != 0:
+                    for level in reversed(range(depth)):
+                        file.write("\t" * (level + 3) + "</category>\n")
+                for level in range(depth):
+                    file.write("\t" * (level + 3) + f'<category name="Category {idx}.{level}">\n')
+                if strategy is not None:
+                    file.write(f"{indent}<comment>CE_EnableOn {strategy}</comment>\n")
+
+            if rng.random() < custom_ratio:
+                cmd = rng.choice(CUSTOM_COMMANDS)
+                file.write(
+                    f"{indent}<comment>{cmd} GD_Bench.Object_{idx} GD_Bench.Clone_{idx}"
+                    "</comment>\n",
+                )
+            else:
+                enabled = ",".join(profile for profile in profiles if rng.getrandbits(1))
+                file.write(
+                    f'{indent}<code profiles="{enabled}">'
+                    f"set GD_Bench.Object_{idx} SomeProperty ({'x' * rng.randrange(200)})"
+                    "</code>\n",
+                )
+
+        for level in reversed(range(depth)):
+            file.write("\t" * (level + 3) + "</category>\n")
+        file.write("\t\t</category>\n\t</body>\n</BLCMM>\n")
+
+
+def time_call(func: Callable[[], object], repeats: int = REPEATS) -> float:
+    """
+    Times a function call, taking the best of several repeats.
+
+    Args:
+        func: The function to time.
+        repeats: How many times to call the function.
+    Returns:
+        The fastest time the function took, in seconds.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_mmap(tmp_dir: Path) -> None:
+    print("mmap vs stream input")
+    print(f"{'file':<20} {'lines':>9} {'stream MB/s':>12} {'mmap MB/s':>12} {'speedup':>8}")
+
+    file_parser.update_commands(CUSTOM_COMMANDS)
+    for name, generator in (("plain", generate_plain_file), ("blcmm", generate_blcmm_file)):
+        for num_lines in (10_000, 100_000, 1_000_000):
+            path = tmp_dir / f"{name}_{num_lines}.txt"
+            generator(path, num_lines)
+            size_mb = path.stat().st_size / 1024 / 1024
+
+            stream_time = time_call(lambda p=path: file_parser.parse(p, use_mmap=False))
+            mmap_time = time_call(lambda p=path: file_parser.parse(p, use_mmap=True))
+
+            print(
+                f"{name:<20} {num_lines:>9} {size_mb / stream_time:>12.1f}"
+                f" {size_mb / mmap_time:>12.1f} {stream_time / mmap_time:>7.2f}x",
+            )
+
+
+def longest_stall_while_waiting(paths: list[Path]) -> float:
+    """
+    Parses files in the background, measuring how long the calling thread gets blocked for.
+
+    Args:
+        paths: The files to parse.
+    Returns:
+        The longest gap between the calling thread getting to run, in seconds.
+    """
+    futures = [file_parser.parse_async(path) for path in paths]
+
+    longest = 0.0
+    last = time.perf_counter()
+    while not all(future.done() for future in futures):
+        now = time.perf_counter()
+        longest = max(longest, now - last)
+        last = now
+    return longest
+
+
+def bench_async(tmp_dir: Path) -> None:
+    print("blocking vs background parsing")
+    print(f"{'file':<20} {'files':>9} {'blocking ms':>12} {'async stall ms':>15}")
+
+    file_parser.update_commands(CUSTOM_COMMANDS)
+    for name, generator in (("plain", generate_plain_file), ("blcmm", generate_blcmm_file)):
+        paths = [tmp_dir / f"{name}_async_{idx}.txt" for idx in range(8)]
+        for path in paths:
+            generator(path, 100_000)
+
+        blocking_time = time_call(lambda paths=paths: [file_parser.parse(p) for p in paths])
+        stall_time = min(longest_stall_while_waiting(paths) for _ in range(REPEATS))
+
+        print(
+            f"{name:<20} {len(paths):>9} {blocking_time * 1000:>12.1f} {stall_time * 1000:>15.1f}",
+        )
+
+
+@dataclass
+class FileShape:
+    name: str
+    generator: Callable[[Path, int], None]
+
+
+# Each shape varies one thing from the default plain/blcmm files
+FILE_SHAPES = (
+    FileShape("plain", generate_plain_file),
+    FileShape("plain_5%_custom", lambda p, n: generate_plain_file(p, n, custom_ratio=0.05)),
+    FileShape("plain_50%_custom", lambda p, n: generate_plain_file(p, n, custom_ratio=0.5)),
+    FileShape("blcmm", generate_blcmm_file),
+    FileShape("blcmm_50%_custom", lambda p, n: generate_blcmm_file(p, n, custom_ratio=0.5)),
+    FileShape("blcmm_depth_8", lambda p, n: generate_blcmm_file(p, n, depth=8)),
+    FileShape("blcmm_all", lambda p, n: generate_blcmm_file(p, n, strategy="All")),
+    FileShape("blcmm_next", lambda p, n: generate_blcmm_file(p, n, strategy="Next")),
+    FileShape("blcmm_force", lambda p, n: generate_blcmm_file(p, n, strategy="Force")),
+    FileShape("blcmm_8_profiles", lambda p, n: generate_blcmm_file(p, n, num_profiles=8)),
+)
+
+
+def measure_peak_rss(*args: str) -> float | None:
+    """
+    Measures the peak memory use of an operation, by running it in a fresh subprocess.
+
+    Args:
+        *args: The args to pass to this script in the subprocess, see `run_rss_child`.
+    Returns:
+        The increase in peak RSS caused by the operation, in MiB, or None if unsupported.
+    """
+    result = subprocess.run(
+        [sys.executable, __file__, "--rss-child", *args],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    output = result.stdout.strip()
+    return None if output == "None" else float(output)
+
+
+def get_peak_rss() -> float | None:
+    """
+    Gets the peak RSS of the current process.
+
+    Returns:
+        The peak RSS, in MiB, or None if unsupported.
+    """
+    # On Linux, ru_maxrss is inherited from the parent process across a fork and exec, so it's
+    # useless in a subprocess if the parent used more memory - prefer the high water mark, which
+    # gets reset by the exec
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+
+    try:
+        import resource  # noqa: PLC0415
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, everything else KiB
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_rss_child(args: list[str]) -> None:
+    """
+    Runs a single operation, and prints how much it increased peak RSS by, in MiB.
+
+    Args:
+        args: Either `parse <path> [dom]`, or `update_commands <count>`.
+    """
+    if get_peak_rss() is None:
+        print(None)
+        return
+
+    match args:
+        case ["parse", path, *extra]:
+            file_parser.update_commands(CUSTOM_COMMANDS)
+            before = get_peak_rss() or 0
+            file_parser.parse(Path(path), use_dom="dom" in extra)
+        case ["update_commands", count]:
+            commands = [f"bench_cmd_{idx}" for idx in range(int(count))]
+            before = get_peak_rss() or 0
+            file_parser.update_commands(commands)
+        case _:
+            raise ValueError(f"Unknown rss child args: {args}")
+
+    print((get_peak_rss() or 0) - before)
+
+
+def format_rss(rss: float | None) -> str:
+    return "n/a" if rss is None else f"{rss:.1f}"
+
+
+Results = dict[str, dict[str, float | None]]
+
+
+def bench_scale(tmp_dir: Path, sizes: list[int], results: Results) -> None:
+    print("parse throughput by file shape")
+    print(f"{'file':<20} {'lines':>9} {'lines/s':>12} {'MB/s':>8} {'peak RSS MiB':>13}")
+
+    file_parser.update_commands(CUSTOM_COMMANDS)
+    for shape in FILE_SHAPES:
+        for num_lines in sizes:
+            path = tmp_dir / f"scale_{shape.name}_{num_lines}.txt"
+            shape.generator(path, num_lines)
+            size_mb = path.stat().st_size / 1024 / 1024
+
+            repeats = LARGE_FILE_REPEATS if num_lines >= LARGE_FILE_LINES else REPEATS
+            parse_time = time_call(lambda p=path: file_parser.parse(p), repeats)
+            rss = measure_peak_rss("parse", str(path))
+            path.unlink()
+
+            lines_per_sec = num_lines / parse_time
+            results[f"parse/{shape.name}/{num_lines}"] = {
+                "lines_per_sec": lines_per_sec,
+                "peak_rss_mib": rss,
+            }
+            print(
+                f"{shape.name:<20} {num_lines:>9} {lines_per_sec:>12,.0f}"
+                f" {size_mb / parse_time:>8.1f} {format_rss(rss):>13}",
+            )
+
+
+def bench_blcmm_dom(tmp_dir: Path, sizes: list[int], results: Results) -> None:
+    print("blcmm single pass scan vs full DOM")
+    print(
+        f"{'lines':>9} {'scan lines/s':>13} {'dom lines/s':>12} {'speedup':>8}"
+        f" {'scan RSS MiB':>13} {'dom RSS MiB':>12}",
+    )
+
+    file_parser.update_commands(CUSTOM_COMMANDS)
+    for num_lines in sizes:
+        path = tmp_dir / f"dom_{num_lines}.blcm"
+        generate_blcmm_file(path, num_lines, depth=4)
+
+        repeats = LARGE_FILE_REPEATS if num_lines >= LARGE_FILE_LINES else REPEATS
+        scan_time = time_call(lambda p=path: file_parser.parse(p), repeats)
+        dom_time = time_call(lambda p=path: file_parser.parse(p, use_dom=True), repeats)
+        scan_rss = measure_peak_rss("parse", str(path))
+        dom_rss = measure_peak_rss("parse", str(path), "dom")
+        path.unlink()
+
+        results[f"blcmm_scan/{num_lines}"] = {
+            "lines_per_sec": num_lines / scan_time,
+            "peak_rss_mib": scan_rss,
+        }
+        results[f"blcmm_dom/{num_lines}"] = {
+            "lines_per_sec": num_lines / dom_time,
+            "peak_rss_mib": dom_rss,
+        }
+        print(
+            f"{num_lines:>9} {num_lines / scan_time:>13,.0f} {num_lines / dom_time:>12,.0f}"
+            f" {dom_time / scan_time:>7.2f}x {format_rss(scan_rss):>13} {format_rss(dom_rss):>12}",
+        )
+
+
+def bench_update_commands(results: Results) -> None:
+    print("update_commands throughput")
+    print(f"{'commands':>9} {'commands/s':>12} {'peak RSS MiB':>13}")
+
+    for count in COMMAND_COUNTS:
+        commands = [f"bench_cmd_{idx}" for idx in range(count)]
+        update_time = time_call(lambda c=commands: file_parser.update_commands(c))
+        rss = measure_peak_rss("update_commands", str(count))
+
+        commands_per_sec = count / update_time
+        results[f"update_commands/{count}"] = {
+            "commands_per_sec": commands_per_sec,
+            "peak_rss_mib": rss,
+        }
+        print(f"{count:>9} {commands_per_sec:>12,.0f} {format_rss(rss):>13}")
+
+    file_parser.update_commands(CUSTOM_COMMANDS)
+
+
+def generate_splitter_args(count: int) -> list[str]:
+    """
+    Generates argument strings like those passed to object name commands.
+
+    Args:
+        count: How many strings to generate.
+    Returns:
+        The list of argument strings.
+    """
+    rng = random.Random(count)
+    classes = ("", "WillowGame.ItemPoolDefinition'", "Engine.Behavior_RemoteEvent'")
+    args: list[str] = []
+    for idx in range(count):
+        names = []
+        for _ in range(rng.randrange(1, 4)):
+            cls = rng.choice(classes)
+            name = f"GD_Bench_{idx}.Package:Object_{rng.randrange(1000)}"
+            names.append(f"{cls}{name}'" if cls else name)
+        if rng.random() < 0.1:  # noqa: PLR2004
+            names.append("-u")
+        args.append(" " + " ".join(names))
+    return args
+
+
+def bench_splitter(results: Results) -> None:
+    print("obj_name_splitter throughput")
+    print(f"{'splitter':<9} {'args/s':>12}")
+
+    all_args = generate_splitter_args(SPLITTER_ARGS)
+    for name, splitter in (
+        ("shlex", shlex_obj_name_splitter),
+        ("native", file_parser.split_obj_names),
+    ):
+        split_time = time_call(
+            lambda s=splitter: [s(args) for args in all_args],
+            repeats=LARGE_FILE_REPEATS,
+        )
+
+        args_per_sec = SPLITTER_ARGS / split_time
+        results[f"splitter/{name}"] = {"args_per_sec": args_per_sec}
+        print(f"{name:<9} {args_per_sec:>12,.0f}")
+
+
+@dataclass(frozen=True)
+class BenchBVCTuple:
+    # Mirrors regen_balance's BVCTuple, which can't be imported outside of the game
+    BaseValueConstant: float
+    BaseValueAttribute: str | None
+    InitializationDefinition: str | None
+    BaseValueScaleConstant: float
+
+
+def generate_weighted_parts(num_parts: int) -> list[list[BenchBVCTuple]]:
+    """
+    Generates the caid values referenced by a synthetic weighted parts list.
+
+    Args:
+        num_parts: How many weighted parts to generate.
+    Returns:
+        A list of the values each part references - a manufacturer weight, the min and max
+        gamestage, and the part weight.
+    """
+    rng = random.Random(num_parts)
+    # Real lists share a lot of values, but still end up with a caid entry for most parts
+    values = [
+        BenchBVCTuple(float(idx), rng.choice((None, "D_Attributes.Weight")), None, 1.0)
+        for idx in range(num_parts)
+    ]
+    return [rng.choices(values, k=4) for _ in range(num_parts)]
+
+
+def bench_caid(results: Results) -> None:
+    print("regen_balance caid lookups")
+    print(f"{'parts':>9} {'list parts/s':>13} {'dict parts/s':>13} {'speedup':>8}")
+
+    for num_parts in CAID_PART_COUNTS:
+        parts = generate_weighted_parts(num_parts)
+        caid = sorted(
+            {bvc for part in parts for bvc in part},
+            key=lambda b: b.BaseValueConstant,
+        )
+
+        def use_list(p: list[list[BenchBVCTuple]] = parts, c: list[BenchBVCTuple] = caid) -> None:
+            for part in p:
+                [c.index(bvc) for bvc in part]
+
+        def use_dict(p: list[list[BenchBVCTuple]] = parts, c: list[BenchBVCTuple] = caid) -> None:
+            caid_index = {bvc: idx for idx, bvc in enumerate(c)}
+            for part in p:
+                [caid_index[bvc] for bvc in part]
+
+        list_time = time_call(use_list)
+        dict_time = time_call(use_dict)
+
+        results[f"caid/{num_parts}"] = {"parts_per_sec": num_parts / dict_time}
+        print(
+            f"{num_parts:>9} {num_parts / list_time:>13,.0f} {num_parts / dict_time:>13,.0f}"
+            f" {list_time / dict_time:>7.1f}x",
+        )
+
+
+def compare_to_baseline(results: Results, baseline: Results) -> int:
+    """
+    Compares results against a baseline, printing any regressions.
+
+    Throughputs regress by getting lower, memory use by getting higher.
+
+    Args:
+        results: The new results.
+        baseline: The baseline results.
+    Returns:
+        The number of regressions found.
+    """
+    regressions = 0
+    for key, metrics in results.items():
+        for metric, value in metrics.items():
+            old = baseline.get(key, {}).get(metric)
+            if value is None or old is None or old == 0:
+                continue
+
+            change = (value - old) / old
+            higher_is_better = metric.endswith("_per_sec")
+            if (-change if higher_is_better else change) > REGRESSION_THRESHOLD:
+                print(f"REGRESSION {key} {metric}: {old:,.1f} -> {value:,.1f} ({change:+.1%})")
+                regressions += 1
+    return regressions
+
+
+SUITES = ("mmap", "async", "scale", "dom", "commands", "splitter", "caid")
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--rss-child"]:
+        run_rss_child(sys.argv[2:])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Benchmarks for the file parser module.")
+    parser.add_argument(
+        "suites",
+        nargs="*",
+        choices=SUITES,
+        default=SUITES,
+        help="Which benchmarks to run. Defaults to all of them.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=SIZES,
+        help="The line counts to use for the scale and dom benchmarks.",
+    )
+    parser.add_argument(
+        "--baseline",
+        type=Path,
+        default=DEFAULT_BASELINE,
+        help="The baseline file to compare against, or to save to.",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Save these results as the new baseline, rather than comparing against it.",
+    )
+    args = parser.parse_args()
+
+    results: Results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for suite in args.suites:
+            match suite:
+                case "mmap":
+                    bench_mmap(Path(tmp_dir))
+                case "async":
+                    bench_async(Path(tmp_dir))
+                case "scale":
+                    bench_scale(Path(tmp_dir), args.sizes, results)
+                case "dom":
+                    bench_blcmm_dom(Path(tmp_dir), args.sizes, results)
+                case "commands":
+                    bench_update_commands(results)
+                case "splitter":
+                    bench_splitter(results)
+                case "caid":
+                    bench_caid(results)
+            print()
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=4))
+        print(f"Saved baseline to {args.baseline}")
+    elif args.baseline.exists():
+        baseline: Results = json.loads(args.baseline.read_text())
+        regressions = compare_to_baseline(results, baseline)
+        print(f"{regressions} regressions compared to {args.baseline}")
+        sys.exit(1 if regressions else 0)
+    else:
+        print(f"No baseline found at {args.baseline}, run with --save-baseline to create one")
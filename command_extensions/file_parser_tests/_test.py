@@ -1,8 +1,10 @@
-# ruff: noqa: D103
+# ruff: noqa: S311
 
 import importlib.util
 import json
 import platform
+import random
+import shlex
 import sys
 import warnings
 from dataclasses import dataclass
@@ -117,7 +119,485 @@ def test_no_commands() -> None:
     assert file_parser.parse(Path(__file__)) == []
 
 
+@pytest.mark.parametrize("use_dom", [False, True], ids=["scan", "dom"])
+@pytest.mark.parametrize("use_mmap", [True, False], ids=["mmap", "stream"])
 @pytest.mark.parametrize("data", gather_test_data(), ids=lambda d: d.path.name)
-def test_parsing(data: TestData) -> None:
+def test_parsing(data: TestData, use_mmap: bool, use_dom: bool) -> None:
     file_parser.update_commands(data.commands)
-    assert file_parser.parse(data.path) == data.output
+    assert file_parser.parse(data.path, use_mmap=use_mmap, use_dom=use_dom) == data.output
+
+
+@pytest.mark.parametrize("use_mmap", [True, False], ids=["mmap", "stream"])
+def test_empty_file(tmp_path: Path, use_mmap: bool) -> None:
+    empty_path = tmp_path / "empty.txt"
+    empty_path.touch()
+
+    file_parser.update_commands(["clone"])
+    assert file_parser.parse(empty_path, use_mmap=use_mmap) == []
+
+
+@pytest.mark.parametrize("data", gather_test_data(), ids=lambda d: d.path.name)
+def test_iter_parsing(data: TestData) -> None:
+    file_parser.update_commands(data.commands)
+    assert list(file_parser.iter_parse(data.path)) == data.output
+
+    # Reset any commands added by `CE_NewCmd`
+    file_parser.update_commands(data.commands)
+    assert list(file_parser.iter_parse(data.path, use_mmap=False)) == data.output
+
+
+def test_iter_non_existent_file() -> None:
+    dummy_path = Path("dummy")
+    assert not dummy_path.exists()
+
+    file_parser.update_commands([])
+    with pytest.raises(FileNotFoundError):
+        file_parser.iter_parse(dummy_path)
+
+
+def test_iter_is_lazy() -> None:
+    file_parser.update_commands(["clone"])
+    iterator = file_parser.iter_parse(Path(__file__).parent / "test_basic_cmds.test_in")
+
+    assert next(iterator) == ("clone", "clone a", 5)
+    # Changing the commands part way through should affect the lines we haven't read yet
+    file_parser.update_commands([])
+    assert list(iterator) == []
+
+
+@pytest.mark.parametrize("data", gather_test_data(), ids=lambda d: d.path.name)
+def test_async_parsing(data: TestData) -> None:
+    file_parser.update_commands(data.commands)
+    assert file_parser.parse_async(data.path).result() == data.output
+
+
+def test_async_non_existent_file() -> None:
+    dummy_path = Path("dummy")
+    assert not dummy_path.exists()
+
+    file_parser.update_commands([])
+    future = file_parser.parse_async(dummy_path)
+    with pytest.raises(FileNotFoundError):
+        future.result()
+
+
+def test_async_concurrent() -> None:
+    file_parser.update_commands(["CE_EnableOn", "chat"])
+    blcm_path = Path(__file__).parent.parent / "sanic.blcm"
+    expected = file_parser.parse(blcm_path)
+
+    futures = [file_parser.parse_async(blcm_path) for _ in range(8)]
+    assert all(future.result() == expected for future in futures)
+
+
+def fnv1a_64(data: bytes) -> int:
+    """
+    Hashes some data using 64-bit FNV-1a.
+
+    Args:
+        data: The data to hash.
+    Returns:
+        The hash.
+    """
+    hash_value = 0xCBF29CE484222325
+    for byte in data:
+        hash_value = ((hash_value ^ byte) * 0x100000001B3) & 0xFFFFFFFFFFFFFFFF
+    return hash_value
+
+
+@pytest.mark.parametrize("use_dom", [False, True], ids=["scan", "dom"])
+@pytest.mark.parametrize("use_mmap", [True, False], ids=["mmap", "stream"])
+@pytest.mark.parametrize("data", gather_test_data(), ids=lambda d: d.path.name)
+def test_positions(data: TestData, use_mmap: bool, use_dom: bool) -> None:
+    file_parser.update_commands(data.commands)
+    output = file_parser.parse(
+        data.path,
+        use_mmap=use_mmap,
+        with_positions=True,
+        use_dom=use_dom,
+    )
+    assert [match[:3] for match in output] == data.output
+
+    file_lines = data.path.read_bytes().split(b"\n")
+    line_offsets = [0]
+    for file_line in file_lines:
+        line_offsets.append(line_offsets[-1] + len(file_line) + 1)
+
+    is_blcmm = file_lines[0].startswith(b"<BLCMM")
+    for cmd, line, _, line_number, offset, line_hash in output:
+        assert offset == line_offsets[line_number - 1]
+        assert line_hash == fnv1a_64(line.encode())
+        if is_blcmm:
+            assert cmd.encode() in file_lines[line_number - 1]
+        else:
+            assert file_lines[line_number - 1].decode() == line
+
+
+def test_iter_positions() -> None:
+    file_parser.update_commands(["clone"])
+    path = Path(__file__).parent / "test_basic_cmds.test_in"
+    assert list(file_parser.iter_parse(path, with_positions=True)) == file_parser.parse(
+        path,
+        with_positions=True,
+    )
+
+
+@pytest.mark.parametrize("use_dom", [False, True], ids=["scan", "dom"])
+@pytest.mark.parametrize("use_mmap", [True, False], ids=["mmap", "stream"])
+def test_blcmm_raw_bytes(tmp_path: Path, use_mmap: bool, use_dom: bool) -> None:
+    # BLCMM files use the system codepage, we should pass on the same raw bytes a plain text file
+    # would, rather than trying to convert them. Using utf8 so these decode under most locales.
+    line = "clone caf\xe9 na\xefve".encode()
+    blcmm_path = tmp_path / "raw.blcm"
+    blcmm_path.write_bytes(
+        b'<BLCMM v="1">\n'
+        b"\t<head>\n"
+        b"\t\t<profiles>\n"
+        b'\t\t\t<profile name="default" current="true"/>\n'
+        b"\t\t</profiles>\n"
+        b"\t</head>\n"
+        b"\t<body>\n"
+        b'\t\t<category name="root">\n'
+        b"\t\t\t<comment>" + line + b"</comment>\n"
+        b'\t\t\t<code profiles="default">set a b c</code>\n'
+        b"\t\t</category>\n"
+        b"\t</body>\n"
+        b"</BLCMM>\n",
+    )
+    plain_path = tmp_path / "raw.txt"
+    plain_path.write_bytes(line + b"\n")
+
+    file_parser.update_commands(["clone"])
+    expected = file_parser.parse(plain_path)
+    assert len(expected) == 1
+    assert file_parser.parse(blcmm_path, use_mmap=use_mmap, use_dom=use_dom) == expected
+
+
+def test_new_cmd_across_files(tmp_path: Path) -> None:
+    first_path = tmp_path / "first.txt"
+    first_path.write_text("CE_NewCmd my_cmd\nmy_cmd a\n")
+    second_path = tmp_path / "second.txt"
+    second_path.write_text("my_cmd b\n")
+
+    file_parser.update_commands(["CE_NewCmd", "clone"])
+    version = file_parser.get_commands_version()
+    assert file_parser.get_commands() == ["ce_newcmd", "clone"]
+
+    assert file_parser.parse(first_path) == [("my_cmd", "my_cmd a", 6)]
+    assert file_parser.get_commands() == ["ce_newcmd", "clone", "my_cmd"]
+    assert file_parser.get_commands_version() == version + 1
+    assert file_parser.parse(second_path) == [("my_cmd", "my_cmd b", 6)]
+
+    # When the first file's results come from the parse cache, it never gets parsed, so its new
+    # commands must be added back manually for the second file to still match
+    file_parser.update_commands(["CE_NewCmd", "clone"])
+    assert file_parser.parse(second_path) == []
+    file_parser.add_new_command("my_cmd")
+    assert file_parser.get_commands() == ["ce_newcmd", "clone", "my_cmd"]
+    assert file_parser.parse(second_path) == [("my_cmd", "my_cmd b", 6)]
+
+
+def test_add_new_command() -> None:
+    file_parser.update_commands(["CE_NewCmd", "clone"])
+    version = file_parser.get_commands_version()
+
+    file_parser.add_new_command("  My_Cmd\t")
+    assert file_parser.get_commands() == ["ce_newcmd", "clone", "my_cmd"]
+    assert file_parser.get_commands_version() == version + 1
+
+    # Already known commands, and invalid names, don't change anything
+    file_parser.add_new_command("CLONE")
+    file_parser.add_new_command("two words")
+    file_parser.add_new_command("   ")
+    assert file_parser.get_commands() == ["ce_newcmd", "clone", "my_cmd"]
+    assert file_parser.get_commands_version() == version + 1
+
+
+@pytest.mark.parametrize("func", ["parse", "iter_parse"])
+def test_local_new_cmd(tmp_path: Path, func: str) -> None:
+    first_path = tmp_path / "first.txt"
+    first_path.write_text("CE_NewCmd my_cmd\nmy_cmd a\nCE_NewCmd My_Cmd\nCE_NewCmd clone\n")
+    second_path = tmp_path / "second.txt"
+    second_path.write_text("my_cmd b\n")
+
+    file_parser.update_commands(["CE_NewCmd", "clone"])
+    version = file_parser.get_commands_version()
+
+    new_commands: list[str] = []
+    matches = list(getattr(file_parser, func)(first_path, new_commands=new_commands))
+    assert [match[1] for match in matches] == ["my_cmd a"]
+    assert new_commands == ["my_cmd", "clone"]
+
+    # The new command only applied to the first file
+    assert file_parser.get_commands() == ["ce_newcmd", "clone"]
+    assert file_parser.get_commands_version() == version
+    assert file_parser.parse(second_path) == []
+
+
+def test_async_local_new_cmd(tmp_path: Path) -> None:
+    path = tmp_path / "new_cmd.txt"
+    path.write_text("CE_NewCmd my_cmd\nmy_cmd a\n")
+
+    file_parser.update_commands(["CE_NewCmd", "clone"])
+    new_commands: list[str] = []
+    assert file_parser.parse_async(path, new_commands=new_commands).result() == [
+        ("my_cmd", "my_cmd a", 6),
+    ]
+    assert new_commands == ["my_cmd"]
+    assert file_parser.get_commands() == ["ce_newcmd", "clone"]
+
+
+def test_local_new_cmd_sibling_order(tmp_path: Path) -> None:
+    # Mirrors how exec prefetching uses local new commands: a parent file execs first_path then
+    # second_path, both get parsed in the background ahead of time, and second_path's new command
+    # only gets added once it's actually executed
+    first_path = tmp_path / "first.txt"
+    first_path.write_text("my_cmd a\n")
+    second_path = tmp_path / "second.txt"
+    second_path.write_text("CE_NewCmd my_cmd\nmy_cmd b\n")
+    third_path = tmp_path / "third.txt"
+    third_path.write_text("my_cmd c\n")
+
+    file_parser.update_commands(["CE_NewCmd", "clone"])
+    version = file_parser.get_commands_version()
+
+    first_new: list[str] = []
+    second_new: list[str] = []
+    # Parse the second file first, to make sure order of parsing doesn't matter
+    second_future = file_parser.parse_async(second_path, new_commands=second_new)
+    assert second_future.result() == [("my_cmd", "my_cmd b", 6)]
+    first_future = file_parser.parse_async(first_path, new_commands=first_new)
+
+    # The first file is executed before the second, so must not see its new command
+    assert first_future.result() == []
+    assert first_new == []
+    assert file_parser.get_commands_version() == version
+
+    # Executing the second file adds its command, so anything after it can use it
+    for cmd in second_new:
+        file_parser.add_new_command(cmd)
+    assert file_parser.get_commands_version() == version + 1
+    assert file_parser.parse(third_path) == [("my_cmd", "my_cmd c", 6)]
+
+
+@pytest.mark.parametrize("data", gather_test_data(), ids=lambda d: d.path.name)
+def test_scan_matches(data: TestData) -> None:
+    file_parser.update_commands(data.commands)
+    *_, matches = file_parser.scan_mod_file(data.path)
+    assert matches == file_parser.parse(data.path, with_positions=True, new_commands=[])
+
+
+@pytest.mark.parametrize("blcmm", [False, True], ids=["plain", "blcmm"])
+def test_scan_keeps_commands(tmp_path: Path, blcmm: bool) -> None:
+    path = tmp_path / "new_cmd.txt"
+    if blcmm:
+        path.write_bytes(
+            b'<BLCMM v="1">\n'
+            b"\t<head>\n"
+            b"\t\t<profiles>\n"
+            b'\t\t\t<profile name="default" current="true"/>\n'
+            b"\t\t</profiles>\n"
+            b"\t</head>\n"
+            b"\t<body>\n"
+            b'\t\t<category name="root">\n'
+            b"\t\t\t<comment>CE_NewCmd my_cmd</comment>\n"
+            b"\t\t\t<comment>my_cmd a</comment>\n"
+            b'\t\t\t<code profiles="default">set a b c</code>\n'
+            b"\t\t</category>\n"
+            b"\t</body>\n"
+            b"</BLCMM>\n",
+        )
+    else:
+        path.write_text("CE_NewCmd my_cmd\nmy_cmd a\n")
+
+    file_parser.update_commands(["CE_NewCmd", "clone"])
+    version = file_parser.get_commands_version()
+
+    new_commands: list[str] = []
+    *_, matches = file_parser.scan_mod_file(path, new_commands=new_commands)
+    assert [match[1] for match in matches] == ["my_cmd a"]
+    assert new_commands == ["my_cmd"]
+
+    # Scanning must not affect what other files match
+    assert file_parser.get_commands() == ["ce_newcmd", "clone"]
+    assert file_parser.get_commands_version() == version
+    *_, matches = file_parser.scan_mod_file(path)
+    assert [match[1] for match in matches] == ["my_cmd a"]
+    assert file_parser.get_commands() == ["ce_newcmd", "clone"]
+
+
+def test_scan_non_existent_file() -> None:
+    dummy_path = Path("dummy")
+    assert not dummy_path.exists()
+
+    file_parser.update_commands([])
+    with pytest.raises(FileNotFoundError):
+        file_parser.scan_mod_file(dummy_path)
+
+
+@pytest.mark.parametrize("func", ["parse", "iter_parse", "scan_mod_file"])
+def test_mmap_error_is_os_error(tmp_path: Path, func: str) -> None:
+    file_parser.update_commands([])
+    # Directories can be opened, but not mapped
+    with pytest.raises(OSError) as exc_info:
+        getattr(file_parser, func)(tmp_path)
+    assert exc_info.value.filename == str(tmp_path)
+
+
+def test_scan_generic_info(tmp_path: Path) -> None:
+    path = tmp_path / "generic.txt"
+    path.write_text(
+        "## My Mod\n"
+        "#@author Someone\n"
+        "A description\n"
+        "\n"
+        "clone a b\n"
+        "set Transient.SparkServiceConfiguration_6 Keys (x)\n",
+    )
+
+    file_parser.update_commands(["clone"])
+    *info, matches = file_parser.scan_mod_file(path)
+    assert info == [6, None, ["My Mod", "@author Someone", "A description", "", "clone a b"]]
+    assert [match[:3] for match in matches] == [("clone", "clone a b", 5)]
+
+
+def test_scan_generic_not_a_mod(tmp_path: Path) -> None:
+    path = tmp_path / "readme.txt"
+    path.write_text("Just some text\nwith no commands\n")
+
+    file_parser.update_commands(["Just"])
+    *info, matches = file_parser.scan_mod_file(path)
+    assert info == [None, None, None]
+    assert len(matches) == 1
+
+
+def test_scan_filtertool_info(tmp_path: Path) -> None:
+    path = tmp_path / "filtertool.txt"
+    path.write_text(
+        "#<My Mod>\n"
+        "Ignored\n"
+        "#<Description>\n"
+        "The description\n"
+        "#<Commands>\n"
+        "set Transient.SparkServiceConfiguration_2 Values (x)\n",
+    )
+
+    file_parser.update_commands([])
+    *info, _ = file_parser.scan_mod_file(path)
+    assert info == [2, None, ["The description"]]
+
+
+def test_scan_blcmm_info(tmp_path: Path) -> None:
+    path = tmp_path / "info.blcm"
+    path.write_text(
+        '<BLCMM v="1">\n'
+        "\t<head>\n"
+        '\t\t<type name="TPS" offline="false"/>\n'
+        "\t</head>\n"
+        "\t<body>\n"
+        '\t\t<category name="root">\n'
+        "\t\t\t<comment>First</comment>\n"
+        "\t\t\t<comment>Second</comment>\n"
+        '\t\t\t<category name="Other">\n'
+        "\t\t\t\t<comment>Not included</comment>\n"
+        "\t\t\t</category>\n"
+        "\t\t</category>\n"
+        "\t</body>\n"
+        "</BLCMM>\n",
+    )
+
+    file_parser.update_commands([])
+    *info, _ = file_parser.scan_mod_file(path)
+    assert info == [None, "TPS", ["First", "Second"]]
+
+
+def test_scan_blcmm_description_info(tmp_path: Path) -> None:
+    path = tmp_path / "description.blcm"
+    path.write_text(
+        '<BLCMM v="1">\n'
+        "\t<head>\n"
+        '\t\t<type name="BL2" offline="false"/>\n'
+        "\t</head>\n"
+        "\t<body>\n"
+        '\t\t<category name="root">\n'
+        "\t\t\t<comment>Root comment</comment>\n"
+        '\t\t\t<category name="Mod Description">\n'
+        "\t\t\t\t<comment>The description</comment>\n"
+        "\t\t\t\t<comment>@version 1.0</comment>\n"
+        "\t\t\t\t<comment>exec other.txt</comment>\n"
+        "\t\t\t\t<comment>After the exec</comment>\n"
+        "\t\t\t</category>\n"
+        '\t\t\t<code profiles="">set Transient.SparkServiceConfiguration_3 Keys (y)</code>\n'
+        "\t\t</category>\n"
+        "\t</body>\n"
+        "</BLCMM>\n",
+    )
+
+    file_parser.update_commands([])
+    *info, _ = file_parser.scan_mod_file(path)
+    assert info == [3, "BL2", ["The description", "@version 1.0"]]
+
+
+def test_scan_blcmm_unknown_version(tmp_path: Path) -> None:
+    path = tmp_path / "version.blcm"
+    path.write_text(
+        '<BLCMM v="2">\n'
+        "\t<body>\n"
+        '\t\t<category name="root">\n'
+        "\t\t</category>\n"
+        "\t</body>\n"
+        "</BLCMM>\n",
+    )
+
+    file_parser.update_commands([])
+    with pytest.raises(file_parser.BLCMParserError):
+        file_parser.scan_mod_file(path)
+
+
+def shlex_obj_name_splitter(args: str) -> list[str]:
+    """
+    Reference copy of builtins.shlex_obj_name_splitter, which can't be imported without the sdk.
+
+    Args:
+        args: A string of arguments
+    Returns:
+        A list of individual arguments split out from the input string.
+    """
+    lex = shlex.shlex(args)
+    lex.wordchars += ".:?+!,'\"\\-"
+    lex.quotes = ""
+    lex.whitespace_split = True
+    return list(lex)
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        "",
+        "   ",
+        "GD_Obj.Name",
+        "  GD_Obj.Name  GD_Other:Sub.Name ",
+        "WillowGame.Class'GD_Obj.Name' GD_Clone.Name",
+        "a\tb\rc\nd",
+        "a\vb\fc",
+        "\"quoted args\" 'are not' \\escaped\\",
+        "obj # a comment",
+        "obj#comment\nmore",
+        "# comment only",
+        "#\n#\nobj",
+        "trailing #",
+        "unicode_\u00e9\u00df \u65e5\u672c",
+        "(1,2,3) -u --undo",
+        "nul\0char",
+    ],
+)
+def test_split_obj_names(args: str) -> None:
+    assert file_parser.split_obj_names(args) == shlex_obj_name_splitter(args)
+
+
+def test_split_obj_names_random() -> None:
+    rng = random.Random(1417)
+    alphabet = "aZ09_.:'\"\\-#()\u00e9\u65e5 \t\r\n\v\f\0"
+    for _ in range(10_000):
+        args = "".join(rng.choices(alphabet, k=rng.randrange(30)))
+        assert file_parser.split_obj_names(args) == shlex_obj_name_splitter(args), repr(args)
@@ -0,0 +1,170 @@
+// Micro benchmark comparing the command matcher against the binary search it replaced.
+// Only built when compiling as a native linux module, see the Readme.
+
+#include <algorithm>
+#include <cctype>
+#include <chrono>
+#include <cstdio>
+#include <random>
+#include <string>
+#include <string_view>
+#include <vector>
+
+#include "../file_parser/command_set.h"
+
+namespace {
+
+#pragma region Legacy Matcher
+
+struct CaseInsensitiveTraits : public std::char_traits<char> {
+    static bool eq(char chr_a, char chr_b) { return std::tolower(chr_a) == std::tolower(chr_b); }
+    static bool lt(char chr_a, char chr_b) { return std::tolower(chr_a) < std::tolower(chr_b); }
+    static int compare(const char* chr_a, const char* chr_b, size_t n) {
+        while (n-- != 0) {
+            if (std::tolower(*chr_a) < std::tolower(*chr_b)) {
+                return -1;
+            }
+            if (std::tolower(*chr_a) > std::tolower(*chr_b)) {
+                return 1;
+            }
+            ++chr_a;
+            ++chr_b;
+        }
+        return 0;
+    }
+};
+using CaseInsensitiveString = std::basic_string<char, CaseInsensitiveTraits>;
+using CaseInsensitiveStringView = std::basic_string_view<char, CaseInsensitiveTraits>;
+
+class LegacyMatcher {
+   private:
+    std::vector<CaseInsensitiveString> sorted_commands;
+
+   public:
+    void add(std::string_view cmd) {
+        CaseInsensitiveString cmd_name{cmd.data(), cmd.size()};
+        this->sorted_commands.insert(std::ranges::lower_bound(this->sorted_commands, cmd_name),
+                                     std::move(cmd_name));
+    }
+
+    [[nodiscard]] bool contains(std::string_view cmd) const {
+        // NOLINTNEXTLINE(modernize-use-ranges)
+        return std::binary_search(this->sorted_commands.begin(), this->sorted_commands.end(),
+                                  CaseInsensitiveStringView{cmd.data(), cmd.size()});
+    }
+};
+
+#pragma endregion
+
+/**
+ * @brief Generates a random command-like word.
+ *
+ * @param rng The random number generator to use.
+ * @return The generated word.
+ */
+std::string random_word(std::mt19937& rng) {
+    static constexpr std::string_view chars = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_";
+    std::uniform_int_distribution<size_t> len_dist{3, 16};
+    std::uniform_int_distribution<size_t> char_dist{0, chars.size() - 1};
+
+    std::string word(len_dist(rng), '\0');
+    std::ranges::generate(word, [&]() { return chars[char_dist(rng)]; });
+    return word;
+}
+
+/**
+ * @brief Times how long it takes a matcher to look up every token.
+ *
+ * @param matcher The matcher to benchmark.
+ * @param tokens The tokens to look up.
+ * @return The time taken, in nanoseconds per lookup.
+ */
+template <typename T>
+double time_lookups(const T& matcher, const std::vector<std::string>& tokens) {
+    constexpr size_t repeats = 10;
+
+    size_t found = 0;
+    auto start = std::chrono::steady_clock::now();
+    for (size_t i = 0; i < repeats; i++) {
+        for (const auto& token : tokens) {
+            found += matcher.contains(token) ? 1 : 0;
+        }
+    }
+    auto end = std::chrono::steady_clock::now();
+
+    // Make sure the loop can't be optimized out
+    if (found == 0) {
+        std::puts("no matches?");
+    }
+
+    return (double)std::chrono::duration_cast<std::chrono::nanoseconds>(end - start).count()
+           / (double)(repeats * tokens.size());
+}
+
+/**
+ * @brief Times how long it takes to insert every command one by one.
+ *
+ * @param commands The commands to insert.
+ * @return The time taken, in nanoseconds per insert.
+ */
+template <typename T>
+double time_inserts(const std::vector<std::string>& commands) {
+    auto start = std::chrono::steady_clock::now();
+    T matcher{};
+    for (const auto& cmd : commands) {
+        matcher.add(cmd);
+    }
+    auto end = std::chrono::steady_clock::now();
+
+    return (double)std::chrono::duration_cast<std::chrono::nanoseconds>(end - start).count()
+           / (double)commands.size();
+}
+
+}  // namespace
+
+int main(void) {
+    constexpr size_t num_tokens = 1'000'000;
+    constexpr double hit_ratio = 0.2;
+
+    std::printf("%9s | %14s %14s %8s | %14s %14s\n", "commands", "legacy ns/line", "hash ns/line",
+                "speedup", "legacy ns/add", "hash ns/add");
+
+    for (const size_t num_commands : {16, 64, 256, 1024, 4096}) {
+        std::mt19937 rng{(unsigned int)num_commands};
+
+        std::vector<std::string> commands(num_commands);
+        std::ranges::generate(commands, [&]() { return random_word(rng); });
+
+        LegacyMatcher legacy{};
+        ce::CommandSet hashed{};
+        for (const auto& cmd : commands) {
+            legacy.add(cmd);
+            hashed.add(cmd);
+        }
+
+        // Mostly non-matching tokens (i.e. `set` commands), with some hits in random case
+        std::bernoulli_distribution is_hit{hit_ratio};
+        std::uniform_int_distribution<size_t> cmd_dist{0, num_commands - 1};
+        std::vector<std::string> tokens(num_tokens);
+        std::ranges::generate(tokens, [&]() {
+            if (!is_hit(rng)) {
+                return (rng() % 2 == 0) ? std::string{"set"} : random_word(rng);
+            }
+            auto token = commands[cmd_dist(rng)];
+            std::ranges::transform(token, token.begin(), [&](char chr) {
+                return (char)((rng() % 2 == 0) ? std::toupper(chr) : std::tolower(chr));
+            });
+            return token;
+        });
+
+        auto legacy_lookup = time_lookups(legacy, tokens);
+        auto hashed_lookup = time_lookups(hashed, tokens);
+        auto legacy_insert = time_inserts<LegacyMatcher>(commands);
+        auto hashed_insert = time_inserts<ce::CommandSet>(commands);
+
+        std::printf("%9zu | %14.2f %14.2f %7.2fx | %14.2f %14.2f\n", num_commands, legacy_lookup,
+                    hashed_lookup, legacy_lookup / hashed_lookup, legacy_insert, hashed_insert);
+    }
+
+    return 0;
+}
@@ -2,17 +2,19 @@
 import argparse
 import shlex
 from collections.abc import Callable
+from pathlib import Path
 from typing import Any
 
 from mods_base import AbstractCommand, command
 
-from . import autoregister
+from . import autoregister, scan_mod_file
 from . import legacy_compat_builtins as builtins
 
 __all__: tuple[str, ...] = (
     "RegisterConsoleCommand",
     "UnregisterConsoleCommand",
     "builtins",
+    "parse_mod_file",
     "try_handle_command",
 )
 
@@ -50,3 +52,12 @@ def try_handle_command(cmd: str, args: str) -> bool:
     # In new sdk, it does trigger hooks, so no need for us to do anything
     _ = args
     return cmd in legacy_cmds
+
+
+def parse_mod_file(file_path: str) -> tuple[int | None, str | None, list[str]]:
+    # Lets TextModLoader read a file's metadata in the same pass we find its commands in, so that
+    # enabling the mod afterwards doesn't need to parse it again. Matches `tml_parser.parse`.
+    spark_service_idx, game, comments = scan_mod_file(Path(file_path))
+    if comments is None:
+        raise ValueError("Didn't find any commands in generic mod file!")
+    return spark_service_idx, game, comments
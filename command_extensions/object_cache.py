@@ -0,0 +1,109 @@
+from typing import Any
+
+import unrealsdk
+from mods_base import hook
+from unrealsdk.unreal import BoundFunction, UObject, WeakPointer, WrappedStruct
+
+__all__: tuple[str, ...] = (
+    "clear",
+    "find_object",
+    "get_stats",
+    "invalidate",
+    "map_change_hook",
+)
+
+hits: int = 0
+misses: int = 0
+collected: int = 0
+invalidations: int = 0
+
+# Object names are case insensitive. Only successful lookups are cached - an object which doesn't
+# exist yet may be created or loaded at any time, so a failure is always retried.
+# Weak pointers so that we never keep an object alive, or hand back one that's been collected
+found_objects: dict[tuple[str, str], WeakPointer] = {}
+
+
+def find_object(cls: str, name: str) -> UObject:
+    """
+    Finds an object, reusing the previous result if the same name's been looked up before.
+
+    Args:
+        cls: The object's class name.
+        name: The object's full path name.
+    Returns:
+        The found object.
+    Raises:
+        ValueError: If the object couldn't be found.
+    """
+    global hits, misses, collected
+
+    key = (cls.lower(), name.lower())
+    if (pointer := found_objects.get(key)) is not None:
+        if (obj := pointer()) is not None:
+            hits += 1
+            return obj
+        collected += 1
+        del found_objects[key]
+
+    misses += 1
+    obj = unrealsdk.find_object(cls, name)
+    found_objects[key] = WeakPointer(obj)
+    return obj
+
+
+def clear() -> int:
+    """
+    Deletes all cached objects, and resets the counters.
+
+    Returns:
+        The number of cache entries which were deleted.
+    """
+    global hits, misses, collected, invalidations
+
+    count = len(found_objects)
+
+    found_objects.clear()
+    hits = 0
+    misses = 0
+    collected = 0
+    invalidations = 0
+
+    return count
+
+
+def invalidate() -> None:
+    """Deletes all cached objects, without resetting the counters."""
+    global invalidations
+
+    if found_objects:
+        found_objects.clear()
+        invalidations += 1
+
+
+def get_stats() -> list[str]:
+    """
+    Gets a set of human readable stats about the cache.
+
+    Returns:
+        A list of lines to print.
+    """
+    total = hits + misses
+    hit_rate = 0 if total == 0 else 100 * hits / total
+    return [
+        (
+            f"Object cache: {hits} hits, {misses} misses ({hit_rate:.1f}% hit rate),"
+            f" {collected} garbage collected, {invalidations} invalidations,"
+            f" {len(found_objects)} entries"
+        ),
+    ]
+
+
+@hook("WillowGame.WillowPlayerController:WillowClientDisableLoadingMovie")
+def map_change_hook(
+    _1: UObject,
+    _2: WrappedStruct,
+    _3: Any,
+    _4: BoundFunction,
+) -> None:
+    """Invalidates the cache after every map load, since it replaces most objects."""
+    invalidate()
@@ -0,0 +1,316 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+from mods_base import SETTINGS_DIR
+
+from . import file_parser
+
+__all__: tuple[str, ...] = (
+    "ModInfo",
+    "PositionedMatch",
+    "clear",
+    "get_stats",
+    "parse",
+    "scan",
+    "update_commands",
+)
+
+# The raw command name, the full line, the command length, the line number, the byte offset of the
+# line, and the line's hash
+type PositionedMatch = tuple[str, str, int, int, int, int]
+# The spark service index, the game, and the first comment block
+type ModInfo = tuple[int | None, str | None, list[str] | None]
+
+CACHE_DIR = SETTINGS_DIR / "command_extensions" / "parse_cache"
+CACHE_VERSION = 4
+
+# Parses may run on background threads, so the counters need a lock
+stats_lock = threading.Lock()
+hits: int = 0
+misses: int = 0
+
+# The native command set at the last version we hashed it at, cached so we don't need to rehash it
+# for every file
+hashed_commands: tuple[int, str] = (-1, "")
+
+
+def update_commands(commands: list[str]) -> None:
+    """
+    Updates the commands which are matched by the file parser.
+
+    Args:
+        commands: The commands to match.
+    """
+    file_parser.update_commands(commands)
+
+
+def get_commands_snapshot() -> tuple[int, str]:
+    """
+    Gets a hash of the full set of commands the file parser is currently matching.
+
+    This includes any commands added by CE_NewCmd lines, which `update_commands` doesn't know about.
+
+    Returns:
+        A tuple of the command version, and the hash of the commands. If the commands changed while
+        we were reading them, the version may be older than the commands.
+    """
+    global hashed_commands
+
+    version = file_parser.get_commands_version()
+    cached_version, cached_hash = hashed_commands
+    if version == cached_version:
+        return version, cached_hash
+
+    commands = file_parser.get_commands()
+    new_hash = hashlib.sha256("\n".join(commands).encode()).hexdigest()
+    # Only safe to cache if nothing changed while we were reading
+    if file_parser.get_commands_version() == version:
+        hashed_commands = (version, new_hash)
+    return version, new_hash
+
+
+def get_entry_path(file_path: Path) -> Path:
+    """
+    Gets the path of the cache entry for the given file.
+
+    Args:
+        file_path: The mod file to get the cache entry of.
+    Returns:
+        The path to the cache entry.
+    """
+    normalized = os.path.normcase(file_path.resolve())
+    return CACHE_DIR / (hashlib.sha256(normalized.encode()).hexdigest() + ".json")
+
+
+def load_entry(
+    entry_path: Path,
+    key: dict[str, Any],
+) -> tuple[list[PositionedMatch], ModInfo | None, list[str]] | None:
+    """
+    Tries to load a cache entry.
+
+    Args:
+        entry_path: The path to the cache entry.
+        key: The values the entry's key fields must match for it to be valid.
+    Returns:
+        The cached matches, mod info, and the commands the file added via CE_NewCmd, or None if the
+        entry doesn't exist or is stale. The mod info is None if the entry was created by a parse
+        rather than a scan.
+    """
+    try:
+        with entry_path.open() as entry_file:
+            entry = json.load(entry_file)
+        if any(entry.get(name) != value for name, value in key.items()):
+            return None
+        matches = [
+            (str(cmd), str(line), int(cmd_len), int(line_number), int(offset), int(line_hash))
+            for cmd, line, cmd_len, line_number, offset, line_hash in entry["matches"]
+        ]
+        new_commands = [str(cmd) for cmd in entry["new_commands"]]
+
+        info: ModInfo | None = None
+        if (raw_info := entry.get("info")) is not None:
+            spark_service_idx, game, comments = raw_info
+            info = (
+                None if spark_service_idx is None else int(spark_service_idx),
+                None if game is None else str(game),
+                None if comments is None else [str(comment) for comment in comments],
+            )
+    except (OSError, ValueError, TypeError, KeyError, AttributeError):
+        return None
+    else:
+        return matches, info, new_commands
+
+
+def add_new_commands(new_commands: list[str]) -> None:
+    """
+    Adds the commands a file added via CE_NewCmd to the file parser's global set.
+
+    Args:
+        new_commands: The commands to add.
+    """
+    for cmd in new_commands:
+        file_parser.add_new_command(cmd)
+
+
+def get_key(file_path: Path, commands: str) -> dict[str, Any]:
+    """
+    Gets the values a cache entry must match for it to be valid for the given file.
+
+    Args:
+        file_path: The mod file to get the key of.
+        commands: The hash of the commands the file parser is matching.
+    Returns:
+        The key fields.
+    """
+    stat = file_path.stat()
+    with file_path.open("rb") as file:
+        content_hash = hashlib.file_digest(file, "sha256").hexdigest()
+
+    return {
+        "version": CACHE_VERSION,
+        "path": str(file_path.resolve()),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": content_hash,
+        "commands": commands,
+    }
+
+
+def save_entry(
+    entry_path: Path,
+    key: dict[str, Any],
+    matches: list[PositionedMatch],
+    new_commands: list[str],
+    info: ModInfo | None = None,
+) -> None:
+    """
+    Writes a cache entry.
+
+    Args:
+        entry_path: The path to the cache entry.
+        key: The entry's key fields.
+        matches: The matches to cache.
+        new_commands: The commands the file added via CE_NewCmd.
+        info: If not None, the mod info to cache alongside the matches.
+    """
+    entry = key | {"matches": matches, "new_commands": new_commands}
+    if info is not None:
+        entry["info"] = info
+
+    with suppress(OSError):
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first, so we never leave a half written entry if something goes wrong
+        # Since we may be parsing on multiple threads, give each one its own temp file
+        temp_path = entry_path.with_suffix(f".{threading.get_ident()}.tmp")
+        with temp_path.open("w") as entry_file:
+            json.dump(entry, entry_file)
+        temp_path.replace(entry_path)
+
+
+def parse(file_path: Path, new_commands: list[str] | None = None) -> list[PositionedMatch]:
+    """
+    Parses custom commands out of mod file, using cached results where possible.
+
+    Has the same semantics as `file_parser.parse`, with positions included. Must have called
+    update_commands() first. May be called from a background thread.
+
+    Args:
+        file_path: The file to parse.
+        new_commands: If not None, the commands added by any CE_NewCmd lines are appended to this
+                      list, rather than being added to the file parser's global set.
+    Returns:
+        A list of 6-tuples, of the raw command name, the full line, the command length, the line
+        number, the byte offset of the line, and the line's hash.
+    """
+    global hits, misses
+
+    version, commands_hash = get_commands_snapshot()
+    key = get_key(file_path, commands_hash)
+    entry_path = get_entry_path(file_path)
+
+    if (cached := load_entry(entry_path, key)) is not None:
+        with stats_lock:
+            hits += 1
+        matches, _, file_new_commands = cached
+    else:
+        with stats_lock:
+            misses += 1
+
+        # Always collect new commands locally, so we know exactly which ones came from this file,
+        # even if other files are being parsed on other threads at the same time
+        file_new_commands = []
+        matches = file_parser.parse(file_path, with_positions=True, new_commands=file_new_commands)
+
+        # If the commands were updated while we were parsing (on another thread), we can't be sure
+        # which set we matched against
+        if file_parser.get_commands_version() == version:
+            save_entry(entry_path, key, matches, file_new_commands)
+
+    if new_commands is None:
+        add_new_commands(file_new_commands)
+    else:
+        new_commands.extend(file_new_commands)
+    return matches
+
+
+def scan(file_path: Path) -> tuple[ModInfo, list[PositionedMatch]]:
+    """
+    Scans a mod file for its mod info and custom commands, using cached results where possible.
+
+    Has the same semantics as `file_parser.scan_mod_file`. Must have called update_commands() first.
+    The matches share the same cache entry as parse(), so parsing the file afterwards is a hit.
+
+    Args:
+        file_path: The file to scan.
+    Returns:
+        A tuple of the mod info and the list of matches.
+    """
+    global hits, misses
+
+    version, commands_hash = get_commands_snapshot()
+    key = get_key(file_path, commands_hash)
+    entry_path = get_entry_path(file_path)
+
+    if (cached := load_entry(entry_path, key)) is not None and cached[1] is not None:
+        with stats_lock:
+            hits += 1
+        return cached[1], cached[0]
+
+    with stats_lock:
+        misses += 1
+    # Scanning never changes the native command set, but we still need to record the file's new
+    # commands, so that they can be added when this entry is used to execute it
+    new_commands: list[str] = []
+    spark_service_idx, game, comments, matches = file_parser.scan_mod_file(
+        file_path,
+        new_commands=new_commands,
+    )
+    info = (spark_service_idx, game, comments)
+
+    # Same as in parse(), the commands may have been updated on another thread
+    if file_parser.get_commands_version() == version:
+        save_entry(entry_path, key, matches, new_commands, info)
+    return info, matches
+
+
+def clear() -> int:
+    """
+    Deletes all cached parse results, and resets the hit/miss counters.
+
+    Returns:
+        The number of cache entries which were deleted.
+    """
+    global hits, misses
+    with stats_lock:
+        hits = 0
+        misses = 0
+
+    if not CACHE_DIR.exists():
+        return 0
+
+    count = sum(1 for _ in CACHE_DIR.glob("*.json"))
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    return count
+
+
+def get_stats() -> list[str]:
+    """
+    Gets a set of human readable stats about the cache.
+
+    Returns:
+        A list of lines to print.
+    """
+    with stats_lock:
+        current_hits, current_misses = hits, misses
+    total = current_hits + current_misses
+    hit_rate = 0 if total == 0 else 100 * current_hits / total
+    return [
+        f"Parse cache: {current_hits} hits, {current_misses} misses ({hit_rate:.1f}% hit rate)",
+    ]
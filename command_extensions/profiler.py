@@ -0,0 +1,235 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+
+__all__: tuple[str, ...] = (
+    "CommandStats",
+    "FileStats",
+    "end_file",
+    "get_report",
+    "is_enabled",
+    "record_exec",
+    "start",
+    "start_file",
+    "stop",
+    "write_json",
+)
+
+
+@dataclass
+class CommandStats:
+    calls: int = 0
+    # All times are in seconds
+    total: float = 0
+    max: float = 0
+    errors: int = 0
+    # The line which took the longest
+    slowest_line_number: int = 0
+    slowest_line: str = ""
+
+    @property
+    def mean(self) -> float:
+        """The mean time per call."""
+        return 0 if self.calls == 0 else self.total / self.calls
+
+    def record(self, elapsed: float, line_number: int, line: str, failed: bool) -> None:
+        """
+        Records a single call of this command.
+
+        Args:
+            elapsed: How long the call took.
+            line_number: The line number the command was on.
+            line: The full line which was run.
+            failed: True if the command raised an error.
+        """
+        self.calls += 1
+        self.total += elapsed
+        if failed:
+            self.errors += 1
+        if elapsed >= self.max:
+            self.max = elapsed
+            self.slowest_line_number = line_number
+            self.slowest_line = line
+
+
+@dataclass
+class FileStats:
+    path: Path
+    parse_time: float
+    matches: int
+    # Keyed on lowercase command name. Nested execs are stored under 'exec', and include the time
+    # spent parsing and running the nested file.
+    commands: dict[str, CommandStats] = field(default_factory=dict[str, CommandStats])
+
+    @property
+    def total_time(self) -> float:
+        """The total time spent parsing and running this file, including any nested execs."""
+        return self.parse_time + sum(cmd.total for cmd in self.commands.values())
+
+    def record(self, name: str, elapsed: float, line_number: int, line: str, failed: bool) -> None:
+        """
+        Records a single command run from this file.
+
+        Args:
+            name: The lowercase command name.
+            elapsed: How long the command took.
+            line_number: The line number the command was on.
+            line: The full line which was run.
+            failed: True if the command raised an error.
+        """
+        if (stats := self.commands.get(name)) is None:
+            stats = self.commands[name] = CommandStats()
+        stats.record(elapsed, line_number, line, failed)
+
+
+# None while not profiling, otherwise all the files executed so far, in the order they started
+files: list[FileStats] | None = None
+# The files currently being executed, innermost last
+stack: list[FileStats] = []
+# The most recently finished file, which hasn't been recorded in its parent yet
+last_finished: FileStats | None = None
+
+
+def is_enabled() -> bool:
+    """
+    Checks if we're currently profiling.
+
+    Returns:
+        True if profiling is enabled.
+    """
+    return files is not None
+
+
+def start() -> None:
+    """Starts profiling, discarding any previous results."""
+    global files, last_finished
+    files = []
+    stack.clear()
+    last_finished = None
+
+
+def stop() -> list[FileStats]:
+    """
+    Stops profiling.
+
+    Returns:
+        The stats of each file executed while profiling, in the order they started.
+    """
+    global files, last_finished
+    results = files or []
+    files = None
+    stack.clear()
+    last_finished = None
+    return results
+
+
+def start_file(file_path: Path, parse_time: float, matches: int) -> FileStats | None:
+    """
+    Starts recording stats for a new file.
+
+    Args:
+        file_path: The file which is being executed.
+        parse_time: How long it took to get the file's matches.
+        matches: How many matches the file had.
+    Returns:
+        The new file's stats object, or None if not profiling.
+    """
+    if files is None:
+        return None
+
+    stats = FileStats(file_path, parse_time, matches)
+    files.append(stats)
+    stack.append(stats)
+    return stats
+
+
+def end_file() -> None:
+    """Finishes recording stats for the innermost file."""
+    global last_finished
+    if stack:
+        last_finished = stack.pop()
+
+
+def record_exec(parent: FileStats, line_number: int, line: str) -> None:
+    """
+    Records a nested exec in its parent file, using the stats of the file it executed.
+
+    Does nothing if the nested file wasn't executed.
+
+    Args:
+        parent: The file containing the exec command.
+        line_number: The line number the exec command was on.
+        line: The full exec line.
+    """
+    global last_finished
+    if last_finished is None:
+        return
+    parent.record("exec", last_finished.total_time, line_number, line, False)
+    last_finished = None
+
+
+def get_report(results: list[FileStats]) -> list[str]:
+    """
+    Formats a human readable report of profiling results.
+
+    Within each file, commands are ranked by their total time.
+
+    Args:
+        results: The stats of each file.
+    Returns:
+        A list of lines to print.
+    """
+    output: list[str] = []
+    for stats in results:
+        output.append(
+            f"{stats.path}: {stats.total_time * 1000:.2f}ms total, parsed {stats.matches} matches"
+            f" in {stats.parse_time * 1000:.2f}ms",
+        )
+        ranked = sorted(stats.commands.items(), key=lambda item: item[1].total, reverse=True)
+        for name, cmd in ranked:
+            output.append(
+                f"    {name}: {cmd.calls} calls, {cmd.total * 1000:.2f}ms total,"
+                f" {cmd.mean * 1000:.3f}ms mean, {cmd.max * 1000:.3f}ms max, {cmd.errors} errors",
+            )
+            output.append(f"        slowest on line {cmd.slowest_line_number}: {cmd.slowest_line}")
+    return output
+
+
+def write_json(results: list[FileStats], output_path: Path) -> None:
+    """
+    Writes profiling results to a json file.
+
+    Times are written in milliseconds.
+
+    Args:
+        results: The stats of each file.
+        output_path: The file to write to.
+    """
+    data = [
+        {
+            "file": str(stats.path),
+            "total_ms": stats.total_time * 1000,
+            "parse_ms": stats.parse_time * 1000,
+            "matches": stats.matches,
+            "commands": [
+                {
+                    "command": name,
+                    "calls": cmd.calls,
+                    "total_ms": cmd.total * 1000,
+                    "mean_ms": cmd.mean * 1000,
+                    "max_ms": cmd.max * 1000,
+                    "errors": cmd.errors,
+                    "slowest_line_number": cmd.slowest_line_number,
+                    "slowest_line": cmd.slowest_line,
+                }
+                for name, cmd in sorted(
+                    stats.commands.items(),
+                    key=lambda item: item[1].total,
+                    reverse=True,
+                )
+            ],
+        }
+        for stats in results
+    ]
+    with output_path.open("w", encoding="utf8") as file:
+        json.dump(data, file, indent=4)
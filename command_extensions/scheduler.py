@@ -0,0 +1,161 @@
+import time
+import traceback
+from collections import deque
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from mods_base import hook
+from unrealsdk.unreal import BoundFunction, UObject, WrappedStruct
+
+__all__: tuple[str, ...] = (
+    "add_tick_callback",
+    "get_budget",
+    "get_pending_count",
+    "run",
+    "set_budget",
+)
+
+
+@dataclass
+class Task:
+    # Each step runs a single command
+    steps: Iterator[None]
+    # If set, overrides the default budget - set when CE_Budget is used from inside a file
+    budget: float | None = None
+
+
+# The max time to spend running commands each tick, in seconds. 0 means unlimited.
+default_budget: float = 0
+# Tasks waiting to run, the first one may be partially complete
+pending: deque[Task] = deque()
+# The task currently being stepped, if any
+current: Task | None = None
+# Other work to run each tick, sharing the same hook. Each returns True while it has more to do.
+tick_callbacks: list[Callable[[], bool]] = []
+
+
+def get_budget() -> float:
+    """
+    Gets the budget which applies to the current task.
+
+    Returns:
+        The max time to spend running commands each tick, in seconds. 0 means unlimited.
+    """
+    if current is not None and current.budget is not None:
+        return current.budget
+    return default_budget
+
+
+def set_budget(budget: float) -> None:
+    """
+    Sets the time budget.
+
+    If called while running a task, i.e. from a command inside a file, only changes the budget for
+    the rest of that task. Otherwise, changes the default budget for all future tasks.
+
+    Args:
+        budget: The max time to spend running commands each tick, in seconds. 0 means unlimited.
+    """
+    global default_budget
+    if current is not None:
+        current.budget = budget
+    else:
+        default_budget = budget
+
+
+def get_pending_count() -> int:
+    """
+    Gets how many tasks are waiting to be run.
+
+    Returns:
+        The number of pending tasks, including one which has been partially run.
+    """
+    return len(pending)
+
+
+def add_tick_callback(callback: Callable[[], bool]) -> None:
+    """
+    Adds a callback to run on each of the following engine ticks, until it's done.
+
+    Callbacks are run after any pending tasks have had their slice for the tick.
+
+    Args:
+        callback: The callback to add. Returns True if it should be run again next tick, False once
+                  it's finished.
+    """
+    if callback not in tick_callbacks:
+        tick_callbacks.append(callback)
+    tick_hook.enable()
+
+
+def run_tick_callbacks() -> None:
+    """Runs each tick callback once, removing any which have finished."""
+    for callback in list(tick_callbacks):
+        try:
+            more = callback()
+        except Exception:  # noqa: BLE001
+            traceback.print_exc()
+            more = False
+        if not more:
+            tick_callbacks.remove(callback)
+
+
+def run(steps: Iterator[None]) -> None:
+    """
+    Runs a new task.
+
+    If there's no budget, and nothing else is waiting to run, the task is run to completion
+    immediately. Otherwise, it's run in slices, over the following engine ticks.
+
+    If called from within another task (e.g. a command inside a file calls `exec`), the new task is
+    always run to completion immediately, as part of the current step.
+
+    Args:
+        steps: An iterator which runs one command each time it's advanced.
+    """
+    if current is not None:
+        for _ in steps:
+            pass
+        return
+
+    pending.append(Task(steps))
+    if len(pending) == 1:
+        run_slice()
+
+
+def run_slice() -> None:
+    """Runs pending tasks until they're all complete, or until we run out of time this tick."""
+    global current
+
+    start = time.perf_counter()
+    while pending:
+        current = pending[0]
+        try:
+            for _ in current.steps:
+                budget = get_budget()
+                if budget > 0 and time.perf_counter() - start >= budget:
+                    tick_hook.enable()
+                    return
+        except Exception:  # noqa: BLE001
+            traceback.print_exc()
+        finally:
+            current = None
+
+        pending.popleft()
+
+    if not tick_callbacks:
+        tick_hook.disable()
+
+
+@hook("WillowGame.WillowGameViewportClient:Tick")
+def tick_hook(
+    _1: UObject,
+    _2: WrappedStruct,
+    _3: Any,
+    _4: BoundFunction,
+) -> None:
+    run_slice()
+    run_tick_callbacks()
+    if not pending and not tick_callbacks:
+        tick_hook.disable()